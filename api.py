@@ -1,10 +1,18 @@
 # api.py
 # api.py
-from fastapi import FastAPI
+import json
+import os
+from typing import List
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from engine import get_recommendation_for_ticker
-from rag_llm import generate_rag_explanation  # or generate_llm_explanation
+from llm_service import DeadlineExceeded, LLMError, get_explanation_service
+from result_cache import cached_recommendation, recommendation_cache
+from rag_llm import explanation_cache_stats, generate_rag_explanation  # or generate_llm_explanation
+from warmup import start_background_warmup, warmup
 
 app = FastAPI()
 
@@ -13,15 +21,49 @@ class RecRequest(BaseModel):
     ticker: str
 
 
+class ExplainRequest(BaseModel):
+    ticker: str
+    stream: bool = False
+
+
+class BatchRecRequest(BaseModel):
+    tickers: List[str]
+    period: str = "2y"
+    interval: str = "1d"
+    explain: bool = False
+    max_workers: int = 8
+    vectorized: bool = False
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    return {"recommendations": recommendation_cache.stats(), "explanations": explanation_cache_stats()}
+
+
+@app.post("/warmup")
+def warmup_now(llm: bool = False):
+    """
+    Load the engine and build the RAG index now instead of on the first
+    request. Returns seconds spent per step.
+    """
+    return warmup(rag=True, llm=llm)
+
+
+@app.on_event("startup")
+def warmup_on_startup():
+    if os.environ.get("WARMUP_ON_STARTUP"):
+        start_background_warmup(rag=True)
+
+
 @app.post("/recommend")
 def recommend(req: RecRequest):
     # 1) Get quant/ML recommendation
-    rec = get_recommendation_for_ticker(req.ticker)
+    rec = cached_recommendation(req.ticker)
 
     # 2) Generate explanation via RAG (no LLM for now)
     expl = generate_rag_explanation(rec)
@@ -31,3 +73,80 @@ def recommend(req: RecRequest):
         "explanation": expl["explanation"],
         "kb_sources": expl["kb_sources"],
     }
+
+
+def _llm_http_error(e: Exception) -> HTTPException:
+    return HTTPException(status_code=504 if isinstance(e, DeadlineExceeded) else 502, detail=str(e))
+
+
+async def _stream_text(first: str, rest):
+    # The 200 headers are out once this runs, so a failure ends the body with an error line instead
+    yield first
+    try:
+        async for delta in rest:
+            yield delta
+    except (DeadlineExceeded, LLMError) as e:
+        yield f"\n[error] {e}\n"
+
+
+@app.post("/recommend/explain")
+async def recommend_explain(req: ExplainRequest):
+    """
+    Recommendation with an LLM explanation from the async explanation
+    service (bounded concurrency, deadline, retries). With stream=true only
+    the explanation is returned, as plain text streamed while it is generated;
+    failing before the first text gives 504/502 as without streaming, failing
+    later ends the text with an "[error] ..." line.
+    """
+    rec = await run_in_threadpool(cached_recommendation, req.ticker)
+    service = get_explanation_service()
+    if req.stream:
+        stream = service.explain_stream(rec)
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except (DeadlineExceeded, LLMError) as e:
+            raise _llm_http_error(e)
+        return StreamingResponse(_stream_text(first, stream), media_type="text/plain")
+
+    try:
+        explanation = await service.explain(rec)
+    except (DeadlineExceeded, LLMError) as e:
+        raise _llm_http_error(e)
+    return {"recommendation": rec, "explanation": explanation}
+
+
+@app.on_event("shutdown")
+async def close_explanation_service():
+    await get_explanation_service().aclose()
+
+
+@app.post("/recommend/batch")
+def recommend_batch(req: BatchRecRequest):
+    """
+    Stream one NDJSON line per ticker as soon as it is ready. Tickers that
+    fail come back as {"ticker": ..., "error": ...} lines.
+    """
+    from engine import get_recommendations_for_universe
+
+    def lines():
+        results = get_recommendations_for_universe(
+            req.tickers,
+            period=req.period,
+            interval=req.interval,
+            max_workers=min(max(req.max_workers, 1), 32),
+            vectorized=req.vectorized,
+        )
+        for rec in results:
+            if "error" in rec:
+                item = rec
+            else:
+                item = {"ticker": rec["ticker"], "recommendation": rec}
+                if req.explain:
+                    expl = generate_rag_explanation(rec)
+                    item["explanation"] = expl["explanation"]
+                    item["kb_sources"] = expl["kb_sources"]
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
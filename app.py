@@ -1,5 +1,4 @@
 import streamlit as st
-from engine import get_recommendation_for_ticker
 from rag_llm import generate_rag_explanation  # or LLM one
 
 st.title("AI Trade Assistant (Quant + RAG)")
@@ -8,6 +7,7 @@ ticker = st.text_input("Enter ticker symbol:", "RELIANCE.NS")
 
 if st.button("Analyze"):
     with st.spinner("Fetching data and computing signals..."):
+        from engine import get_recommendation_for_ticker  # pandas & co. load on first use
         rec = get_recommendation_for_ticker(ticker)
         expl = generate_rag_explanation(rec)
 
@@ -0,0 +1,386 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .snapshot_store import to_epoch
+
+logger = logging.getLogger(__name__)
+
+BAR_TIMEFRAMES = tuple(os.environ.get("BAR_TIMEFRAMES", "1m,5m,1h").split(","))
+BAR_CAPACITY = int(os.environ.get("BAR_CAPACITY", "1000"))  # closed bars kept per symbol and timeframe
+
+TIMEFRAME_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "1h": 3600,
+    "90m": 5400,
+    "1d": 86400,
+}
+
+# History fetched to seed each timeframe's engine: enough bars for the slowest window (ma_long)
+SEED_PERIODS = {
+    "1m": "5d",
+    "2m": "5d",
+    "5m": "1mo",
+    "15m": "1mo",
+    "30m": "1mo",
+    "60m": "3mo",
+    "1h": "3mo",
+    "90m": "3mo",
+    "1d": "2y",
+}
+
+# Bar columns; Volume is the number of ticks (OCR snapshots carry no traded volume)
+BAR_FIELDS = ("start", "open", "high", "low", "close", "volume")
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class BarSeries:
+    """
+    OHLCV bars of one symbol and timeframe: closed bars in a fixed-capacity
+    ring of float64 columns and the bar in progress as a list. Bars start at
+    multiples of `seconds` (UTC); periods without ticks produce no bar.
+
+    The IncrementalSignalEngine fed by the bars is built on first use (from
+    the seed history plus the ring) and catches up on the bars closed since
+    whenever a signal row is asked for, so ticks never wait for pandas. It
+    has its own `engine_lock`: ring and open bar are guarded by the caller
+    (BarAggregator's lock), the engine is only touched through live_row().
+    """
+
+    def __init__(self, timeframe: str, capacity: int = BAR_CAPACITY, **windows):
+        self.timeframe = timeframe
+        self.seconds = TIMEFRAME_SECONDS[timeframe]
+        self.capacity = capacity
+        self.windows = windows
+        self.columns = {f: np.empty(capacity, dtype=np.float64) for f in BAR_FIELDS}
+        self.start = 0
+        self.count = 0
+        self.open_bar: Optional[list] = None  # [start, open, high, low, close, volume]
+        self.last_tick: Optional[float] = None
+        self.late_ticks = 0
+        self.seeded = False
+        self.archived_to = -np.inf  # start of the last closed bar handed to the price history
+        self.engine_lock = threading.Lock()
+        self._engine = None
+        self._fed_to = -np.inf  # start of the last bar fed to the engine
+        self._seed = None
+        self._reseed = False
+
+    def __len__(self):
+        return self.count
+
+    def _commit(self, bar: list):
+        pos = (self.start + self.count) % self.capacity
+        if self.count == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.count += 1
+        for f, v in zip(BAR_FIELDS, bar):
+            self.columns[f][pos] = v
+
+    def closed_columns(self, after: float = -np.inf) -> Dict[str, np.ndarray]:
+        """
+        Copies of the columns of the closed bars starting after `after`,
+        oldest first.
+        """
+        idx = (self.start + np.arange(self.count)) % self.capacity
+        idx = idx[self.columns["start"][idx] > after]
+        return {f: self.columns[f][idx] for f in BAR_FIELDS}
+
+    def pending(self) -> tuple:
+        """
+        Everything live_row() needs, copied so that it can run without the
+        caller's lock: closed bars the engine has not seen and the open bar.
+        """
+        data = self.closed_columns(-np.inf if self._engine is None or self._reseed else self._fed_to)
+        return data["start"], data["close"], None if self.open_bar is None else list(self.open_bar)
+
+    def on_tick(self, price: float, ts: float) -> Optional[tuple]:
+        """
+        Fold one tick (POSIX seconds) into the series. Returns the bar it
+        closed, if any. Ticks older than the bar in progress are dropped.
+        """
+        bar_start = ts - ts % self.seconds
+        bar = self.open_bar
+        if bar is not None and bar_start < bar[0]:
+            self.late_ticks += 1
+            return None
+
+        closed = None
+        if bar is None or bar_start > bar[0]:
+            if bar is not None:
+                self._commit(bar)
+                closed = tuple(bar)
+            self.open_bar = [bar_start, price, price, price, price, 1.0]
+        else:
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += 1
+        self.last_tick = ts
+        return closed
+
+    def seed(self, closes: "pd.Series"):
+        """
+        Close-price history (e.g. cached intraday prices, naive UTC index) to
+        warm the engine up on, so signals are ready at once. Only bars older
+        than the first live bar are used; the engine is rebuilt on its next
+        use.
+        """
+        self._seed = closes.dropna()
+        self.seeded = True
+        self._reseed = True
+
+    def frame(self, include_open: bool = True, limit: Optional[int] = None) -> "pd.DataFrame":
+        """
+        Bars oldest first, OHLCV columns indexed by naive UTC bar start;
+        `limit` keeps only the most recent bars (none if <= 0).
+        """
+        data = self.closed_columns()
+        if include_open and self.open_bar is not None:
+            data = {f: np.append(v, x) for (f, v), x in zip(data.items(), self.open_bar)}
+        if limit is not None:
+            data = {f: v[max(len(v) - max(limit, 0), 0):] for f, v in data.items()}
+        return bars_frame(data)
+
+    def live_row(self, pending: tuple) -> Tuple[Optional["pd.Series"], bool]:
+        """
+        Signal row for the bar in progress (or the last closed bar) and
+        whether the engine is warmed up, from what pending() returned.
+        """
+        import pandas as pd
+
+        from incremental import IncrementalSignalEngine
+
+        starts, closes, open_bar = pending
+        with self.engine_lock:
+            if self._engine is None or self._reseed:
+                eng = IncrementalSignalEngine(interval=self.timeframe, **self.windows)
+                seed, first = self._seed, starts[0] if len(starts) else (open_bar or [None])[0]
+                if seed is not None and first is not None:
+                    seed = seed[seed.index < pd.Timestamp(first, unit="s")]
+                for ts, close in (seed.items() if seed is not None else ()):
+                    eng.on_bar(float(close), ts)
+                self._engine, self._fed_to, self._reseed = eng, -np.inf, False
+            for ts, close in zip(starts.tolist(), closes.tolist()):
+                if ts > self._fed_to:  # pending() may have read _fed_to before a concurrent catch-up
+                    self._engine.on_bar(close, pd.Timestamp(ts, unit="s"))
+                    self._fed_to = ts
+            if open_bar is not None and open_bar[0] > self._fed_to:
+                row = self._engine.on_tick(open_bar[4], pd.Timestamp(open_bar[0], unit="s"))
+            else:
+                row = self._engine.last_row
+            return row, self._engine.is_ready
+
+
+class BarAggregator:
+    """
+    Folds the snapshot stream into OHLCV bars for every symbol in each of
+    `timeframes` at once. Every tick updates all timeframes in constant
+    time; feature rows are only computed when a recommendation is asked
+    for, so intraday signals need no price download per tick.
+
+    With `history` (symbol, timeframe -> close prices, e.g. price_history),
+    the first recommendation for a symbol and timeframe seeds its engine
+    with that history, so signals are ready without waiting for ma_long
+    live bars to close. Without it, or if the fetch fails, only the live
+    bars are used.
+
+    With `archive` (symbol, timeframe, closed bars -> None, e.g.
+    archive_bars), archive_closed() hands the bars closed since its last
+    call over to it, so the live bars extend the price history.
+    """
+
+    def __init__(
+        self,
+        timeframes: Sequence[str] = BAR_TIMEFRAMES,
+        capacity: int = BAR_CAPACITY,
+        history: Optional[Callable[[str, str], "pd.Series"]] = None,
+        archive: Optional[Callable[[str, str, "pd.DataFrame"], None]] = None,
+        **windows,
+    ):
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAME_SECONDS]
+        if unknown:
+            raise ValueError(f"Unsupported bar timeframes: {unknown}")
+        self.timeframes = tuple(timeframes)
+        self.capacity = capacity
+        self.history = history
+        self.archive = archive
+        self.windows = windows
+        self._series: Dict[str, Dict[str, BarSeries]] = {}
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.closed = 0
+
+    def _for(self, symbol: str) -> Dict[str, BarSeries]:
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = {
+                tf: BarSeries(tf, self.capacity, **self.windows) for tf in self.timeframes
+            }
+        return series
+
+    def on_tick(self, symbol: str, price: float, timestamp) -> List[Tuple[str, tuple]]:
+        """
+        Fold one price into every timeframe of `symbol`. Returns the
+        (timeframe, bar) pairs that closed.
+        """
+        ts = to_epoch(timestamp)
+        closed = []
+        with self._lock:
+            self.ticks += 1
+            for tf, series in self._for(symbol).items():
+                bar = series.on_tick(price, ts)
+                if bar is not None:
+                    closed.append((tf, bar))
+            self.closed += len(closed)
+        return closed
+
+    def extend(self, symbols, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Fold decoded snapshot columns (see snapshot_codec) in row order;
+        rows without a symbol or price are skipped. Returns ticks used.
+        """
+        used = 0
+        with self._lock:
+            for symbol, price, ts in zip(symbols, columns["last_price"].tolist(), columns["timestamp"].tolist()):
+                if not symbol or price != price:
+                    continue
+                used += 1
+                for series in self._for(symbol).values():
+                    self.closed += series.on_tick(price, ts) is not None
+            self.ticks += used
+        return used
+
+    def seed(self, symbol: str, timeframe: str, closes: "pd.Series"):
+        with self._lock:
+            self._for(symbol)[timeframe].seed(closes)
+
+    def _series_or_raise(self, symbol: str, timeframe: str) -> BarSeries:
+        series = self._series.get(symbol, {}).get(timeframe)
+        if series is None:
+            raise KeyError(f"No {timeframe} bars for {symbol}")
+        return series
+
+    def bars(
+        self, symbol: str, timeframe: str, include_open: bool = True, limit: Optional[int] = None
+    ) -> "pd.DataFrame":
+        with self._lock:
+            return self._series_or_raise(symbol, timeframe).frame(include_open, limit)
+
+    def _seed_from_history(self, symbol: str, timeframe: str):
+        with self._lock:
+            series = self._series_or_raise(symbol, timeframe)
+            if series.seeded:
+                return
+            series.seeded = True  # one attempt, even if it fails
+        try:
+            closes = self.history(symbol, timeframe)  # outside the lock: may download
+        except Exception as e:
+            logger.warning("Could not seed %s bars of %s from history: %s", timeframe, symbol, e)
+            return
+        with self._lock:
+            series.seed(closes)
+
+    def recommendation(self, symbol: str, timeframe: str, ml_model=None, feature_cols=None) -> Dict:
+        """
+        Same output as incremental.get_live_recommendation, computed from
+        the live bars of `timeframe` (after the seed history, if any).
+        """
+        from engine import make_recommendation
+        from model_registry import get_model
+
+        if self.history is not None:
+            self._seed_from_history(symbol, timeframe)
+        with self._lock:
+            series = self._series_or_raise(symbol, timeframe)
+            pending = series.pending()
+        row, ready = series.live_row(pending)  # outside the lock: may build the engine
+        if row is None or not ready:
+            raise ValueError(f"Not enough {timeframe} bars for {symbol} yet ({len(series)} closed).")
+
+        ml_model = ml_model if ml_model is not None else get_model()
+        rec = make_recommendation(row, ml_model=ml_model, feature_cols=feature_cols)
+        rec["ticker"] = symbol
+        rec["period_used"] = "live"
+        rec["interval_used"] = timeframe
+        return rec
+
+    def archive_closed(self) -> int:
+        """
+        Pass the bars closed since the last call to `archive`, per symbol
+        and timeframe. Returns the number of bars handed over.
+        """
+        if self.archive is None:
+            return 0
+        with self._lock:
+            batches = []
+            for symbol, per in self._series.items():
+                for tf, series in per.items():
+                    data = series.closed_columns(series.archived_to)
+                    if len(data["start"]):
+                        batches.append((symbol, tf, data))
+                        series.archived_to = data["start"][-1]
+        archived = 0
+        for symbol, tf, data in batches:  # outside the lock: builds frames, writes files
+            try:
+                self.archive(symbol, tf, bars_frame(data))
+                archived += len(data["start"])
+            except Exception as e:
+                logger.warning("Could not archive %s bars of %s: %s", tf, symbol, e)
+        return archived
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._series)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "symbols": len(self._series),
+                "timeframes": list(self.timeframes),
+                "ticks": self.ticks,
+                "bars_closed": self.closed,
+                "late_ticks": sum(s.late_ticks for per in self._series.values() for s in per.values()),
+            }
+
+
+def bars_frame(data: Dict[str, np.ndarray]) -> "pd.DataFrame":
+    """
+    OHLCV frame indexed by naive UTC bar start from BAR_FIELDS columns.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame({c: data[f] for c, f in zip(BAR_COLUMNS, BAR_FIELDS[1:])},
+                      index=pd.to_datetime(data["start"], unit="s"))
+    df.index.name = "Date"
+    return df
+
+
+def price_history(symbol: str, timeframe: str) -> "pd.Series":
+    """
+    Close prices of `symbol` at `timeframe` through the price cache, over
+    SEED_PERIODS[timeframe]: the default seed history of the live bars.
+    """
+    from engine import load_price_df
+
+    return load_price_df(symbol, period=SEED_PERIODS.get(timeframe, "1mo"), interval=timeframe)["close_price"]
+
+
+def archive_bars(symbol: str, timeframe: str, bars: "pd.DataFrame"):
+    """
+    Append closed live bars to the cached price history of `symbol` at
+    `timeframe` (see PriceStore.append), so price_history and later
+    analyses see them. Volume is left out: it counts ticks, not shares.
+    """
+    from price_store import get_price_store
+
+    get_price_store().append(symbol, timeframe, bars.drop(columns="Volume"))
@@ -0,0 +1,167 @@
+import asyncio
+import json
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, Union
+
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+def _json_default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode(message: Union[dict, str]) -> str:
+    """
+    Serialize a message once for all clients (datetimes become ISO strings).
+    """
+    if isinstance(message, str):
+        return message
+    return json.dumps(message, default=_json_default)
+
+
+class _Client:
+    __slots__ = ("ws", "frames", "ready", "task", "dropped", "sent", "snapshots")
+
+    def __init__(self, ws, snapshots: bool = True):
+        self.ws = ws
+        self.snapshots = snapshots
+        self.frames: deque = deque()  # (text, droppable), oldest first
+        self.ready = asyncio.Event()
+        self.task = None
+        self.dropped = 0
+        self.sent = 0
+
+
+class Broadcaster:
+    """
+    Websocket fan-out where every client has its own bounded queue and
+    writer task, so one slow browser never holds up the others.
+
+    publish() serializes a message once and enqueues it without awaiting
+    any send. When a client's queue is full, `policy` decides:
+    'drop_oldest' discards its oldest queued published frame, 'disconnect'
+    closes it. Messages addressed to one client with send() (signal deltas,
+    which are meaningless once one is lost) are never dropped: they push
+    out a published frame instead, and a client whose queue is full of them
+    is disconnected. A send that takes longer than `send_timeout` also
+    disconnects the client.
+    """
+
+    def __init__(self, queue_size: int = 32, policy: str = DROP_OLDEST, send_timeout: float = 5.0):
+        if policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown slow-client policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self._clients: Dict[object, _Client] = {}
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def register(self, ws, snapshots: bool = True) -> None:
+        """
+        Start a writer for `ws`. With snapshots=False it only gets messages
+        addressed to it with send(), not publish()ed ones.
+        """
+        client = _Client(ws, snapshots)
+        client.task = asyncio.get_running_loop().create_task(self._writer(client))
+        self._clients[ws] = client
+
+    def unregister(self, ws) -> None:
+        client = self._clients.pop(ws, None)
+        if client is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def _evict(self, client: _Client):
+        """
+        Disconnect a slow or broken client.
+        """
+        if self._clients.get(client.ws) is not client:
+            return
+        self.unregister(client.ws)
+        self.disconnected += 1
+        asyncio.get_running_loop().create_task(self._close(client.ws))
+
+    @staticmethod
+    async def _close(ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _writer(self, client: _Client):
+        while True:
+            while not client.frames:
+                client.ready.clear()
+                await client.ready.wait()
+            text, _ = client.frames.popleft()
+            try:
+                await asyncio.wait_for(client.ws.send_text(text), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._evict(client)
+                return
+            client.sent += 1
+
+    def _offer(self, client: _Client, text: str, droppable: bool = True):
+        frames = client.frames
+        if len(frames) >= self.queue_size:
+            if self.policy == DISCONNECT:
+                self._evict(client)
+                return
+            oldest = next((i for i, (_, d) in enumerate(frames) if d), None)
+            if oldest is None and not droppable:
+                self._evict(client)  # can't keep up even with its own coalesced messages
+                return
+            client.dropped += 1
+            self.dropped += 1
+            if oldest is None:
+                return  # the new frame is the only droppable one
+            del frames[oldest]
+        frames.append((text, droppable))
+        client.ready.set()
+
+    def publish(self, message: Union[dict, str]) -> int:
+        """
+        Queue a message for every snapshot client; returns the number of
+        clients.
+        """
+        self.published += 1
+        clients = [c for c in self._clients.values() if c.snapshots]
+        if not clients:
+            return 0
+        text = encode(message)
+        for client in clients:
+            self._offer(client, text)
+        return len(clients)
+
+    def send(self, ws, message: Union[dict, str]) -> bool:
+        """
+        Queue a message for one registered client; unlike published frames
+        it is never dropped (see the class docstring). False if `ws` is not
+        registered.
+        """
+        client = self._clients.get(ws)
+        if client is None:
+            return False
+        self._offer(client, encode(message), droppable=False)
+        return True
+
+    def stats(self) -> Dict:
+        depths = [len(c.frames) for c in self._clients.values()]
+        return {
+            "clients": len(depths),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "queue_depth_max": max(depths, default=0),
+            "queue_depth_total": sum(depths),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
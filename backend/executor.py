@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable
+
+
+class Overloaded(RuntimeError):
+    """Raised when too many distinct analyses are already queued."""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "future", "loop")
+
+    def __init__(self, fn, args, future, loop):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.loop = loop
+
+
+class EngineExecutor:
+    """
+    Runs blocking engine / RAG work on a dedicated thread pool so the event
+    loop (and every websocket broadcast) keeps running while it computes.
+
+    submit_latest() keeps at most one queued job per key: a newer request for
+    a key whose job has not started yet replaces the older arguments, and
+    every caller shares the one result. At most `max_pending` keys may be
+    queued at once; beyond that submissions raise Overloaded.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="engine")
+        self._pending: Dict[Hashable, _Job] = {}
+        self._lock = threading.Lock()
+        self.counters = {"submitted": 0, "superseded": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    async def run(self, fn: Callable, *args):
+        """
+        Run fn(*args) on the pool and await the result (no de-duplication).
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    def submit_latest(self, key: Hashable, fn: Callable, *args) -> asyncio.Future:
+        """
+        Queue fn(*args) for `key`, superseding a queued-but-not-started job
+        for the same key. Returns an awaitable future for the result.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.counters["submitted"] += 1
+            job = self._pending.get(key)
+            if job is not None:
+                job.fn, job.args = fn, args
+                self.counters["superseded"] += 1
+                return job.future
+
+            if len(self._pending) >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise Overloaded(f"{len(self._pending)} analyses already queued")
+
+            job = self._pending[key] = _Job(fn, args, loop.create_future(), loop)
+
+        self._pool.submit(self._run, key)
+        return job.future
+
+    def _run(self, key: Hashable):
+        with self._lock:
+            job = self._pending.pop(key)
+            fn, args = job.fn, job.args
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            with self._lock:
+                self.counters["failed"] += 1
+            job.loop.call_soon_threadsafe(_settle, job.future, None, e)
+        else:
+            with self._lock:
+                self.counters["completed"] += 1
+            job.loop.call_soon_threadsafe(_settle, job.future, result, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, queued=len(self._pending), workers=self.max_workers)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _settle(future: asyncio.Future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+engine_executor = EngineExecutor(
+    max_workers=int(os.environ.get("ENGINE_WORKERS", "4")),
+    max_pending=int(os.environ.get("ENGINE_MAX_PENDING", "256")),
+)
@@ -1,20 +1,44 @@
-from fastapi import FastAPI, WebSocket
+import asyncio
+import json
+import logging
+import os
+import time
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from datetime import datetime
-from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime, timezone
+from pydantic import BaseModel, ValidationError
 
 from .models import MarketSnapshot
-from engine import get_recommendation_for_ticker
+from . import snapshot_codec
+from .bars import BarAggregator, archive_bars, price_history
+from .signals import SignalHub
+from .broadcast import Broadcaster
+from .executor import Overloaded, engine_executor
+from .snapshot_store import SnapshotStore, columns_to_records
+from result_cache import cached_recommendation, recommendation_cache
+from warmup import start_background_warmup, warmup
 
 
 
 
 app = FastAPI(title="QuantVision Backend", version="1.0")
-clients = set()
-clients: List[WebSocket] = []
-SNAPSHOT_BUFFER: List[MarketSnapshot] = []
-LATEST_SIGNAL = {}
+broadcaster = Broadcaster(
+    queue_size=int(os.environ.get("WS_QUEUE_SIZE", "32")),
+    policy=os.environ.get("WS_SLOW_CLIENT_POLICY", "drop_oldest"),
+)
+SNAPSHOT_STORE = SnapshotStore(
+    capacity=int(os.environ.get("SNAPSHOT_CAPACITY", "3600")),
+    spill_dir=os.environ.get("SNAPSHOT_SPILL_DIR") or None,
+)
+BARS = BarAggregator(history=price_history, archive=archive_bars)  # engines seeded from cached intraday prices on first use
+BAR_ARCHIVE_EVERY = float(os.environ.get("BAR_ARCHIVE_EVERY", "60"))  # seconds between closed-bar appends to the price cache; 0 disables
+# "1d" analyses against daily history; a bar timeframe (e.g. "5m") uses the live bars in BARS instead
+ANALYSIS_TIMEFRAME = os.environ.get("ANALYSIS_TIMEFRAME", "1d")
+SIGNALS = SignalHub(broadcaster)  # latest recommendation per ticker, pushed to subscribers
+INGEST_SOCKET_STATS = {"connections": 0, "messages": 0, "snapshots": 0, "rejected": 0}
+INGEST_REJECT_LOG_EVERY = float(os.environ.get("INGEST_REJECT_LOG_EVERY", "10"))  # seconds between rejection warnings
+logger = logging.getLogger(__name__)
 
 
 
@@ -26,16 +50,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-async def broadcast_snapshot(snapshot: dict):
-    dead = []
-    for ws in clients:
-        try:
-            await ws.send_json(snapshot)
-        except:
-            dead.append(ws)
-
-    for ws in dead:
-        clients.remove(ws)
 
 
 
@@ -47,6 +61,28 @@ def health():
 
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    return {"recommendations": recommendation_cache.stats()}
+
+
+@app.post("/warmup")
+async def warmup_now():
+    """
+    Load the engine ahead of the first snapshot (on the engine executor).
+    Returns seconds spent per step.
+    """
+    return await engine_executor.run(warmup, False)
+
+
+@app.on_event("startup")
+def warmup_on_startup():
+    if os.environ.get("WARMUP_ON_STARTUP"):
+        start_background_warmup(rag=False)
+
+
+
+
 class Calibration(BaseModel):
     x: float
     y: float
@@ -73,54 +109,354 @@ def save_calibration(data: Calibration):
 
 
 async def broadcast_snapshot(data: dict):
-    dead_clients = []
+    # Serialized once, queued per client; never waits on a slow socket
+    broadcaster.publish(data)
 
-    for client in clients:
-        try:
-            await client.send_json(data)
-        except:
-            dead_clients.append(client)
 
-    for client in dead_clients:
-        clients.remove(client)
 
 
+_watched = set()
+
+
+def submit_analysis(symbol: str, fn, *args) -> asyncio.Future:
+    """
+    engine_executor.submit_latest for an analysis; its recommendation is
+    stored in SIGNALS (and pushed to subscribers) when it completes.
+    """
+    future = engine_executor.submit_latest(symbol, fn, *args)
+    if future not in _watched:  # a superseded job shares its future
+        _watched.add(future)
+        future.add_done_callback(lambda f: _publish_signal(symbol, f))
+    return future
+
+
+def _publish_signal(symbol: str, future: asyncio.Future):
+    _watched.discard(future)
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result.get("status") == "ok":
+        SIGNALS.update(symbol, result["signal"])
+
+
+
+
+async def ingest(snapshot: MarketSnapshot) -> bool:
+    """
+    Store, broadcast and queue analysis for one snapshot. Returns False if
+    the analysis had to be dropped because the executor is overloaded.
+    """
+    SNAPSHOT_STORE.add(snapshot)
+    if snapshot.symbol and snapshot.last_price is not None:
+        BARS.on_tick(snapshot.symbol, snapshot.last_price, snapshot.timestamp)
+    await broadcast_snapshot(snapshot.dict())
+    if snapshot.symbol:
+        # Analysis runs in the background; a newer snapshot for the same
+        # symbol replaces one that is still queued.
+        try:
+            submit_analysis(snapshot.symbol, run_analysis, snapshot)
+        except Overloaded:
+            return False
+    return True
 
 
 @app.post("/ingest/market_snapshot")
 async def ingest_market_snapshot(snapshot: MarketSnapshot):
-    SNAPSHOT_BUFFER.append(snapshot)
-    await broadcast_snapshot(snapshot.dict())
-    await analyze_snapshot(snapshot)
+    if not await ingest(snapshot):
+        return {"status": "received", "analysis": "dropped"}
     return {"status": "received"}
 
 
+async def ingest_columns(cols: dict) -> dict:
+    """
+    Store, broadcast and queue analysis for a decoded batch (see
+    snapshot_codec.decode) without building a model per snapshot. Only the
+    newest price per symbol is analysed, as queued analyses would be
+    superseded anyway.
+    """
+    symbols = cols["symbol"]
+    stored = SNAPSHOT_STORE.extend(symbols, cols)
+    BARS.extend(symbols, cols)
+    for record in snapshot_codec.to_records(cols):
+        await broadcast_snapshot(record)
+
+    latest = {symbol: i for i, symbol in enumerate(symbols) if symbol}
+    dropped = 0
+    for symbol, i in latest.items():
+        price = cols["last_price"][i]
+        try:
+            submit_analysis(
+                symbol, analyze_price, symbol, None if price != price else float(price),
+                datetime.fromtimestamp(cols["timestamp"][i], timezone.utc),
+            )
+        except Overloaded:
+            dropped += 1
+    return {"count": len(symbols), "stored": stored, "analysis_dropped": dropped}
+
+
+@app.post("/ingest/market_snapshots")
+async def ingest_market_snapshots(request: Request):
+    """
+    Micro-batched ingest: many snapshots per request, oldest first.
+
+    The body is a JSON array of MarketSnapshot objects, or, by Content-Type,
+    NDJSON (application/x-ndjson), the fixed record layout of
+    snapshot_codec (application/vnd.quantvision.snapshots) or an Arrow IPC
+    stream (application/vnd.apache.arrow.stream). The latter three are
+    decoded straight into columns.
+    """
+    content_type = request.headers.get("content-type", "application/json")
+    body = await request.body()
+    if content_type.split(";")[0].strip().lower() == "application/json":
+        try:
+            snapshots = [MarketSnapshot(**item) for item in json.loads(body)]
+        except (TypeError, ValueError) as e:  # ValidationError is a ValueError
+            raise HTTPException(status_code=422, detail=str(e))
+        dropped = 0
+        for snapshot in snapshots:
+            dropped += not await ingest(snapshot)
+        return {"status": "received", "count": len(snapshots), "analysis_dropped": dropped}
+
+    try:
+        cols = snapshot_codec.decode(body, content_type)
+    except snapshot_codec.DecodeError as e:
+        status = 415 if str(e).startswith("Unsupported") else 400
+        raise HTTPException(status_code=status, detail=str(e))
+    return {"status": "received", **await ingest_columns(cols)}
+
+
+
+
+def run_analysis(snapshot: MarketSnapshot) -> dict:
+    """
+    Blocking part of snapshot analysis; runs on the engine executor.
+    """
+    return analyze_price(snapshot.symbol, snapshot.last_price, snapshot.timestamp)
+
+
+def analyze_price(symbol: str, last_price: Optional[float] = None, timestamp=None) -> dict:
+    from incremental import get_live_recommendation  # pandas & co. load on first use
+
+    try:
+        if ANALYSIS_TIMEFRAME in BARS.timeframes:
+            rec = BARS.recommendation(symbol, ANALYSIS_TIMEFRAME)  # ticks were folded in at ingest
+        elif last_price is not None:
+            rec = get_live_recommendation(symbol, price=last_price, timestamp=timestamp)
+        else:
+            rec = cached_recommendation(symbol)
+        return {"status": "ok", "signal": rec}
+    except Exception as e:
+        return {"status": "error", "reason": str(e)}
 
 
 @app.post("/analyze_snapshot")
 async def analyze_snapshot(snapshot: MarketSnapshot):
     if snapshot.symbol:
         try:
-            rec = get_recommendation_for_ticker(snapshot.symbol)
-            LATEST_SIGNAL.update(rec)
-            return {"status": "ok", "signal": rec}
-        except Exception as e:
+            return await submit_analysis(snapshot.symbol, run_analysis, snapshot)
+        except Overloaded as e:
             return {"status": "error", "reason": str(e)}
     return {"status": "no_symbol"}
 
 
 
 
+@app.get("/signals")
+def latest_signals():
+    """
+    Latest recommendation per ticker.
+    """
+    return SIGNALS.state
+
+
+@app.get("/signals/stats")
+def signals_stats():
+    return SIGNALS.stats()
+
+
+@app.get("/signals/{ticker}")
+def latest_signal(ticker: str):
+    rec = SIGNALS.get(ticker)
+    if rec is None:
+        raise HTTPException(status_code=404, detail=f"No signal for {ticker}")
+    return rec
+
+
+
+
+@app.get("/snapshots/{symbol}")
+def recent_snapshots(symbol: str, window: float = 300, limit: Optional[int] = Query(None, ge=1)):
+    """
+    Snapshots for `symbol` from the last `window` seconds, oldest first.
+    """
+    cols = SNAPSHOT_STORE.query(symbol, since=time.time() - window, limit=limit)
+    return {"symbol": symbol, "snapshots": columns_to_records(cols)}
+
+
+@app.get("/bars/stats")
+def bars_stats():
+    return BARS.stats()
+
+
+@app.get("/bars/{symbol}")
+def recent_bars(
+    symbol: str, timeframe: str = "1m", limit: Optional[int] = Query(None, ge=1), include_open: bool = True
+):
+    """
+    OHLCV bars built from the snapshot stream, oldest first. Volume counts
+    snapshots.
+    """
+    try:
+        df = BARS.bars(symbol, timeframe, include_open=include_open, limit=limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "bars": [
+            {"start": ts.isoformat(), **row}
+            for ts, row in zip(df.index, df.to_dict("records"))
+        ],
+    }
+
+
+@app.get("/bars/{symbol}/recommendation")
+async def bars_recommendation(symbol: str, timeframe: str = "5m"):
+    """
+    Intraday recommendation from the live bars of `timeframe` (no price
+    download), computed on the engine executor.
+    """
+    try:
+        return await engine_executor.run(BARS.recommendation, symbol, timeframe)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+async def archive_bars_periodically():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(BAR_ARCHIVE_EVERY)
+        await loop.run_in_executor(None, BARS.archive_closed)
+
+
+@app.on_event("startup")
+def start_bar_archive():
+    if BAR_ARCHIVE_EVERY > 0:
+        asyncio.get_running_loop().create_task(archive_bars_periodically())
+
+
+@app.on_event("shutdown")
+def flush_snapshots():
+    SNAPSHOT_STORE.flush()
+    if BAR_ARCHIVE_EVERY > 0:
+        BARS.archive_closed()
+
+
+
+
+@app.get("/broadcast/stats")
+def broadcast_stats():
+    return broadcaster.stats()
+
+
+@app.get("/executor/stats")
+def executor_stats():
+    return engine_executor.stats()
+
+
+@app.get("/ingest/stats")
+def ingest_stats():
+    """
+    Counters of the /ws/ingest websocket; `rejected` counts snapshots that
+    were not valid JSON or failed validation.
+    """
+    return INGEST_SOCKET_STATS
+
+
+
+
 @app.websocket("/ws/vision")
 async def vision_socket(ws: WebSocket):
+    """
+    Raw snapshots as they are ingested, plus signal pushes for tickers the
+    client subscribes to with {"op": "subscribe", "tickers": [...]}.
+    """
+    await signal_socket(ws, snapshots=True)
+
+
+@app.websocket("/ws/signals")
+async def signals_socket(ws: WebSocket):
+    """
+    Signal pushes only: {"type": "signals", "signals": {ticker: changed
+    fields}}, for the tickers subscribed to as on /ws/vision.
+    """
+    await signal_socket(ws, snapshots=False)
+
+
+async def signal_socket(ws: WebSocket, snapshots: bool):
     await ws.accept()
-    clients.append(ws)
+    broadcaster.register(ws, snapshots=snapshots)
 
     try:
         while True:
-            await ws.receive_text()
+            SIGNALS.handle(ws, await ws.receive_text())
     except:
         pass
     finally:
-        if ws in clients:
-            clients.remove(ws)
+        SIGNALS.unsubscribe(ws)
+        broadcaster.unregister(ws)
+
+
+_reject_log = {"at": float("-inf"), "suppressed": 0}
+
+
+def log_ingest_rejects(n: int, detail: str):
+    """
+    Warn about rejected snapshots at most once per INGEST_REJECT_LOG_EVERY
+    seconds; rejections in between are counted into the next warning.
+    """
+    now = time.monotonic()
+    if now - _reject_log["at"] < INGEST_REJECT_LOG_EVERY:
+        _reject_log["suppressed"] += n
+        return
+    n, _reject_log["at"], _reject_log["suppressed"] = n + _reject_log["suppressed"], now, 0
+    logger.warning("/ws/ingest rejected %d snapshot(s) since the last warning: %s", n, detail)
+
+
+@app.websocket("/ws/ingest")
+async def ingest_socket(ws: WebSocket):
+    """
+    Persistent ingest connection for the vision sender: each message is one
+    snapshot or a JSON array of them. Nothing is broadcast back on it; a
+    message with invalid snapshots gets one {"type": "error", "rejected": n,
+    "detail": ...} frame in reply (the valid ones are still ingested).
+    """
+    await ws.accept()
+    INGEST_SOCKET_STATS["connections"] += 1
+    try:
+        while True:
+            text = await ws.receive_text()
+            INGEST_SOCKET_STATS["messages"] += 1
+            try:
+                payload = json.loads(text)
+                items = payload if isinstance(payload, list) else [payload]
+            except ValueError as e:
+                items, errors = [], [f"invalid JSON: {e}"]
+            else:
+                errors = []
+            for item in items:
+                try:
+                    snapshot = MarketSnapshot(**item)
+                except (TypeError, ValidationError) as e:
+                    errors.append(str(e))
+                    continue
+                INGEST_SOCKET_STATS["snapshots"] += 1
+                await ingest(snapshot)
+            if errors:
+                INGEST_SOCKET_STATS["rejected"] += len(errors)
+                log_ingest_rejects(len(errors), errors[0])
+                await ws.send_text(json.dumps({"type": "error", "rejected": len(errors), "detail": errors[0]}))
+    except:
+        pass
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from datetime import datetime
 
 
@@ -11,4 +11,4 @@ class MarketSnapshot(BaseModel):
     last_price: Optional[float] = None
     pnl: Optional[float] = None
     position_size: Optional[float] = None
-    extra: Optional[Dict[str, float]] = None  # for indicators etc.
+    extra: Optional[Dict[str, Any]] = None  # indicators, raw OCR text etc.
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from .broadcast import Broadcaster
+
+
+SIGNAL_PUSH_RATE = float(os.environ.get("SIGNAL_PUSH_RATE", "2"))  # max signal messages per client per second
+
+ALL = "*"  # subscribe to every ticker
+
+
+def _clean(value):
+    if hasattr(value, "item"):  # numpy scalar
+        value = value.item()
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def diff(old: Optional[Dict], new: Dict) -> Dict:
+    """
+    Fields of `new` that differ from `old` (NaN equals NaN and is sent as
+    None); fields dropped from `old` come back as None.
+    """
+    old = old or {}
+    changed = {}
+    for key, value in new.items():
+        value = _clean(value)
+        if key not in old or old[key] != value:
+            changed[key] = value
+    for key in old.keys() - new.keys():
+        changed[key] = None
+    return changed
+
+
+class _Subscriber:
+    __slots__ = ("ws", "tickers", "pending", "last_push", "timer")
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.tickers: Set[str] = set()
+        self.pending: Dict[str, Dict] = {}
+        self.last_push = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class SignalHub:
+    """
+    Latest recommendation per ticker, pushed to websocket subscribers as
+    deltas.
+
+    update() diffs a new recommendation against the ticker's current one
+    once, whatever the number of subscribers. The changed fields are merged
+    into each subscriber's pending push, and a subscriber gets at most
+    `max_rate` messages per second: everything that changed in between is
+    coalesced into one {"type": "signals", "signals": {ticker: fields}}.
+    A new subscription first pushes the full current state of its tickers.
+
+    Must be used from the event loop thread. Messages go out through the
+    Broadcaster's per-client queue, so they share its slow-client policy.
+    """
+
+    def __init__(self, broadcaster: Broadcaster, max_rate: float = SIGNAL_PUSH_RATE):
+        self.broadcaster = broadcaster
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.state: Dict[str, Dict] = {}
+        self._subscribers: Dict[object, _Subscriber] = {}
+        self._by_ticker: Dict[str, Set[_Subscriber]] = {}
+        self.counters = {"updates": 0, "unchanged": 0, "pushes": 0, "coalesced": 0}
+
+    # ---------- STATE ----------
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        return self.state.get(ticker)
+
+    def update(self, ticker: str, rec: Dict) -> Dict:
+        """
+        Store the latest recommendation for `ticker` and queue its changed
+        fields for subscribers. Returns the changed fields.
+        """
+        self.counters["updates"] += 1
+        changed = diff(self.state.get(ticker), rec)
+        if not changed:
+            self.counters["unchanged"] += 1
+            return changed
+        self.state[ticker] = {k: _clean(v) for k, v in rec.items()}
+        for sub in self._by_ticker.get(ticker, set()) | self._by_ticker.get(ALL, set()):
+            self._queue(sub, ticker, changed)
+        return changed
+
+    # ---------- SUBSCRIPTIONS ----------
+
+    def subscribe(self, ws, tickers: Iterable[str]):
+        sub = self._subscribers.get(ws)
+        if sub is None:
+            sub = self._subscribers[ws] = _Subscriber(ws)
+        for ticker in tickers:
+            if ticker in sub.tickers:
+                continue
+            sub.tickers.add(ticker)
+            self._by_ticker.setdefault(ticker, set()).add(sub)
+            for name in (self.state if ticker == ALL else [ticker]):
+                if name in self.state:
+                    self._queue(sub, name, self.state[name])
+
+    def unsubscribe(self, ws, tickers: Optional[Iterable[str]] = None):
+        """
+        Drop some (or, without `tickers`, all) of a client's subscriptions.
+        """
+        sub = self._subscribers.get(ws)
+        if sub is None:
+            return
+        for ticker in list(sub.tickers if tickers is None else tickers):
+            sub.tickers.discard(ticker)
+            subs = self._by_ticker.get(ticker)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_ticker[ticker]
+            sub.pending.pop(ticker, None)
+        if not sub.tickers:
+            if sub.timer is not None:
+                sub.timer.cancel()
+            del self._subscribers[ws]
+
+    def handle(self, ws, text: str) -> bool:
+        """
+        Apply a client command: {"op": "subscribe" | "unsubscribe",
+        "tickers": [...]} ("*" = every ticker). False if it is not one.
+        """
+        try:
+            cmd = json.loads(text)
+            op, tickers = cmd["op"], cmd.get("tickers")
+        except (ValueError, TypeError, KeyError):
+            return False
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        if op == "subscribe" and tickers:
+            self.subscribe(ws, tickers)
+        elif op == "unsubscribe":
+            self.unsubscribe(ws, tickers)
+        else:
+            return False
+        return True
+
+    # ---------- PUSHES ----------
+
+    def _queue(self, sub: _Subscriber, ticker: str, fields: Dict):
+        pending = sub.pending.get(ticker)
+        if pending is None:
+            sub.pending[ticker] = dict(fields)
+        else:
+            pending.update(fields)
+            self.counters["coalesced"] += 1
+        if sub.timer is None:
+            delay = max(0.0, sub.last_push + self.interval - time.monotonic())
+            sub.timer = asyncio.get_running_loop().call_later(delay, self._flush, sub)
+
+    def _flush(self, sub: _Subscriber):
+        sub.timer = None
+        if not sub.pending or self._subscribers.get(sub.ws) is not sub:
+            return
+        message = {"type": "signals", "signals": sub.pending}
+        sub.pending = {}
+        sub.last_push = time.monotonic()
+        if self.broadcaster.send(sub.ws, message):
+            self.counters["pushes"] += 1
+        else:
+            self.unsubscribe(sub.ws)
+
+    def stats(self) -> Dict:
+        return dict(
+            self.counters,
+            tickers=len(self.state),
+            subscribers=len(self._subscribers),
+            max_rate=1.0 / self.interval if self.interval else None,
+        )
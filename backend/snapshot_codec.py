@@ -0,0 +1,218 @@
+import json
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .snapshot_store import FIELDS, to_epoch
+
+
+# Content types accepted by /ingest/market_snapshots besides JSON
+NDJSON = "application/x-ndjson"  # one snapshot object per line
+STRUCT = "application/vnd.quantvision.snapshots"  # fixed record layout below
+ARROW = "application/vnd.apache.arrow.stream"  # Arrow IPC stream, one column per field
+
+STRING_COLS = ("source", "symbol", "timeframe")
+
+# STRUCT payload: HEADER, then `strings` entries of <u2 length + UTF-8 bytes,
+# then `records` RECORD_DTYPE rows. String columns are indexes into that
+# table (-1 = None); missing floats are NaN; timestamps are POSIX seconds.
+MAGIC = b"QVS1"
+HEADER = struct.Struct("<4sII")  # magic, strings, records
+RECORD_DTYPE = np.dtype([(c, "<i4") for c in STRING_COLS] + [(f, "<f8") for f in FIELDS])
+
+
+class DecodeError(ValueError):
+    """Raised for a batch body that does not decode into snapshots."""
+
+
+def _floats(values) -> np.ndarray:
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise DecodeError(f"Non-numeric value: {e}") from None
+
+
+def _epochs(values) -> np.ndarray:
+    try:
+        return np.array([to_epoch(v) for v in values], dtype=np.float64)
+    except (TypeError, ValueError, AttributeError) as e:
+        raise DecodeError(f"Bad timestamp: {e}") from None
+
+
+def _check(cols: Dict) -> Dict:
+    if any(s is None for s in cols["source"]):
+        raise DecodeError("Every snapshot needs a source")
+    if not np.isfinite(cols["timestamp"]).all():
+        raise DecodeError("Every snapshot needs a timestamp")
+    return cols
+
+
+# ---------- DECODING ----------
+
+def decode_rows(rows: List) -> Dict:
+    """
+    Columns from a list of snapshot dicts (parsed JSON / NDJSON).
+    """
+    if not all(isinstance(r, dict) for r in rows):
+        raise DecodeError("Snapshots must be JSON objects")
+    cols = {c: [r.get(c) for r in rows] for c in STRING_COLS}
+    cols["timestamp"] = _epochs([r.get("timestamp") for r in rows])
+    for f in FIELDS[1:]:
+        cols[f] = _floats([r.get(f) for r in rows])
+    if any(r.get("extra") is not None for r in rows):
+        cols["extra"] = [r.get("extra") for r in rows]
+    return _check(cols)
+
+
+def decode_ndjson(body: bytes) -> Dict:
+    try:
+        rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+    except ValueError as e:
+        raise DecodeError(f"Bad NDJSON line: {e}") from None
+    return decode_rows(rows)
+
+
+def decode_struct(body: bytes) -> Dict:
+    """
+    Columns from a STRUCT payload: the records are read in place with
+    np.frombuffer, only the string table is parsed in Python.
+    """
+    if len(body) < HEADER.size:
+        raise DecodeError("Truncated header")
+    magic, n_strings, n_records = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise DecodeError("Not a snapshot batch")
+
+    strings, pos = [], HEADER.size
+    try:
+        for _ in range(n_strings):
+            (length,) = struct.unpack_from("<H", body, pos)
+            strings.append(body[pos + 2:pos + 2 + length].decode())
+            pos += 2 + length
+        records = np.frombuffer(body, dtype=RECORD_DTYPE, count=n_records, offset=pos)
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        raise DecodeError(f"Truncated or corrupt batch: {e}") from None
+
+    table = np.array(strings + [None], dtype=object)  # index -1 -> None
+    cols = {}
+    for c in STRING_COLS:
+        idx = records[c]
+        if ((idx < -1) | (idx >= n_strings)).any():
+            raise DecodeError(f"String index out of range in {c}")
+        cols[c] = table[idx]
+    for f in FIELDS:
+        cols[f] = records[f]
+    return _check(cols)
+
+
+def decode_arrow(body: bytes) -> Dict:
+    """
+    Columns from an Arrow IPC stream. timestamp may be an Arrow timestamp,
+    POSIX seconds or ISO strings; missing values are nulls.
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise DecodeError(f"Bad Arrow stream: {e}") from None
+
+    def column(name):
+        return table.column(name) if name in table.column_names else pa.nulls(table.num_rows)
+
+    cols = {c: np.array(column(c).to_pylist(), dtype=object) for c in STRING_COLS}
+    ts = column("timestamp")
+    if pa.types.is_timestamp(ts.type):
+        cols["timestamp"] = ts.cast(pa.timestamp("us", tz="UTC")).cast(pa.int64()).to_numpy() / 1e6
+    elif pa.types.is_string(ts.type) or pa.types.is_large_string(ts.type):
+        cols["timestamp"] = _epochs(ts.to_pylist())
+    else:
+        cols["timestamp"] = ts.cast(pa.float64()).to_numpy(zero_copy_only=False)
+    for f in FIELDS[1:]:
+        cols[f] = column(f).cast(pa.float64()).to_numpy(zero_copy_only=False)
+    return _check(cols)
+
+
+DECODERS = {NDJSON: decode_ndjson, STRUCT: decode_struct, ARROW: decode_arrow}
+
+
+def decode(body: bytes, content_type: str) -> Dict:
+    """
+    Snapshot columns ({source, symbol, timeframe: str/None per row;
+    timestamp, last_price, pnl, position_size: float64 arrays; optional
+    extra}) from a batch body of `content_type`.
+    """
+    decoder = DECODERS.get(content_type.split(";")[0].strip().lower())
+    if decoder is None:
+        raise DecodeError(f"Unsupported content type: {content_type}")
+    return decoder(body)
+
+
+def to_records(cols: Dict) -> Iterator[Dict]:
+    """
+    Snapshot dicts (ISO timestamps, None for missing values) for broadcast.
+    """
+    strings = [list(cols[c]) for c in STRING_COLS]
+    floats = [cols[f].tolist() for f in FIELDS]
+    extra = cols.get("extra") or [None] * len(floats[0])
+    for row in zip(*strings, *floats, extra):
+        rec = dict(zip(STRING_COLS, row[:3]))
+        rec.update((f, None if v != v else v) for f, v in zip(FIELDS, row[3:7]))
+        rec["timestamp"] = datetime.fromtimestamp(rec["timestamp"], tz=timezone.utc).isoformat()
+        rec["extra"] = row[7]
+        yield rec
+
+
+# ---------- ENCODING ----------
+
+def encode_ndjson(snapshots: List[Dict]) -> bytes:
+    return "".join(json.dumps(s, default=str) + "\n" for s in snapshots).encode()
+
+
+def encode_struct(snapshots: List[Dict]) -> bytes:
+    """
+    STRUCT payload for snapshot dicts. `extra` is not carried.
+    """
+    index: Dict[Optional[str], int] = {None: -1}
+    strings = []
+    records = np.empty(len(snapshots), dtype=RECORD_DTYPE)
+    for i, s in enumerate(snapshots):
+        for c in STRING_COLS:
+            value = s.get(c)
+            if value not in index:
+                index[value] = len(strings)
+                strings.append(value)
+            records[c][i] = index[value]
+        records["timestamp"][i] = to_epoch(s["timestamp"])
+        for f in FIELDS[1:]:
+            records[f][i] = np.nan if s.get(f) is None else s[f]
+
+    parts = [HEADER.pack(MAGIC, len(strings), len(snapshots))]
+    for value in strings:
+        raw = value.encode()
+        parts.append(struct.pack("<H", len(raw)) + raw)
+    parts.append(records.tobytes())
+    return b"".join(parts)
+
+
+def encode_arrow(snapshots: List[Dict]) -> bytes:
+    """
+    Arrow IPC stream for snapshot dicts (timestamps as POSIX seconds).
+    `extra` is not carried.
+    """
+    import pyarrow as pa
+
+    table = pa.table({
+        **{c: pa.array([s.get(c) for s in snapshots], type=pa.string()) for c in STRING_COLS},
+        "timestamp": pa.array([to_epoch(s["timestamp"]) for s in snapshots], type=pa.float64()),
+        **{f: pa.array([s.get(f) for s in snapshots], type=pa.float64()) for f in FIELDS[1:]},
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {NDJSON: encode_ndjson, STRUCT: encode_struct, ARROW: encode_arrow}
@@ -0,0 +1,253 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+FIELDS = ("timestamp", "last_price", "pnl", "position_size")
+
+# On-disk record layout for evicted snapshots (one file per symbol)
+SPILL_DTYPE = np.dtype([(f, "<f8") for f in FIELDS])
+
+UNASSIGNED = "_unassigned"  # bucket for snapshots where OCR found no symbol
+
+
+def to_epoch(ts) -> float:
+    """
+    datetime (naive = UTC), ISO string or number -> POSIX seconds.
+    """
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _nan(x) -> float:
+    return np.nan if x is None else float(x)
+
+
+class SymbolRing:
+    """
+    Fixed-capacity ring of snapshots for one symbol, stored column-wise in
+    preallocated float64 arrays. Timestamps are kept non-decreasing so range
+    queries are two binary searches.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = {f: np.empty(capacity, dtype=np.float64) for f in FIELDS}
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def newest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return float(self.columns["timestamp"][(self.start + self.count - 1) % self.capacity])
+
+    def append(self, values: tuple) -> Optional[tuple]:
+        """
+        Append one (timestamp, last_price, pnl, position_size) record and
+        return the record it evicted, if any.
+        """
+        evicted = None
+        if self.count == self.capacity:
+            evicted = tuple(float(self.columns[f][self.start]) for f in FIELDS)
+            pos = self.start
+            self.start = (self.start + 1) % self.capacity
+        else:
+            pos = (self.start + self.count) % self.capacity
+            self.count += 1
+
+        for f, v in zip(FIELDS, values):
+            self.columns[f][pos] = v
+        return evicted
+
+    def _segments(self):
+        """
+        Physical (lo, hi) slices covering the ring in time order.
+        """
+        end = self.start + self.count
+        if end <= self.capacity:
+            return [(self.start, end)]
+        return [(self.start, self.capacity), (0, end - self.capacity)]
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Records with since <= timestamp <= until, oldest first.
+        """
+        ts = self.columns["timestamp"]
+        parts = []
+        for lo, hi in self._segments():
+            seg = ts[lo:hi]
+            i = lo + (np.searchsorted(seg, since, side="left") if since is not None else 0)
+            j = lo + (np.searchsorted(seg, until, side="right") if until is not None else len(seg))
+            if j > i:
+                parts.append((i, j))
+
+        return {
+            f: np.concatenate([self.columns[f][i:j] for i, j in parts]) if parts else np.empty(0)
+            for f in FIELDS
+        }
+
+
+class SnapshotStore:
+    """
+    Bounded per-symbol snapshot history. Each symbol keeps the most recent
+    `capacity` snapshots; at most `max_symbols` symbols are held, the least
+    recently updated being dropped first. With `spill_dir` set, everything
+    evicted is appended to <spill_dir>/<symbol>.bin for later replay.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 3600,
+        max_symbols: int = 512,
+        spill_dir: Optional[str] = None,
+        spill_batch: int = 256,
+    ):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.spill_dir = spill_dir
+        self.spill_batch = spill_batch
+        self._rings: "OrderedDict[str, SymbolRing]" = OrderedDict()
+        self._spill_buffers: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+        self.out_of_order = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def append(self, symbol: Optional[str], timestamp, last_price=None, pnl=None, position_size=None) -> bool:
+        """
+        Store one snapshot. Returns False if it was older than the newest
+        stored snapshot for the symbol (those are counted and dropped).
+        """
+        record = (to_epoch(timestamp), _nan(last_price), _nan(pnl), _nan(position_size))
+        with self._lock:
+            return self._append(symbol or UNASSIGNED, record)
+
+    def extend(self, symbols, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Store many snapshots given column-wise (FIELDS as float arrays,
+        timestamps in POSIX seconds) under one lock acquisition. Returns how
+        many were stored.
+        """
+        records = zip(*(columns[f].tolist() for f in FIELDS))
+        with self._lock:
+            return sum(self._append(symbol or UNASSIGNED, record) for symbol, record in zip(symbols, records))
+
+    def _append(self, symbol: str, record: tuple) -> bool:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            ring = self._rings[symbol] = SymbolRing(self.capacity)
+            while len(self._rings) > self.max_symbols:
+                old_symbol, old_ring = self._rings.popitem(last=False)
+                self._spill_ring(old_symbol, old_ring)
+        else:
+            self._rings.move_to_end(symbol)
+
+        newest = ring.newest
+        if newest is not None and record[0] < newest:
+            self.out_of_order += 1
+            return False
+
+        evicted = ring.append(record)
+        if evicted is not None and self.spill_dir:
+            buf = self._spill_buffers.setdefault(symbol, [])
+            buf.append(evicted)
+            if len(buf) >= self.spill_batch:
+                self._flush_symbol(symbol)
+        return True
+
+    def add(self, snapshot) -> bool:
+        """
+        Store a MarketSnapshot.
+        """
+        return self.append(snapshot.symbol, snapshot.timestamp, snapshot.last_price, snapshot.pnl, snapshot.position_size)
+
+    def query(self, symbol: str, since=None, until=None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Column arrays for `symbol` between `since` and `until` (inclusive),
+        oldest first; `limit` keeps only the most recent rows (none if <= 0).
+        """
+        since = to_epoch(since) if since is not None else None
+        until = to_epoch(until) if until is not None else None
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                return {f: np.empty(0) for f in FIELDS}
+            cols = ring.query(since, until)
+        if limit is not None:
+            cols = {f: v[max(len(v) - max(limit, 0), 0):] for f, v in cols.items()}
+        return cols
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._rings)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "symbols": len(self._rings),
+                "snapshots": sum(len(r) for r in self._rings.values()),
+                "capacity_per_symbol": self.capacity,
+                "out_of_order_dropped": self.out_of_order,
+                "spill_dir": self.spill_dir,
+            }
+
+    # ---------- SPILL FILE ----------
+
+    def _spill_path(self, symbol: str) -> str:
+        return os.path.join(self.spill_dir, re.sub(r"[^A-Za-z0-9._-]", "_", symbol) + ".bin")
+
+    def _flush_symbol(self, symbol: str):
+        buf = self._spill_buffers.pop(symbol, None)
+        if buf:
+            with open(self._spill_path(symbol), "ab") as f:
+                np.array(buf, dtype=SPILL_DTYPE).tofile(f)
+
+    def _spill_ring(self, symbol: str, ring: SymbolRing):
+        if not self.spill_dir:
+            return
+        cols = ring.query()
+        self._spill_buffers.setdefault(symbol, []).extend(zip(*(cols[f].tolist() for f in FIELDS)))
+        self._flush_symbol(symbol)
+
+    def flush(self):
+        """
+        Write any buffered evictions to the spill files.
+        """
+        with self._lock:
+            for symbol in list(self._spill_buffers):
+                self._flush_symbol(symbol)
+
+    def replay(self, symbol: str) -> np.ndarray:
+        """
+        Everything spilled for `symbol`, as a structured array (SPILL_DTYPE).
+        """
+        self.flush()
+        if not self.spill_dir or not os.path.exists(self._spill_path(symbol)):
+            return np.empty(0, dtype=SPILL_DTYPE)
+        return np.fromfile(self._spill_path(symbol), dtype=SPILL_DTYPE)
+
+
+def columns_to_records(cols: Dict[str, np.ndarray]) -> List[Dict]:
+    """
+    JSON-friendly rows: ISO timestamps and None for missing values.
+    """
+    rows = []
+    for values in zip(*(cols[f].tolist() for f in FIELDS)):
+        row = {f: (None if v != v else v) for f, v in zip(FIELDS, values)}
+        row["timestamp"] = datetime.fromtimestamp(row["timestamp"], tz=timezone.utc).isoformat()
+        rows.append(row)
+    return rows
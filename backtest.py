@@ -0,0 +1,260 @@
+# backtest.py
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from engine import build_signals
+
+
+DEFAULT_COST = 0.0005  # per unit of position change, as in strategy_results.csv
+PERIODS_PER_YEAR = 252
+
+WINDOW_PARAMS = ["ma_short", "ma_long", "rsi_window", "breakout_window"]
+THRESHOLD_PARAMS = ["rsi_upper", "rsi_lower"]
+
+
+# ---------- SIGNAL → POSITION ----------
+
+def _positions(sig: pd.DataFrame, mode: str, rsi_signal: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Target position per bar as a (bars x configs) array.
+    'trend' : long when MA_short > MA_long, else flat (strategy_results.csv)
+    'vote'  : sign of the combined trend/RSI/breakout vote, long or short
+    `rsi_signal` may carry one column per RSI threshold pair.
+    """
+    trend = sig["trend_signal"].to_numpy(dtype=float)[:, None]
+    if mode == "trend":
+        if rsi_signal is not None:
+            return np.repeat(trend, rsi_signal.shape[1], axis=1)
+        return trend
+    if mode == "vote":
+        if rsi_signal is None:
+            rsi_signal = sig["rsi_signal"].to_numpy(dtype=float)[:, None]
+        breakout = sig["breakout_signal"].to_numpy(dtype=float)[:, None]
+        return np.sign(trend + rsi_signal + breakout)
+    raise ValueError(f"Unknown signal mode: {mode}")
+
+
+def _rsi_signals(sig: pd.DataFrame, uppers: np.ndarray, lowers: np.ndarray) -> np.ndarray:
+    """
+    rsi_signal for many (upper, lower) threshold pairs at once: (bars x pairs).
+    """
+    regime = sig["market_regime"].to_numpy()
+    rsi = sig["rsi"].to_numpy(dtype=float)[:, None]
+    bull = np.isin(regime, ["Bull-Low-Vol", "Bull-High-Vol"])[:, None]
+    bear = (regime == "Bear")[:, None]
+    with np.errstate(invalid="ignore"):
+        out = np.where(bull & (rsi > uppers[None, :]), 1.0, 0.0)
+        out[bear & (rsi < lowers[None, :])] = -1.0
+    return out
+
+
+# ---------- CORE SIMULATION ----------
+
+def simulate(signal: np.ndarray, ret: np.ndarray, cost: float = DEFAULT_COST) -> Dict[str, np.ndarray]:
+    """
+    Vectorised P&L for one or many signal columns against one return series.
+    `signal` is (bars,) or (bars x configs); today's signal is traded at the
+    close, so it earns tomorrow's return. Costs are charged on signal changes.
+    """
+    signal = np.asarray(signal, dtype=float)
+    squeeze = signal.ndim == 1
+    if squeeze:
+        signal = signal[:, None]
+    ret = np.asarray(ret, dtype=float)[:, None]
+
+    position = np.vstack([np.zeros((1, signal.shape[1])), signal[:-1]])
+    strategy_return = position * ret
+
+    trade = np.vstack([np.full((1, signal.shape[1]), np.nan), np.abs(np.diff(signal, axis=0))])
+    trade_cost = trade * cost
+    net = strategy_return - trade_cost
+
+    def curve(r):
+        # cumprod that skips NaNs, like pandas' cumprod
+        out = np.cumprod(np.where(np.isnan(r), 1.0, 1.0 + r), axis=0)
+        return np.where(np.isnan(r), np.nan, out)
+
+    out = {
+        "signal": signal,
+        "strategy_return": strategy_return,
+        "equity_curve": curve(strategy_return),
+        "buy_hold_curve": curve(np.repeat(ret, signal.shape[1], axis=1)),
+        "trade": trade,
+        "cost": trade_cost,
+        "net_strategy_return": net,
+        "net_equity_curve": curve(net),
+    }
+    if squeeze:
+        out = {k: v[:, 0] for k, v in out.items()}
+    return out
+
+
+def performance(sim: Dict[str, np.ndarray], periods_per_year: int = PERIODS_PER_YEAR) -> Dict[str, np.ndarray]:
+    """
+    Sharpe, max drawdown, turnover and returns per config from `simulate` output.
+    """
+    net = sim["net_strategy_return"]
+    equity = sim["net_equity_curve"]
+    trades = sim["trade"]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(net, axis=0)
+        std = np.nanstd(net, axis=0, ddof=1)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+
+        filled = np.where(np.isnan(equity), 1.0, equity)
+        peak = np.maximum.accumulate(filled, axis=0)
+        max_drawdown = np.min(filled / peak - 1, axis=0)
+
+        n_bars = np.sum(~np.isnan(net), axis=0)
+        n_trades = np.nansum(trades, axis=0)
+        total_return = filled[-1] - 1
+        years = n_bars / periods_per_year
+        cagr = np.where(years > 0, np.power(np.maximum(filled[-1], 0), 1 / years) - 1, np.nan)
+
+    return {
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+        "turnover": np.where(years > 0, n_trades / years, np.nan),  # position changes per year
+        "trades": n_trades,
+        "total_return": total_return,
+        "cagr": cagr,
+    }
+
+
+# ---------- SINGLE BACKTEST ----------
+
+def backtest(
+    df_price: pd.DataFrame,
+    cost: float = DEFAULT_COST,
+    signal: str = "trend",
+    **params,
+) -> pd.DataFrame:
+    """
+    Run build_signals (with any window/threshold overrides in `params`) and
+    add the strategy_results.csv columns: signal, strategy_return,
+    equity_curve, buy_hold_curve, trade, cost, net_strategy_return and
+    net_equity_curve. Rows before MA_long is available are dropped.
+    """
+    sig = build_signals(df_price, **params).dropna(subset=["MA_long"])
+    sim = simulate(_positions(sig, signal)[:, 0], sig["return"].to_numpy(dtype=float), cost=cost)
+
+    out = sig.copy()
+    for col, values in sim.items():
+        out[col] = values
+    out["signal"] = out["signal"].astype(int)
+    return out
+
+
+# ---------- PARAMETER SWEEPS ----------
+
+def parameter_grid(
+    ma_short: Sequence[int] = (10, 20, 30),
+    ma_long: Sequence[int] = (50, 100, 200),
+    rsi_window: Sequence[int] = (14,),
+    breakout_window: Sequence[int] = (20,),
+    rsi_upper: Sequence[float] = (55,),
+    rsi_lower: Sequence[float] = (45,),
+) -> List[Dict]:
+    """
+    Cartesian product of parameter values, skipping ma_short >= ma_long.
+    """
+    grid = []
+    for combo in itertools.product(ma_short, ma_long, rsi_window, breakout_window, rsi_upper, rsi_lower):
+        cfg = dict(zip(WINDOW_PARAMS + THRESHOLD_PARAMS, combo))
+        if cfg["ma_short"] < cfg["ma_long"] and cfg["rsi_lower"] <= cfg["rsi_upper"]:
+            grid.append(cfg)
+    return grid
+
+
+_worker_prices: Optional[pd.DataFrame] = None
+
+
+def _init_worker(df_price: pd.DataFrame):
+    global _worker_prices
+    _worker_prices = df_price
+
+
+def _evaluate_windows(args) -> List[Dict]:
+    """
+    Evaluate every threshold pair sharing one set of windows: signals are
+    built once and all thresholds are simulated as columns of one matrix.
+    """
+    windows, thresholds, cost, mode, periods_per_year = args
+    sig = build_signals(_worker_prices, **windows).dropna(subset=["MA_long"])
+    uppers = np.array([t["rsi_upper"] for t in thresholds], dtype=float)
+    lowers = np.array([t["rsi_lower"] for t in thresholds], dtype=float)
+
+    positions = _positions(sig, mode, _rsi_signals(sig, uppers, lowers))
+    sim = simulate(positions, sig["return"].to_numpy(dtype=float), cost=cost)
+    perf = performance(sim, periods_per_year=periods_per_year)
+
+    return [
+        dict(windows, **thr, **{k: float(v[i]) for k, v in perf.items()})
+        for i, thr in enumerate(thresholds)
+    ]
+
+
+def run_grid(
+    df_price: pd.DataFrame,
+    grid: Optional[List[Dict]] = None,
+    cost: float = DEFAULT_COST,
+    signal: str = "vote",
+    periods_per_year: int = PERIODS_PER_YEAR,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate a parameter grid on one price history and return one row per
+    config with Sharpe, max drawdown and turnover, best Sharpe first.
+
+    Configs are batched by window set; batches run on a process pool
+    (max_workers=1 runs in-process).
+    """
+    grid = parameter_grid() if grid is None else grid
+
+    batches: Dict[tuple, List[Dict]] = {}
+    for cfg in grid:
+        key = tuple(cfg.get(p) for p in WINDOW_PARAMS)
+        batches.setdefault(key, []).append({p: cfg.get(p, d) for p, d in zip(THRESHOLD_PARAMS, (55, 45))})
+
+    tasks = []
+    for key, thresholds in batches.items():
+        windows = {p: v for p, v in zip(WINDOW_PARAMS, key) if v is not None}
+        tasks.append((windows, thresholds, cost, signal, periods_per_year))
+
+    max_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    if max_workers <= 1:
+        _init_worker(df_price)
+        rows = [r for task in tasks for r in _evaluate_windows(task)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(df_price,)) as pool:
+            rows = [r for batch in pool.map(_evaluate_windows, tasks) for r in batch]
+
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False, na_position="last").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from engine import load_price_df
+
+    parser = argparse.ArgumentParser(description="Backtest the signal engine and optionally sweep parameters.")
+    parser.add_argument("ticker", nargs="?", default="RELIANCE.NS")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--cost", type=float, default=DEFAULT_COST)
+    parser.add_argument("--out", default="backtest_results.csv")
+    parser.add_argument("--sweep", action="store_true", help="run the default parameter grid instead")
+    args = parser.parse_args()
+
+    prices = load_price_df(args.ticker, period=args.period)
+    if args.sweep:
+        print(run_grid(prices, cost=args.cost).to_string())
+    else:
+        result = backtest(prices, cost=args.cost)
+        result.to_csv(args.out)
+        print(performance({c: result[c].to_numpy() for c in ("net_strategy_return", "net_equity_curve", "trade")}))
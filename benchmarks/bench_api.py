@@ -0,0 +1,78 @@
+# benchmarks/bench_api.py
+"""
+Recommendation API latency, in-process through the ASGI app (api.py):
+  health       - GET /health (framework and transport overhead)
+  recommend    - POST /recommend with the recommendation cache cleared
+                 before each request (signals + RAG explanation) and warm
+                 (served from the cache)
+  batch        - POST /recommend/batch for BATCH tickers, streamed NDJSON
+                 read to the end, with and without explanations
+
+Prices come from benchmarks.synthetic.SyntheticProvider and explanations
+from the local KB, so no network is used.
+
+    python -m benchmarks.bench_api
+"""
+import asyncio
+import json
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic import offline_price_store
+
+BATCH = 50
+
+
+async def _time(client, method: str, path: str, n: int, body=None, before=None) -> dict:
+    times = []
+    for i in range(n):
+        if before is not None:
+            before()
+        t0 = time.perf_counter()
+        resp = await client.request(method, path, json=body(i) if callable(body) else body)
+        resp.raise_for_status()
+        resp.read()
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    return {"mean_ms": round(float(times.mean()), 3), "p95_ms": round(float(np.percentile(times, 95)), 3)}
+
+
+async def _run(app, n: int) -> dict:
+    from result_cache import recommendation_cache
+
+    tickers = [f"SYN{i}" for i in range(BATCH)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for t in tickers:  # fill the price cache; downloads are not what is measured here
+            (await client.post("/recommend", json={"ticker": t})).raise_for_status()
+
+        results = {"health": await _time(client, "GET", "/health", n)}
+        results["recommend"] = {  # cached first: the uncached runs empty the cache
+            "cached": await _time(client, "POST", "/recommend", n, lambda i: {"ticker": tickers[i % BATCH]}),
+            "uncached": await _time(client, "POST", "/recommend", n, lambda i: {"ticker": tickers[i % BATCH]},
+                                    before=recommendation_cache.invalidate),
+        }
+        results["batch"] = {
+            "signals": await _time(client, "POST", "/recommend/batch", max(1, n // 20), {"tickers": tickers}),
+            "explained": await _time(client, "POST", "/recommend/batch", max(1, n // 20),
+                                     {"tickers": tickers, "explain": True}),
+        }
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    import price_store
+    from api import app
+
+    with tempfile.TemporaryDirectory() as root:
+        offline_price_store(root=root)
+        results = asyncio.run(_run(app, 40 if quick else 200))
+    price_store.set_price_store(None)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
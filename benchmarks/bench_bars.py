@@ -0,0 +1,74 @@
+# benchmarks/bench_bars.py
+"""
+Live bar aggregation (backend/bars.py) over a synthetic one-tick-per-second
+stream for several symbols:
+  on_tick        - ticks/s through BarAggregator.on_tick (all timeframes)
+  extend         - ticks/s through BarAggregator.extend (decoded batches)
+  resample       - the same 5m bars rebuilt with pandas resample each time,
+                   per new tick (what recomputing from the history costs)
+  recommendation - ms per intraday recommendation from the live bars
+
+    python -m benchmarks.bench_bars
+"""
+import json
+import time
+
+import numpy as np
+
+N_SYMBOLS = 8
+T0 = 1_700_000_000.0
+
+
+def _stream(seconds: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, (seconds, N_SYMBOLS)), axis=0))
+    symbols = np.array([f"SYM{i}" for i in range(N_SYMBOLS)], dtype=object)
+    return {
+        "symbol": np.tile(symbols, seconds),
+        "timestamp": np.repeat(T0 + np.arange(seconds, dtype=np.float64), N_SYMBOLS),
+        "last_price": prices.ravel(),
+    }
+
+
+def _per_sec(n: int, fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return round(n / (time.perf_counter() - t0))
+
+
+def run(quick: bool = False) -> dict:
+    import pandas as pd
+
+    from backend.bars import BarAggregator
+
+    seconds = 3600 if quick else 4 * 3600  # the 1m engine needs ma_long (50) closed bars
+    cols = _stream(seconds)
+    n = len(cols["symbol"])
+    rows = list(zip(cols["symbol"].tolist(), cols["last_price"].tolist(), cols["timestamp"].tolist()))
+
+    per_tick = BarAggregator()
+    results = {"ticks": n, "on_tick_per_sec": _per_sec(n, lambda: [per_tick.on_tick(*r) for r in rows])}
+
+    batched = BarAggregator()
+    results["extend_per_sec"] = _per_sec(
+        n, lambda: [batched.extend(cols["symbol"][i:i + 256], {k: v[i:i + 256] for k, v in cols.items()})
+                    for i in range(0, n, 256)]
+    )
+    assert batched.bars("SYM0", "5m").equals(per_tick.bars("SYM0", "5m"))
+
+    sym0 = pd.Series(cols["last_price"][::N_SYMBOLS], index=pd.to_datetime(cols["timestamp"][::N_SYMBOLS], unit="s"))
+    k = 200
+    results["resample_per_sec"] = _per_sec(k, lambda: [sym0.iloc[:len(sym0) - i].resample("5min").ohlc()
+                                                       for i in range(k)])
+
+    per_tick.recommendation("SYM0", "1m")  # builds the engine from the ring
+    t0 = time.perf_counter()
+    for _ in range(100):
+        per_tick.recommendation("SYM0", "1m")
+    results["recommendation_ms"] = round((time.perf_counter() - t0) / 100 * 1000, 3)
+    results["stats"] = per_tick.stats()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
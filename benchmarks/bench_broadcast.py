@@ -0,0 +1,117 @@
+# benchmarks/bench_broadcast.py
+"""
+Websocket fan-out to hundreds of simulated local clients.
+
+Compares the old sequential loop (await send_json per client, serializing
+for each) with backend.broadcast.Broadcaster. A tenth of the clients are
+slow (50 ms per send) and frames are published every 10 ms. Reports how
+long a publish blocks the caller and when fast clients have every frame.
+
+    python -m benchmarks.bench_broadcast
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+from backend.broadcast import Broadcaster
+
+
+FRAME_INTERVAL = 0.01  # 100 frames/s, well above the 1 Hz OCR rate
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.last_at = None
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last_at = time.perf_counter()
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data, default=str))
+
+    async def close(self):
+        pass
+
+
+def _clients(n: int, slow_every: int = 10, fast_delay: float = 0.0, slow_delay: float = 0.05):
+    return [FakeWebSocket(slow_delay if i % slow_every == 0 else fast_delay) for i in range(n)]
+
+
+def _snapshot(i: int) -> dict:
+    return {
+        "source": "bench",
+        "symbol": "RELIANCE.NS",
+        "timestamp": datetime.now(timezone.utc),
+        "last_price": 1500.0 + i,
+        "pnl": 12.5,
+        "extra": {"raw_symbol_text": "RELIANCE 1D"},
+    }
+
+
+async def _sequential(n_clients: int, frames: int) -> dict:
+    clients = _clients(n_clients)
+    t0 = time.perf_counter()
+    block = 0.0
+    for i in range(frames):
+        p0 = time.perf_counter()
+        for ws in clients:
+            await ws.send_json(_snapshot(i))
+        block = max(block, time.perf_counter() - p0)
+        await asyncio.sleep(FRAME_INTERVAL)
+    fast = [c for c in clients if c.delay == 0.0]
+    return {
+        "publish_block_max_ms": round(block * 1000, 2),
+        "fast_client_done_ms": round((max(c.last_at for c in fast) - t0) * 1000, 2),
+    }
+
+
+async def _broadcaster(n_clients: int, frames: int, policy: str) -> dict:
+    clients = _clients(n_clients)
+    b = Broadcaster(queue_size=8, policy=policy)
+    for ws in clients:
+        b.register(ws)
+
+    t0 = time.perf_counter()
+    block = 0.0
+    for i in range(frames):
+        p0 = time.perf_counter()
+        b.publish(_snapshot(i))
+        block = max(block, time.perf_counter() - p0)
+        await asyncio.sleep(FRAME_INTERVAL)
+
+    fast = [c for c in clients if c.delay == 0.0]
+    while any(c.frames for c in b._clients.values() if c.ws.delay == 0.0):
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0)
+    done = max(c.last_at for c in fast) - t0
+    stats = b.stats()
+    for ws in clients:
+        b.unregister(ws)
+    return {
+        "publish_block_max_ms": round(block * 1000, 2),
+        "fast_client_done_ms": round(done * 1000, 2),
+        "fast_client_frames_min": min(c.received for c in fast),
+        "dropped": stats["dropped"],
+        "disconnected": stats["disconnected"],
+    }
+
+
+def run(quick: bool = False) -> dict:
+    frames = 10
+    results = {}
+    for n in ([100] if quick else [100, 300]):
+        results[f"clients_{n}"] = {
+            "sequential": asyncio.run(_sequential(n, frames)),
+            "broadcaster_drop_oldest": asyncio.run(_broadcaster(n, frames, "drop_oldest")),
+            "broadcaster_disconnect": asyncio.run(_broadcaster(n, frames, "disconnect")),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,114 @@
+# benchmarks/bench_capture.py
+"""
+Per-frame cost of capture, from the screenshot buffer to BGR pixels ready
+for OCR:
+  legacy    - what grab_chart_frame did per frame: copy the BGRA buffer into
+              a new array, drop alpha, cvtColor into another new array
+  full      - CaptureSession(mode="full"): one cvtColor into a reused buffer
+  union     - CaptureSession(mode="union"): only the ROIs' bounding box
+  rois      - CaptureSession(mode="rois"): each ROI on its own
+Each session mode is timed through read_rois() (views, serial loop) and
+read() (owned ROI copies, what the pipeline queues), with the pickled size
+of what crosses the process boundary.
+
+Screenshots are synthetic BGRA chart frames (as mss returns them) of the
+default 1200x700 capture region. With a display, `live` also times mss
+itself: a new mss.mss() per frame (legacy) vs the session's persistent one.
+
+    python -m benchmarks.bench_capture
+"""
+import json
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+REGION = {"left": 0, "top": 0, "width": 1200, "height": 700}
+
+
+def _legacy(bgra):
+    import cv2
+
+    frame = np.array(bgra)[:, :, :3]
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+
+def _timed(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - t0) / n * 1000, 4)
+
+
+def _bench_modes(screens, frames, n: int) -> dict:
+    from vision_service import ocr_pipeline as ocr
+    from vision_service.capture import ArrayBackend, CaptureSession
+
+    slices = ocr._calibration.roi_slices(frames[0].shape)
+    legacy = iter(screens * (n // len(screens) + 1))
+    results = {"legacy": {"ms_per_frame": _timed(lambda: _legacy(next(legacy)), n),
+                          "pickled_kb": round(len(pickle.dumps(frames[0])) / 1024, 1)}}
+    for mode in ("full", "union", "rois"):
+        session = CaptureSession(ArrayBackend(screens, origin=(0, 0)), mode=mode, region=REGION)
+        rois = session.read_rois()
+        for name, sl in slices.items():  # same pixels as cropping the full frame
+            assert np.array_equal(rois[name], frames[0][sl])
+        results[mode] = {
+            "boxes": len(session._boxes),
+            "pixels": sum(b["width"] * b["height"] for b in session._boxes),
+            "read_rois_ms": _timed(session.read_rois, n),
+            "read_ms": _timed(session.read, n),
+            "pickled_kb": round(len(pickle.dumps(session.read())) / 1024, 1),
+        }
+    return results
+
+
+def _bench_live(n: int) -> dict:
+    try:
+        import mss
+
+        with mss.mss() as sct:
+            sct.grab(REGION)
+    except Exception as e:
+        return {"skipped": f"no screen to capture ({type(e).__name__})"}
+
+    from vision_service.capture import CaptureSession, MssBackend
+
+    def legacy():
+        with mss.mss() as sct:
+            return _legacy(sct.grab(REGION))
+
+    results = {"legacy": _timed(legacy, n)}
+    for mode in ("full", "rois"):
+        session = CaptureSession(MssBackend(), mode=mode, region=REGION)
+        session.read()
+        results[mode] = _timed(session.read, n)
+        session.close()
+    return {"ms_per_frame": results}
+
+
+def run(quick: bool = False) -> dict:
+    import cv2
+
+    from benchmarks.synthetic import chart_frames
+    from vision_service import ocr_pipeline as ocr
+
+    frames = chart_frames(10, cal={"left": 0, "top": 0, "width": REGION["width"], "height": REGION["height"]})
+    screens = [cv2.cvtColor(f, cv2.COLOR_BGR2BGRA) for f in frames]
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(REGION, f)
+    ocr._calibration = ocr.CalibrationWatcher(path)
+    try:
+        n = 100 if quick else 1000
+        return {"region": f"{REGION['width']}x{REGION['height']}",
+                "synthetic": _bench_modes(screens, frames, n), "live": _bench_live(n // 10)}
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
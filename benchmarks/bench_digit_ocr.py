@@ -0,0 +1,91 @@
+# benchmarks/bench_digit_ocr.py
+"""
+Accuracy and latency of the template digit recognizer against easyocr on
+the numeric (price / PnL) ROIs.
+
+Uses recorded frames from BENCH_FRAMES_DIR, with BENCH_CALIBRATION and a
+labels.json of ground truth (see benchmarks.synthetic.load_labels), when
+set; otherwise synthetic chart frames whose price/PnL change every frame.
+"digit+fallback" is what the pipeline does: the digit reader, with easyocr
+for ROIs below DIGIT_MIN_CONFIDENCE. Without easyocr only the digit row
+is measured.
+
+    python -m benchmarks.bench_digit_ocr
+"""
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import BENCH_CALIBRATION, chart_frames, load_frames, load_labels
+
+
+def _corpus(n: int):
+    directory = os.environ.get("BENCH_FRAMES_DIR")
+    if directory:
+        cal_path = os.environ.get("BENCH_CALIBRATION", "vision_service/calibration.json")
+        return load_frames(directory), load_labels(directory), cal_path
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(BENCH_CALIBRATION, f)
+    frames, labels = chart_frames(n, change_every=1, with_labels=True)
+    return frames, labels, path
+
+
+def _score(name, read, rois):
+    t0 = time.perf_counter()
+    texts = [read(roi) for roi, _ in rois]
+    elapsed = time.perf_counter() - t0
+
+    from vision_service.ocr_pipeline import extract_float
+
+    correct = sum(extract_float(t) == truth for t, (_, truth) in zip(texts, rois))
+    return name, {
+        "rois": len(rois),
+        "accuracy": round(correct / len(rois), 4),
+        "ms_per_roi": round(elapsed / len(rois) * 1000, 3),
+    }
+
+
+def run(quick: bool = False) -> dict:
+    from vision_service import ocr_pipeline as ocr
+    from vision_service.config import DIGIT_MIN_CONFIDENCE
+
+    frames, labels, cal_path = _corpus(50 if quick else 300)
+    calibration = ocr.CalibrationWatcher(cal_path)
+
+    rois = []
+    for frame, label in zip(frames, labels):
+        if label is None:
+            continue
+        slices = calibration.roi_slices(frame.shape)
+        for name, field in (("price", "last_price"), ("pnl", "pnl")):
+            if slices[name] is not None and label.get(field) is not None:
+                rois.append((ocr.preprocess(frame[slices[name]]), label[field]))
+
+    digits = ocr.get_digit_recognizer()
+    confidences = [digits.recognize(roi)[1] for roi, _ in rois]
+
+    def easy(roi):
+        return ocr.recognize_batch([roi])[0]
+
+    def with_fallback(roi):
+        text, confidence = digits.recognize(roi)
+        return text if confidence >= DIGIT_MIN_CONFIDENCE else easy(roi)
+
+    results = dict([_score("digit", lambda roi: digits.recognize(roi)[0], rois)])
+    results["digit"]["fallback_rate"] = round(sum(c < DIGIT_MIN_CONFIDENCE for c in confidences) / len(rois), 4)
+    try:
+        ocr.get_reader()  # model loading is not what is measured
+    except ImportError:
+        results["easyocr"] = results["digit+fallback"] = {"skipped": "easyocr is not installed"}
+        return results
+
+    results.update([_score("easyocr", easy, rois), _score("digit+fallback", with_fallback, rois)])
+    results["speedup"] = round(results["easyocr"]["ms_per_roi"] / results["digit+fallback"]["ms_per_roi"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,70 @@
+# benchmarks/bench_engine.py
+"""
+Signal engine hot paths on deterministic synthetic prices:
+  build_signals  - ms per call and bars/s for 1k to 1M bars of history
+  recommendation - get_recommendation_for_ticker for a 2y daily window
+                   through the price cache: cold (first fetch, Parquet
+                   write) and warm (served from the cached frame)
+
+Prices come from benchmarks.synthetic.SyntheticProvider, so no network is
+used.
+
+    python -m benchmarks.bench_engine
+"""
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import offline_price_store, random_walk_prices
+
+
+def _time(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    return {"mean_ms": round(float(times.mean()), 3), "min_ms": round(float(times.min()), 3)}
+
+
+def _bench_build_signals(n: int) -> dict:
+    from engine import build_signals
+
+    df = random_walk_prices(n, seed=n, freq="min")  # minute bars: 1M daily bars overflow pandas dates
+    r = _time(lambda: build_signals(df), repeat=max(3, min(20, 100_000 // n)))
+    r["bars_per_sec"] = round(n / (r["min_ms"] / 1000))
+    return r
+
+
+def _bench_recommendation(n_tickers: int) -> dict:
+    import price_store
+    from engine import get_recommendation_for_ticker
+    from model_registry import get_model
+
+    get_model()  # model loading is not what is measured
+    tickers = [f"SYN{i}" for i in range(n_tickers)]
+    with tempfile.TemporaryDirectory() as root:
+        offline_price_store(root=root)
+        results = {
+            "cold": _time(lambda: [get_recommendation_for_ticker(t) for t in tickers], repeat=1),
+            "warm": _time(lambda: [get_recommendation_for_ticker(t) for t in tickers], repeat=5),
+        }
+    for r in results.values():
+        r["per_ticker_ms"] = round(r.pop("min_ms") / n_tickers, 3)
+        del r["mean_ms"]
+    price_store.set_price_store(None)
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    sizes = (1_000, 10_000, 100_000) if quick else (1_000, 10_000, 100_000, 1_000_000)
+    results = {"build_signals": {f"{n}_bars": _bench_build_signals(n) for n in sizes}}
+    results["recommendation"] = _bench_recommendation(10 if quick else 50)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
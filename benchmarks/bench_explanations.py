@@ -0,0 +1,131 @@
+# benchmarks/bench_explanations.py
+"""
+Explanation cache hit rates and latency on a stream of recommendations for
+20 tickers whose RSI and signals drift slowly:
+  rag       - generate_rag_explanation, uncached vs cached
+  llm       - generate_llm_explanation against a local FakeOpenAIServer with
+              LLM_LATENCY seconds per completion, uncached vs cached (needs
+              the openai package)
+  disk      - KB hits cached in SQLite, then re-read by fresh caches as if
+              after a restart
+
+    python -m benchmarks.bench_explanations
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+LLM_LATENCY = 0.2
+REGIMES = ["Bull-Low-Vol", "Bull-High-Vol", "Bear", "Sideways"]
+
+
+def _recommendations(n: int, n_tickers: int = 20, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    rsi = rng.uniform(30, 70, n_tickers)
+    prob = rng.uniform(0.4, 0.6, n_tickers)
+    regime = rng.integers(0, len(REGIMES), n_tickers)
+    trend = rng.integers(0, 2, n_tickers)
+    recs = []
+    for i in range(n):
+        t = i % n_tickers
+        rsi[t] = np.clip(rsi[t] + rng.normal(0, 1.5), 5, 95)
+        prob[t] = np.clip(prob[t] + rng.normal(0, 0.01), 0, 1)
+        if rng.random() < 0.01:
+            regime[t] = rng.integers(0, len(REGIMES))
+        if rng.random() < 0.02:
+            trend[t] = 1 - trend[t]
+        rsi_signal = 1 if rsi[t] > 55 else -1 if rsi[t] < 45 else 0
+        action = "BUY" if trend[t] and rsi_signal == 1 else "SELL" if rsi_signal == -1 and not trend[t] else "NO TRADE"
+        recs.append({
+            "ticker": f"T{t:02d}",
+            "price": round(100 + rsi[t], 2),
+            "action": action,
+            "market_regime": REGIMES[regime[t]],
+            "rsi": round(float(rsi[t]), 2),
+            "trend_signal": int(trend[t]),
+            "rsi_signal": rsi_signal,
+            "breakout_signal": int(rng.random() < 0.05),
+            "ml_prob_profitable": round(float(prob[t]), 3),
+        })
+    return recs
+
+
+def _timed(fn, recs) -> float:
+    t0 = time.perf_counter()
+    for rec in recs:
+        fn(rec)
+    return (time.perf_counter() - t0) / len(recs) * 1000
+
+
+def _fresh_caches(path=None):
+    import rag_llm
+    from result_cache import ResultCache, SqliteTTLCache
+
+    def make(table):
+        return ResultCache(maxsize=1024, disk=SqliteTTLCache(path, table=table) if path else None)
+
+    rag_llm.kb_hits_cache = make("kb_hits")
+    rag_llm.llm_explanation_cache = make("llm_explanations")
+    return rag_llm
+
+
+def _bench_rag(recs) -> dict:
+    rag_llm = _fresh_caches()
+    rag_llm.warmup(llm=False)
+    uncached = _timed(lambda r: rag_llm.generate_rag_explanation(r, use_cache=False), recs)
+    cached = _timed(rag_llm.generate_rag_explanation, recs)
+    stats = rag_llm.kb_hits_cache.stats()
+    return {"uncached_ms": round(uncached, 3), "cached_ms": round(cached, 3),
+            "hit_rate": stats["hit_rate"], "distinct_states": stats["size"]}
+
+
+def _bench_llm(recs) -> dict:
+    from benchmarks.fake_openai import FakeOpenAIServer
+
+    with FakeOpenAIServer(latency=LLM_LATENCY) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        rag_llm = _fresh_caches()
+        rag_llm._client = None
+        if rag_llm.get_openai_client() is None:
+            return {"skipped": "openai is not installed"}
+
+        uncached = _timed(lambda r: rag_llm.generate_llm_explanation(r, use_cache=False), recs)
+        calls = server.requests
+        cached = _timed(rag_llm.generate_llm_explanation, recs)
+        stats = rag_llm.llm_explanation_cache.stats()
+        return {"uncached_ms": round(uncached, 2), "cached_ms": round(cached, 2), "hit_rate": stats["hit_rate"],
+                "completions_uncached": calls, "completions_cached": server.requests - calls}
+
+
+def _bench_disk(recs) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    try:
+        rag_llm = _fresh_caches(path)
+        first = _timed(rag_llm.generate_rag_explanation, recs)
+        rag_llm = _fresh_caches(path)  # empty memory tier, same file
+        after_restart = _timed(rag_llm.generate_rag_explanation, recs)
+        stats = rag_llm.kb_hits_cache.stats()
+        return {"first_pass_ms": round(first, 3), "after_restart_ms": round(after_restart, 3),
+                "disk_hits": stats["disk_hits"], "misses_after_restart": stats["misses"]}
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def run(quick: bool = False) -> dict:
+    recs = _recommendations(400 if quick else 4000)
+    return {
+        "rag": _bench_rag(recs),
+        "llm": _bench_llm(recs[:60] if quick else recs[:400]),
+        "disk": _bench_disk(recs),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,99 @@
+# benchmarks/bench_importtime.py
+"""
+Cold-start import cost of each entry point.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter per
+module and reports the module's cumulative import time plus the wall time
+of the whole process. The same is measured on a baseline revision
+(extracted with git archive) for a before/after comparison, with
+import_speedup = baseline import time / current import time per module.
+The baseline is --against, else BENCH_IMPORT_BASELINE, else the first
+commit of the repository (the tree before imports were deferred).
+
+    python -m benchmarks.bench_importtime [--against HEAD~1]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+ENTRY_POINTS = ["api", "backend.main", "app", "engine", "rag_llm", "vision_service.ocr_pipeline"]
+
+
+def _measure(module: str, cwd: str) -> Dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=cwd),
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1e6
+    return {"import_s": round(cumulative, 4) if cumulative is not None else None, "process_s": round(wall, 4)}
+
+
+def measure_tree(root: str, repeat: int = 1) -> Dict[str, Dict]:
+    """
+    Best of `repeat` runs per entry point in the source tree at `root`.
+    """
+    results = {}
+    for module in ENTRY_POINTS:
+        runs = [_measure(module, root) for _ in range(repeat)]
+        ok = [r for r in runs if "error" not in r]
+        results[module] = min(ok, key=lambda r: r["process_s"]) if ok else runs[0]
+    return results
+
+
+def _checkout(rev: str, into: str, root: str):
+    archive = subprocess.run(["git", "archive", rev], cwd=root, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", into], input=archive, check=True)
+
+
+def baseline_rev(root: str) -> Optional[str]:
+    rev = os.environ.get("BENCH_IMPORT_BASELINE")
+    if rev:
+        return rev
+    proc = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=root, capture_output=True, text=True)
+    return proc.stdout.split()[-1][:12] if proc.returncode == 0 and proc.stdout.strip() else None
+
+
+def run(quick: bool = False, against: Optional[str] = None) -> dict:
+    repeat = 1 if quick else 3
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {"current": measure_tree(root, repeat)}
+    against = against or baseline_rev(root)
+    if against is None:
+        results["baseline"] = {"skipped": "not a git checkout"}
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _checkout(against, tmp, root)
+        results["baseline"] = dict(measure_tree(tmp, repeat), rev=against)
+    results["vs_baseline"] = {}
+    for module, cur in results["current"].items():
+        before = results["baseline"][module]
+        if cur.get("import_s") and before.get("import_s"):
+            results["vs_baseline"][module] = {"import_speedup": round(before["import_s"] / cur["import_s"], 2)}
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--against", help="git revision to compare with (default: the baseline, see above)")
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(run(quick=args.quick, against=args.against), indent=2))
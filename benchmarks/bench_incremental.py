@@ -0,0 +1,64 @@
+# benchmarks/bench_incremental.py
+"""
+Streaming signal engine vs. full build_signals recompute per new bar.
+
+Also checks that IncrementalSignalEngine reproduces build_signals row for row
+over a long series before timing anything.
+
+    python -m benchmarks.bench_incremental
+"""
+import json
+import time
+
+import numpy as np
+
+from engine import build_signals
+from incremental import IncrementalSignalEngine
+from benchmarks.synthetic import random_walk_prices
+
+
+def check_parity(n: int = 20_000, rtol: float = 1e-9):
+    df = random_walk_prices(n, seed=1)
+    ref = build_signals(df)
+
+    eng = IncrementalSignalEngine()
+    rows = [eng.on_bar(float(c), ts) for ts, c in df["close_price"].items()]
+
+    for i, row in enumerate(rows):
+        expected = ref.iloc[i]
+        for col in ref.columns:
+            a, b = expected[col], row[col]
+            if col == "market_regime":
+                assert a == b, (i, col, a, b)
+            elif np.isnan(float(a)) or np.isnan(float(b)):
+                assert np.isnan(float(a)) and np.isnan(float(b)), (i, col, a, b)
+            else:
+                assert np.isclose(float(a), float(b), rtol=rtol, atol=1e-9), (i, col, a, b)
+
+
+def run(quick: bool = False) -> dict:
+    check_parity(2_000 if quick else 20_000)
+
+    results = {}
+    for n in ([500, 2_000] if quick else [500, 2_000, 10_000, 50_000]):
+        df = random_walk_prices(n + 200, seed=2)
+        history, new = df.iloc[:n], df.iloc[n:]
+
+        # Full recompute: rebuild every feature over the whole history per bar
+        t0 = time.perf_counter()
+        for i in range(20):
+            build_signals(df.iloc[: n + i + 1])
+        full_us = (time.perf_counter() - t0) / 20 * 1e6
+
+        eng = IncrementalSignalEngine.from_price_df(history)
+        t0 = time.perf_counter()
+        for ts, close in new["close_price"].items():
+            eng.on_tick(float(close), ts)
+        inc_us = (time.perf_counter() - t0) / len(new) * 1e6
+
+        results[f"history_{n}"] = {"full_recompute_us": round(full_us, 1), "incremental_us": round(inc_us, 1)}
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
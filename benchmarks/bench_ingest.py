@@ -0,0 +1,110 @@
+# benchmarks/bench_ingest.py
+"""
+Ingest latency while snapshot analyses run.
+
+Posts snapshots for many symbols to /ingest/market_snapshot in-process and
+records per-request latency plus event-loop lag. Price history comes from a
+deliberately slow in-memory provider, so every first analysis of a symbol
+blocks for `fetch_delay` seconds. The "inline" mode runs the analysis on the
+event loop, as the endpoint used to; "executor" is the current code path.
+
+    python -m benchmarks.bench_ingest
+"""
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+import price_store
+from benchmarks.synthetic import random_walk_prices
+
+
+class SlowProvider(price_store.InMemoryProvider):
+    def __init__(self, frames, delay):
+        super().__init__(frames)
+        self.delay = delay
+
+    def fetch(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return super().fetch(*args, **kwargs)
+
+
+def _pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2) if values else None
+
+
+async def _drive(app, symbols, n_requests, rate_hz, inline):
+    from backend import main as backend
+
+    lags = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t0 - 0.005)
+
+    hb = asyncio.create_task(heartbeat())
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(n_requests):
+            symbol = symbols[i % len(symbols)]
+            snap = {
+                "source": "bench",
+                "symbol": symbol,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "last_price": 100.0 + i % 7,
+            }
+            t0 = time.perf_counter()
+            if inline:
+                # Old behaviour: broadcast + blocking analysis inside the handler
+                await backend.broadcast_snapshot(snap)
+                backend.run_analysis(backend.MarketSnapshot(**snap))
+            else:
+                await client.post("/ingest/market_snapshot", json=snap)
+            latencies.append(time.perf_counter() - t0)
+            await asyncio.sleep(1 / rate_hz)
+
+    # let queued analyses finish before their price cache directory goes away
+    while True:
+        c = backend.engine_executor.stats()
+        if c["submitted"] == c["completed"] + c["failed"] + c["superseded"] + c["rejected"]:
+            break
+        await asyncio.sleep(0.01)
+    stop.set()
+    await hb
+    return latencies, lags
+
+
+def run(quick: bool = False, fetch_delay: float = 0.2) -> dict:
+    from backend import main as backend
+    import incremental
+
+    n_symbols = 8 if quick else 32
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    frames = {s: random_walk_prices(600, seed=i).rename(columns={"close_price": "Close"}) for i, s in enumerate(symbols)}
+
+    results = {}
+    for mode in ("inline", "executor"):
+        incremental._engines.clear()
+        with tempfile.TemporaryDirectory() as root:
+            price_store.set_price_store(price_store.PriceStore(root, SlowProvider(frames, fetch_delay)))
+            lat, lags = asyncio.run(_drive(backend.app, symbols, n_symbols * 4, 100, inline=(mode == "inline")))
+        results[mode] = {
+            "ingest_p50_ms": _pct(lat, 50),
+            "ingest_p99_ms": _pct(lat, 99),
+            "loop_lag_p99_ms": _pct(lags, 99),
+        }
+    results["executor"]["stats"] = backend.engine_executor.stats()
+    price_store.set_price_store(None)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
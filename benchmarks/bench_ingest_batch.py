@@ -0,0 +1,122 @@
+# benchmarks/bench_ingest_batch.py
+"""
+Snapshot ingest throughput (snapshots/s) by wire format, in-process through
+the ASGI app:
+  single  - one JSON POST per snapshot to /ingest/market_snapshot
+  json    - JSON arrays to /ingest/market_snapshots (a model per snapshot)
+  ndjson  - NDJSON batches, decoded into columns
+  struct  - the fixed binary record layout of backend/snapshot_codec.py
+  arrow   - Arrow IPC streams (needs pyarrow)
+Batched modes post BATCH snapshots per request. `decode` times the decoders
+alone, and payload bytes per snapshot are reported for each format.
+
+Analyses run against an in-memory price history, so no network is used.
+
+    python -m benchmarks.bench_ingest_batch
+"""
+import asyncio
+import json
+import tempfile
+import time
+
+import httpx
+
+import price_store
+from benchmarks.synthetic import random_walk_prices
+
+BATCH = 256
+N_SYMBOLS = 16
+
+
+def _snapshots(n: int):
+    t0 = 1_700_000_000.0
+    return [
+        {
+            "source": "bench",
+            "symbol": f"SYM{i % N_SYMBOLS}",
+            "timeframe": "1m",
+            "timestamp": t0 + i * 0.01,
+            "last_price": 100.0 + (i % 97) * 0.05,
+            "pnl": float(i % 13) - 6,
+            "position_size": None,
+        }
+        for i in range(n)
+    ]
+
+
+def _bodies(snapshots, fmt: str):
+    from backend import snapshot_codec as codec
+
+    batches = [snapshots[i:i + BATCH] for i in range(0, len(snapshots), BATCH)]
+    if fmt == "json":
+        return [(json.dumps(b).encode(), "application/json") for b in batches]
+    content_type = {"ndjson": codec.NDJSON, "struct": codec.STRUCT, "arrow": codec.ARROW}[fmt]
+    return [(codec.ENCODERS[content_type](b), content_type) for b in batches]
+
+
+async def _post_all(app, fmt: str, snapshots) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if fmt == "single":
+            bodies = [(json.dumps(s).encode(), "/ingest/market_snapshot") for s in snapshots]
+            t0 = time.perf_counter()
+            for body, path in bodies:
+                resp = await client.post(path, content=body, headers={"Content-Type": "application/json"})
+                resp.raise_for_status()
+        else:
+            bodies = _bodies(snapshots, fmt)
+            t0 = time.perf_counter()
+            for body, content_type in bodies:
+                resp = await client.post("/ingest/market_snapshots", content=body,
+                                          headers={"Content-Type": content_type})
+                resp.raise_for_status()
+        return time.perf_counter() - t0
+
+
+def _bench_decode(snapshots) -> dict:
+    from backend import snapshot_codec as codec
+
+    results = {}
+    for fmt in ("ndjson", "struct", "arrow"):
+        bodies = _bodies(snapshots, fmt)
+        t0 = time.perf_counter()
+        for body, content_type in bodies:
+            codec.decode(body, content_type)
+        elapsed = time.perf_counter() - t0
+        results[fmt] = {
+            "snapshots_per_sec": round(len(snapshots) / elapsed),
+            "bytes_per_snapshot": round(sum(len(b) for b, _ in bodies) / len(snapshots), 1),
+        }
+    results["json"] = {"bytes_per_snapshot": round(
+        sum(len(b) for b, _ in _bodies(snapshots, "json")) / len(snapshots), 1)}
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    from backend import main as backend
+    from backend.snapshot_store import SnapshotStore
+    import incremental
+
+    n = 2_000 if quick else 20_000
+    snapshots = _snapshots(n)
+    frames = {f"SYM{i}": random_walk_prices(600, seed=i).rename(columns={"close_price": "Close"})
+              for i in range(N_SYMBOLS)}
+
+    results = {"decode": _bench_decode(snapshots), "ingest": {}}
+    with tempfile.TemporaryDirectory() as root:
+        price_store.set_price_store(price_store.PriceStore(root, price_store.InMemoryProvider(frames)))
+        for fmt in ("single", "json", "ndjson", "struct", "arrow"):
+            incremental._engines.clear()
+            backend.SNAPSHOT_STORE = SnapshotStore(capacity=n)
+            count = n // 10 if fmt == "single" else n  # one request per snapshot is slow
+            elapsed = asyncio.run(_post_all(backend.app, fmt, snapshots[:count]))
+            results["ingest"][fmt] = {
+                "snapshots_per_sec": round(count / elapsed),
+                "stored": backend.SNAPSHOT_STORE.stats()["snapshots"],
+            }
+    price_store.set_price_store(None)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,107 @@
+# benchmarks/bench_llm_service.py
+"""
+The async explanation service against a local FakeOpenAIServer (LATENCY
+seconds per completion):
+  sequential  - N distinct completions awaited one after another, as a
+                blocking handler serves them
+  concurrent  - the same N at once, CONCURRENCY in flight
+  coalesced   - N identical prompts at once (one upstream request)
+  retries     - N distinct completions with 30% of requests failing (503)
+  deadline    - completions slower than their deadline
+  stream      - time to first delta vs the whole streamed completion
+
+    python -m benchmarks.bench_llm_service
+"""
+import asyncio
+import json
+import time
+
+LATENCY = 0.1
+CONCURRENCY = 8
+
+
+def _messages(i: int):
+    return [{"role": "user", "content": f"Explain setup {i} in a few words please"}]
+
+
+async def _gather(service, prompts, deadline=None):
+    results = await asyncio.gather(*(service.complete(m, deadline) for m in prompts), return_exceptions=True)
+    return [r for r in results if isinstance(r, BaseException)]
+
+
+async def _warm(service):
+    """
+    One untimed request, so timings exclude building the HTTP client.
+    """
+    await service.complete([{"role": "user", "content": "warmup"}])
+    service.counters.update(dict.fromkeys(service.counters, 0))
+
+
+async def _scenario(server, prompts, deadline=None, **kwargs) -> dict:
+    from llm_service import ExplanationService
+
+    service = ExplanationService(base_url=server.base_url, api_key="fake", concurrency=CONCURRENCY,
+                                 backoff=0.02, **kwargs)
+    await _warm(service)
+    served = server.requests
+    t0 = time.perf_counter()
+    errors = await _gather(service, prompts, deadline)
+    elapsed = time.perf_counter() - t0
+    await service.aclose()
+    stats = service.stats()
+    return {"wall_s": round(elapsed, 3), "errors": len(errors), "upstream_requests": server.requests - served,
+            "retries": stats["retries"], "coalesced": stats["coalesced"]}
+
+
+async def _sequential(server, n: int) -> dict:
+    from llm_service import ExplanationService
+
+    service = ExplanationService(base_url=server.base_url, api_key="fake", concurrency=1)
+    await _warm(service)
+    t0 = time.perf_counter()
+    for i in range(n):
+        await service.complete(_messages(i))
+    elapsed = time.perf_counter() - t0
+    await service.aclose()
+    return {"wall_s": round(elapsed, 3)}
+
+
+async def _stream(server) -> dict:
+    from llm_service import ExplanationService
+
+    service = ExplanationService(base_url=server.base_url, api_key="fake")
+    await _warm(service)
+    t0 = time.perf_counter()
+    first, deltas = None, 0
+    async for _ in service.stream(_messages(0)):
+        if first is None:
+            first = time.perf_counter() - t0
+        deltas += 1
+    total = time.perf_counter() - t0
+    await service.aclose()
+    return {"first_delta_ms": round(first * 1000, 1), "total_ms": round(total * 1000, 1), "deltas": deltas}
+
+
+async def _run(n: int) -> dict:
+    from benchmarks.fake_openai import FakeOpenAIServer
+
+    results = {}
+    with FakeOpenAIServer(latency=LATENCY) as server:
+        results["sequential"] = await _sequential(server, n)
+        results["concurrent"] = await _scenario(server, [_messages(i) for i in range(n)])
+        results["coalesced"] = await _scenario(server, [_messages(0)] * n)
+        results["deadline"] = await _scenario(server, [_messages(i) for i in range(CONCURRENCY)],
+                                              deadline=LATENCY / 2)
+    with FakeOpenAIServer(latency=LATENCY, fail_rate=0.3) as server:
+        results["retries"] = await _scenario(server, [_messages(i) for i in range(n)])
+    with FakeOpenAIServer(latency=LATENCY, token_delay=0.01) as server:
+        results["stream"] = await _stream(server)
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    return asyncio.run(_run(16 if quick else 64))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
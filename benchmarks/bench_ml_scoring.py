@@ -0,0 +1,133 @@
+# benchmarks/bench_ml_scoring.py
+"""
+ML scoring in recommendations: one predict_proba call per row (what
+make_recommendation does on its own) vs one call per batch.
+
+  registry   - joblib load of the model file, plain vs memory-mapped, and a
+               cached ModelRegistry.get()
+  tickers    - latest rows of a universe (taken from a signal panel):
+               per-row make_recommendation, make_recommendations, and
+               recommendations_from_panel (features read straight from
+               the panel arrays)
+  history    - every date of one ticker: per-row loop vs score_history
+
+Models are fitted on synthetic random-walk signals (label: next 5 bars up).
+
+    python -m benchmarks.bench_ml_scoring
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLS = ["return", "trend_strength", "volatility", "rsi", "trend_signal", "rsi_signal", "breakout_signal"]
+
+
+def _fit_models(seed: int = 0) -> dict:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    from benchmarks.bench_panel import random_panel
+    from engine import REQUIRED_SIGNAL_COLS, build_signals
+
+    closes = random_panel(3000, 1, seed=seed)[:, 0]
+    sig = build_signals(pd.DataFrame({"close_price": closes})).dropna(subset=REQUIRED_SIGNAL_COLS)
+    X = sig[FEATURE_COLS].to_numpy(dtype=float)[:-5]
+    y = (sig["close_price"].shift(-5) > sig["close_price"]).to_numpy()[:-5]
+    return {
+        "random_forest": RandomForestClassifier(n_estimators=100, max_depth=8, random_state=seed).fit(X, y),
+        "logistic": LogisticRegression(max_iter=1000).fit(X, y),
+    }
+
+
+def _per_sec(n: int, fn) -> float:
+    return round(n / _ms(fn) * 1000, 1)
+
+
+def _bench_registry(path: str) -> dict:
+    import joblib
+
+    from model_registry import ModelRegistry
+
+    t0 = time.perf_counter()
+    joblib.load(path)
+    plain = time.perf_counter() - t0
+
+    registry = ModelRegistry(mmap_mode="r")
+    t0 = time.perf_counter()
+    registry.get(path)
+    mapped = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        registry.get(path)
+    cached = (time.perf_counter() - t0) / 1000
+    return {"load_ms": round(plain * 1000, 2), "mmap_load_ms": round(mapped * 1000, 2),
+            "cached_get_us": round(cached * 1e6, 2), "file_mb": round(os.path.getsize(path) / 1e6, 2)}
+
+
+def _bench_tickers(model, n_tickers: int) -> dict:
+    from benchmarks.bench_panel import random_panel
+    from engine import make_recommendation, make_recommendations
+    from panel import build_signals_panel, recommendations_from_panel
+
+    panel = build_signals_panel(random_panel(504, n_tickers, seed=1))
+    tickers = panel.tickers
+
+    single = [make_recommendation(panel.row(t), ml_model=model)["ml_prob_profitable"] for t in tickers[:50]]
+    batched = [r["ml_prob_profitable"] for r in recommendations_from_panel(panel, ml_model=model)[:50]]
+    assert np.allclose(single, batched)
+
+    n_single = min(n_tickers, 200)  # one call per row is slow
+    return {
+        "per_row_rows_per_sec": _per_sec(
+            n_single, lambda: [make_recommendation(panel.row(t), ml_model=model) for t in tickers[:n_single]]
+        ),
+        "batched_rows_per_sec": _per_sec(
+            n_tickers, lambda: make_recommendations([panel.row(t) for t in tickers], ml_model=model)
+        ),
+        "panel_rows_per_sec": _per_sec(n_tickers, lambda: recommendations_from_panel(panel, ml_model=model)),
+    }
+
+
+def _bench_history(model) -> dict:
+    from benchmarks.bench_panel import random_panel
+    from engine import REQUIRED_SIGNAL_COLS, build_signals, score_history
+
+    sig = build_signals(pd.DataFrame({"close_price": random_panel(504, 1, seed=2)[:, 0]}))
+    sig = sig.dropna(subset=REQUIRED_SIGNAL_COLS)
+    X = sig[FEATURE_COLS].to_numpy(dtype=float)
+    return {
+        "dates": len(sig),
+        "per_row_ms": round(_ms(lambda: [model.predict_proba(x.reshape(1, -1)) for x in X]), 2),
+        "score_history_ms": round(_ms(lambda: score_history(sig, model)), 2),
+    }
+
+
+def _ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def run(quick: bool = False) -> dict:
+    from model_registry import ModelRegistry, save_model
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, estimator in _fit_models().items():
+            path = os.path.join(tmp, f"{name}.joblib")
+            save_model(estimator, FEATURE_COLS, path)
+            model = ModelRegistry().get(path)
+            results[name] = {
+                "registry": _bench_registry(path),
+                "tickers": _bench_tickers(model, 500 if quick else 2000),
+                "history": _bench_history(model),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,83 @@
+# benchmarks/bench_ocr.py
+"""
+OCR pipeline throughput on a frame sequence:
+  detect         - readtext (detector + recognizer) per ROI, every frame
+  recognize      - one recognize call over the known ROI boxes per frame
+                   (no text detector)
+  recognize_x4   - the same, four frames per call
+  change_detect  - recognize_x4, skipping ROIs that have not changed
+
+Uses recorded frames from BENCH_FRAMES_DIR (plus BENCH_CALIBRATION, a
+calibration.json for them) when set, otherwise synthetic chart frames whose
+price/PnL change every fifth frame. Needs easyocr.
+
+    python -m benchmarks.bench_ocr
+"""
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import BENCH_CALIBRATION, chart_frames, load_frames
+
+
+def _frames_and_calibration(n: int):
+    directory = os.environ.get("BENCH_FRAMES_DIR")
+    if directory:
+        return load_frames(directory), os.environ.get("BENCH_CALIBRATION", "vision_service/calibration.json")
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(BENCH_CALIBRATION, f)
+    return chart_frames(n), path
+
+
+ALWAYS = {"symbol": None, "price": None, "pnl": None}
+
+
+def _measure(ocr, frames, thresholds, mode, batch):
+    ocr._detector = ocr.RoiChangeDetector(thresholds)
+    ocr._ocr_cache.clear()
+    ocr.OCR_STATS.update(dict.fromkeys(ocr.OCR_STATS, 0))
+
+    t0 = time.perf_counter()
+    snapshots = []
+    for i in range(0, len(frames), batch):
+        snapshots.extend(ocr.parse_frames_to_snapshots(frames[i:i + batch], mode))
+    elapsed = time.perf_counter() - t0
+    return snapshots, {
+        "fps": round(len(frames) / elapsed, 2),
+        "ms_per_frame": round(elapsed / len(frames) * 1000, 2),
+        **ocr.OCR_STATS,
+    }
+
+
+def run(quick: bool = False) -> dict:
+    from vision_service import ocr_pipeline as ocr
+
+    frames, cal_path = _frames_and_calibration(20 if quick else 100)
+    ocr._calibration = ocr.CalibrationWatcher(cal_path)
+
+    runs = {
+        "detect": (ALWAYS, "detect", 1),
+        "recognize": (ALWAYS, "recognize", 1),
+        "recognize_x4": (ALWAYS, "recognize", 4),
+        "change_detect": (None, "recognize", 4),
+    }
+    out = {"frames": len(frames)}
+    snapshots = {}
+    for name, args in runs.items():
+        snapshots[name], out[name] = _measure(ocr, frames, *args)
+
+    baseline = snapshots["detect"]
+    for name in runs:
+        out[name]["speedup"] = round(out[name]["fps"] / out["detect"]["fps"], 2)
+        out[name]["snapshots_matching_detect"] = sum(
+            a["last_price"] == b["last_price"] and a["pnl"] == b["pnl"] and a["symbol"] == b["symbol"]
+            for a, b in zip(baseline, snapshots[name])
+        )
+    return out
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,48 @@
+# benchmarks/bench_panel.py
+"""
+Panel-wide build_signals_panel vs. per-ticker build_signals.
+
+Reports tickers per second for a 2y daily history (504 bars) at several
+universe sizes, on one core.
+
+    python -m benchmarks.bench_panel
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import build_signals
+from panel import build_signals_panel
+
+
+def random_panel(bars: int, tickers: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.015, (bars, tickers)), axis=0))
+
+
+def run(quick: bool = False, bars: int = 504) -> dict:
+    results = {}
+
+    closes = random_panel(bars, 50)
+    t0 = time.perf_counter()
+    for j in range(closes.shape[1]):
+        build_signals(pd.DataFrame({"close_price": closes[:, j]}))
+    per_ticker = (time.perf_counter() - t0) / closes.shape[1]
+    results["per_ticker_build_signals"] = {"tickers_per_sec": round(1 / per_ticker, 1)}
+
+    for n in ([500, 2_000] if quick else [500, 2_000, 5_000, 10_000]):
+        closes = random_panel(bars, n, seed=n)
+        build_signals_panel(closes)  # warm up allocator
+        t0 = time.perf_counter()
+        reps = 3
+        for _ in range(reps):
+            build_signals_panel(closes)
+        elapsed = (time.perf_counter() - t0) / reps
+        results[f"panel_{n}"] = {"seconds": round(elapsed, 4), "tickers_per_sec": round(n / elapsed, 1)}
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
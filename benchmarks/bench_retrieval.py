@@ -0,0 +1,106 @@
+# benchmarks/bench_retrieval.py
+"""
+Knowledge-base retrieval on synthetic corpora of 10k-100k paragraph chunks
+(Zipf-distributed vocabulary, ten chunks per file):
+  build         - tokenize and index the KB directory from scratch
+  load          - memory-map the persisted index in a fresh KnowledgeIndex
+  full_argsort  - score every chunk with a sparse mat-vec, then argsort all
+                  scores, as retrieval used to do per document
+  postings      - KnowledgeIndex.search: query-term postings + argpartition
+
+    python -m benchmarks.bench_retrieval
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+VOCAB = 20_000
+WORDS_PER_CHUNK = 60
+CHUNKS_PER_FILE = 10
+
+
+def _write_corpus(directory: str, n_chunks: int, rng) -> np.ndarray:
+    p = 1.0 / np.arange(1, VOCAB + 1)
+    p /= p.sum()
+    words = np.array([f"term{i}" for i in range(VOCAB)])
+    tokens = words[rng.choice(VOCAB, size=(n_chunks, WORDS_PER_CHUNK), p=p)]
+    for start in range(0, n_chunks, CHUNKS_PER_FILE):
+        paragraphs = [" ".join(row) + "." for row in tokens[start:start + CHUNKS_PER_FILE]]
+        with open(os.path.join(directory, f"doc{start // CHUNKS_PER_FILE:06d}.md"), "w") as f:
+            f.write("\n\n".join(paragraphs))
+    return p
+
+
+def _queries(p: np.ndarray, n: int, rng):
+    words = rng.choice(VOCAB, size=(n, 4), p=p)
+    return [" ".join(f"term{i}" for i in row) for row in words]
+
+
+def _full_argsort(index, matrix, query: str, k: int):
+    import scipy.sparse as sp
+
+    cols, weights = index.query_terms(query)
+    q = sp.csr_matrix((weights, cols, [0, len(cols)]), shape=(1, index.postings.shape[1]))
+    scores = (matrix @ q.T).toarray().ravel()
+    return scores.argsort()[::-1][:k]
+
+
+def _time_queries(fn, queries) -> dict:
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    return {"mean_ms": round(float(times.mean()), 3), "p95_ms": round(float(np.percentile(times, 95)), 3)}
+
+
+def _bench_size(n_chunks: int, n_queries: int, k: int = 5) -> dict:
+    from kb_index import KnowledgeIndex
+
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp(prefix="bench_kb_")
+    try:
+        kb_dir, index_dir = os.path.join(root, "kb"), os.path.join(root, "index")
+        os.makedirs(kb_dir)
+        p = _write_corpus(kb_dir, n_chunks, rng)
+
+        t0 = time.perf_counter()
+        KnowledgeIndex(kb_dir, index_dir).load_or_build()
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        index = KnowledgeIndex(kb_dir, index_dir, check_every=float("inf"))  # no directory rescans
+        index.load()
+        load_s = time.perf_counter() - t0
+
+        queries = _queries(p, n_queries, rng)
+        matrix = index.postings.tocsr()
+        return {
+            "chunks": int(index.postings.shape[0]),
+            "terms": int(index.postings.shape[1]),
+            "build_s": round(build_s, 2),
+            "load_ms": round(load_s * 1000, 2),
+            "full_argsort": _time_queries(lambda q: _full_argsort(index, matrix, q, k), queries),
+            "postings": _time_queries(lambda q: index.search(q, k), queries),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def run(quick: bool = False) -> dict:
+    sizes = (10_000,) if quick else (10_000, 30_000, 100_000)
+    results = {}
+    for n in sizes:
+        r = _bench_size(n, 50 if quick else 200)
+        r["speedup"] = round(r["full_argsort"]["mean_ms"] / r["postings"]["mean_ms"], 2)
+        results[f"{n}_chunks"] = r
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
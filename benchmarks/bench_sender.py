@@ -0,0 +1,109 @@
+# benchmarks/bench_sender.py
+"""
+Per-snapshot transport overhead of the vision sender against a local backend.
+
+Starts backend.main under uvicorn on a free local port and pushes snapshots
+with no symbol (so no analysis runs) through:
+  legacy     - a fresh requests.post plus a new event loop and websocket
+               connection per snapshot, as send_snapshot used to do
+  http       - SnapshotSender over one pooled session
+  http_batch - the same, 16 snapshots per request to /ingest/market_snapshots
+  ws         - SnapshotSender over one persistent websocket
+  ws_batch   - the same, 16 snapshots per message
+
+    python -m benchmarks.bench_sender
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_backend(port: int):
+    import uvicorn
+
+    from backend.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+def _snapshot(i: int) -> dict:
+    return {
+        "source": "bench",
+        "symbol": None,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "last_price": 100.0 + i % 7,
+        "pnl": 1.5,
+    }
+
+
+def _legacy_send(url: str, snapshot: dict):
+    import websockets
+
+    requests.post(f"{url}/ingest/market_snapshot", json=snapshot, timeout=1)
+
+    async def send_ws():
+        async with websockets.connect(url.replace("http", "ws", 1) + "/ws/vision") as ws:
+            await ws.send(json.dumps(snapshot))
+
+    try:
+        asyncio.run(send_ws())
+    except Exception:
+        pass
+
+
+def _bench_sender(url: str, n: int, **kwargs) -> dict:
+    from vision_service.sender import SnapshotSender
+
+    sender = SnapshotSender(backend_url=url, batch_wait=0.002, **kwargs)
+    t0 = time.perf_counter()
+    for i in range(n):
+        sender.send(_snapshot(i))
+    sender.flush()
+    elapsed = time.perf_counter() - t0
+    stats = sender.stats()
+    sender.close()
+    return {"per_snapshot_us": round(elapsed / n * 1e6, 1), "requests": stats["requests"], "dropped": stats["dropped"]}
+
+
+def run(quick: bool = False) -> dict:
+    n = 200 if quick else 2000
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    server, thread = _start_backend(port)
+
+    results = {}
+    try:
+        n_legacy = max(20, n // 10)  # a connection per snapshot is slow
+        t0 = time.perf_counter()
+        for i in range(n_legacy):
+            _legacy_send(url, _snapshot(i))
+        results["legacy"] = {"per_snapshot_us": round((time.perf_counter() - t0) / n_legacy * 1e6, 1), "requests": n_legacy}
+
+        results["http"] = _bench_sender(url, n, transport="http", queue_size=n)
+        results["http_batch"] = _bench_sender(url, n, transport="http", batch_size=16, queue_size=n)
+        results["ws"] = _bench_sender(url, n, transport="ws", queue_size=n)
+        results["ws_batch"] = _bench_sender(url, n, transport="ws", batch_size=16, queue_size=n)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,102 @@
+# benchmarks/bench_signals.py
+"""
+Pushing recommendations to websocket clients as they change.
+
+TICKERS tickers are re-analysed UPDATE_HZ times a second each (price and
+RSI move every time, the action now and then); every client follows
+SUBSCRIBED of them. Compared over DURATION seconds:
+  broadcast  - every full recommendation published to every client (what a
+               client of the old global signal would need)
+  deltas     - SignalHub: per-ticker subscriptions, changed fields only,
+               coalesced to at most SIGNAL_PUSH_RATE messages per client/s
+Reports messages and bytes delivered, and process CPU time for publishing
+and sending everything.
+
+    python -m benchmarks.bench_signals
+"""
+import asyncio
+import json
+import random
+import time
+
+TICKERS = 50
+SUBSCRIBED = 5
+UPDATE_HZ = 5
+DURATION = 2.0
+PUSH_RATE = 2.0
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes += len(text)
+
+    async def close(self):
+        pass
+
+
+def _rec(ticker: str, i: int, rng: random.Random) -> dict:
+    price = 100 + rng.random()
+    return {
+        "price": price, "market_regime": "Bull-Low-Vol", "rsi": 50 + rng.random() * 10,
+        "trend_signal": 1, "rsi_signal": 0, "breakout_signal": 0, "signal_sum": 1.0, "signal_count": 1.0,
+        "action": "BUY / LONG" if (i // 20) % 2 else "HOLD / NO TRADE", "confidence_score": 0.5,
+        "ml_prob_profitable": None, "ticker": ticker, "period_used": "2y", "interval_used": "1d",
+    }
+
+
+async def _run(mode: str, n_clients: int) -> dict:
+    from backend.broadcast import Broadcaster
+    from backend.signals import SignalHub
+
+    rng = random.Random(0)
+    tickers = [f"T{i}" for i in range(TICKERS)]
+    broadcaster = Broadcaster(queue_size=1024)
+    hub = SignalHub(broadcaster, max_rate=PUSH_RATE)
+    clients = [FakeWebSocket() for _ in range(n_clients)]
+    for ws in clients:
+        broadcaster.register(ws, snapshots=(mode == "broadcast"))
+        if mode == "deltas":
+            hub.subscribe(ws, rng.sample(tickers, SUBSCRIBED))
+
+    updates, i = 0, 0
+    cpu0 = time.process_time()
+    end = time.perf_counter() + DURATION
+    while time.perf_counter() < end:
+        for ticker in tickers:
+            rec = _rec(ticker, i, rng)
+            if mode == "broadcast":
+                broadcaster.publish({"type": "signal", "signal": rec})
+            else:
+                hub.update(ticker, rec)
+            updates += 1
+        i += 1
+        await asyncio.sleep(1 / UPDATE_HZ)
+    await asyncio.sleep(1 / PUSH_RATE + 0.05)  # last coalesced pushes
+    while broadcaster.stats()["queue_depth_total"]:
+        await asyncio.sleep(0.01)
+    cpu = time.process_time() - cpu0
+
+    for ws in clients:
+        broadcaster.unregister(ws)
+    return {
+        "updates": updates,
+        "messages": sum(c.messages for c in clients),
+        "kb_sent": round(sum(c.bytes for c in clients) / 1024, 1),
+        "cpu_ms": round(cpu * 1000, 1),
+    }
+
+
+def run(quick: bool = False) -> dict:
+    results = {}
+    for n in ([50] if quick else [50, 500]):
+        results[f"clients_{n}"] = {mode: asyncio.run(_run(mode, n)) for mode in ("broadcast", "deltas")}
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,144 @@
+# benchmarks/fake_openai.py
+"""
+Local stand-in for the OpenAI chat completions API, so LLM code paths can
+be exercised and timed without network access or an API key.
+
+    with FakeOpenAIServer(latency=0.2) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...
+        server.requests  # completions served so far
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients giving up is expected
+            super().handle_error(request, client_address)
+
+
+class FakeOpenAIServer:
+    """
+    Answers POST /v1/chat/completions after `latency` seconds with a canned
+    completion that echoes the start of the last user message. With
+    "stream": true the completion is sent as server-sent-event chunks, one
+    word every `token_delay` seconds. A `fail_rate` share of requests is
+    answered with 503 instead, to exercise client retries.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        token_delay: float = 0.0,
+        fail_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    failed = fake._random.random() < fake.fail_rate
+                    if failed:
+                        fake.failures += 1
+                if failed:
+                    self._send_json(503, {"error": {"message": "overloaded", "type": "server_error"}})
+                    return
+                time.sleep(fake.latency)
+
+                prompt = next((m["content"] for m in reversed(body.get("messages", [])) if m["role"] == "user"), "")
+                content = f"[fake completion] {prompt[:80]}"
+                if body.get("stream"):
+                    self._stream(body, content)
+                    return
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{fake.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20,
+                              "total_tokens": len(prompt) // 4 + 20},
+                })
+
+            def _send_json(self, status, obj):
+                payload = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": f"chatcmpl-fake-{fake.requests}",
+                        "object": "chat.completion.chunk",
+                        "model": body.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                     "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,335 @@
+# benchmarks/run.py
+"""
+Run the benchmark suite, store the results and compare them with a baseline.
+
+Every benchmarks/bench_*.py module runs in a fresh interpreter (so caches,
+globals and crashes don't leak from one bench into the next) with a
+SyntheticProvider price store installed and yfinance blocked, so nothing
+reaches the network. All results go to one JSON file:
+    {"meta": {...}, "results": {"bench_x": <run() output> | {"error": ...}}}
+
+    python -m benchmarks.run [--quick] [--only engine,retrieval] [--out FILE]
+    python -m benchmarks.run --quick --save-baseline    # store as the baseline
+    python -m benchmarks.run --quick --baseline         # compare; exit 1 on regressions
+    python -m benchmarks.run --only engine --profile cprofile
+
+Comparison matches numeric results by path. Timings (*_ms, ms_*, *_s, ...) and
+sizes (*bytes*, *_kb) should not go up, rates (*per_sec, fps, speedup)
+should not go down; a change worse than --threshold is a regression, as is
+a bench that fails but did not in the baseline. Counts and other numbers are
+not compared.
+
+--profile writes one profile per bench to --profile-dir. Only the main
+thread is profiled, generators resumed on other threads (streamed responses
+in bench_api) can garble cProfile's call tree, and timings measured under a
+profiler are not comparable. Output per mode:
+  cprofile     <bench>.prof for pstats/snakeviz and <bench>.collapsed,
+               folded stacks in microseconds for flamegraph.pl or speedscope
+  pyinstrument <bench>.speedscope.json (needs pyinstrument installed)
+"""
+import argparse
+import datetime
+import glob
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.environ.get("BENCH_RESULTS_DIR", os.path.join(ROOT, ".cache", "benchmarks"))
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+THRESHOLD = 0.25  # relative change that counts as a regression
+
+HIGHER_IS_BETTER = ("per_sec", "fps", "speedup", "hit_rate")
+LOWER_IS_BETTER = ("_ms", "_us", "_s", "_kb", "_mb")
+
+
+def discover() -> List[str]:
+    return sorted(os.path.basename(p)[:-3] for p in glob.glob(os.path.join(ROOT, "benchmarks", "bench_*.py")))
+
+
+def _git(*args) -> Optional[str]:
+    proc = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+
+def metadata(quick: bool, profile: Optional[str]) -> Dict:
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_rev": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "profile": profile,
+    }
+
+
+# ---------- RUNNING ----------
+
+def run_bench(name: str, quick: bool, profile: Optional[str], profile_dir: str, timeout: float) -> Dict:
+    """
+    Run one bench module in a subprocess. Returns its results, or
+    {"error": ...} if it failed.
+    """
+    fd, out = tempfile.mkstemp(prefix=f"{name}_", suffix=".json")
+    os.close(fd)
+    cmd = [sys.executable, "-m", "benchmarks.run", "--child", name, "--child-out", out, "--profile-dir", profile_dir]
+    if quick:
+        cmd.append("--quick")
+    if profile:
+        cmd += ["--profile", profile]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    try:
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit code {proc.returncode}"}
+        with open(out) as f:
+            return json.load(f)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout:.0f}s"}
+    finally:
+        os.remove(out)
+
+
+def _child(name: str, quick: bool, out: str, profile: Optional[str], profile_dir: str):
+    from benchmarks.synthetic import offline_price_store
+
+    sys.modules["yfinance"] = None  # a real download now fails instead of going online
+    module = importlib.import_module(f"benchmarks.{name}")
+    with tempfile.TemporaryDirectory(prefix="bench_prices_") as root:
+        offline_price_store(root=root)
+        if profile:
+            result = profiled(module.run, quick, profile, os.path.join(profile_dir, name))
+        else:
+            result = module.run(quick=quick)
+    with open(out, "w") as f:
+        json.dump(result, f, default=str)
+
+
+# ---------- PROFILING ----------
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # built-in
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def folded_stacks(stats, min_us: float = 100.0) -> Dict[str, int]:
+    """
+    Folded stacks ("a;b;c" -> microseconds of self time) from pstats.Stats.
+    cProfile only records caller -> callee totals, so a function's time is
+    split over the paths leading to it in proportion to each caller's
+    share; paths under `min_us` are dropped and recursion is cut off.
+    """
+    raw = stats.stats  # func -> (primitive calls, calls, self time, cumulative time, callers)
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+
+    folded = defaultdict(float)
+    min_s = min_us / 1e6
+
+    def walk(func, stack: tuple, on_path: frozenset, share: float):
+        stack = stack + (_label(func),)
+        self_time = raw[func][2] * share
+        if self_time >= min_s:
+            folded[";".join(stack)] += self_time
+        for callee, edge_time in callees.get(func, ()):
+            total = raw[callee][3]
+            if callee in on_path or total <= 0 or edge_time * share < min_s:
+                continue
+            walk(callee, stack, on_path | {callee}, share * edge_time / total)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            walk(func, (), frozenset([func]), 1.0)
+    return {stack: round(t * 1e6) for stack, t in folded.items() if round(t * 1e6)}
+
+
+def profiled(fn, quick: bool, mode: str, base: str):
+    """
+    Call fn(quick=quick) under cProfile or pyinstrument and write the
+    profile next to `base`. Returns fn's result.
+    """
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    if mode == "cprofile":
+        import cProfile
+        import pstats
+
+        prof = cProfile.Profile()
+        result = prof.runcall(fn, quick=quick)
+        prof.dump_stats(base + ".prof")
+        with open(base + ".collapsed", "w") as f:
+            for stack, us in sorted(folded_stacks(pstats.Stats(prof)).items()):
+                f.write(f"{stack} {us}\n")
+        return result
+
+    try:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+    except ImportError:
+        raise SystemExit("--profile pyinstrument needs pyinstrument (pip install pyinstrument)")
+    profiler = Profiler()
+    profiler.start()
+    try:
+        result = fn(quick=quick)
+    finally:
+        profiler.stop()
+    with open(base + ".speedscope.json", "w") as f:
+        f.write(profiler.output(SpeedscopeRenderer()))
+    return result
+
+
+# ---------- COMPARISON ----------
+
+def flatten(results, prefix: str = "") -> Dict[str, float]:
+    """
+    Numeric leaves of nested results keyed by dotted path.
+    """
+    flat = {}
+    items = results.items() if isinstance(results, dict) else enumerate(results)
+    for key, value in items:
+        path = f"{prefix}{key}"
+        if isinstance(value, (dict, list)):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def direction(path: str) -> int:
+    """
+    +1 if higher is better, -1 if lower is better, 0 if not compared.
+    """
+    name = path.rsplit(".", 1)[-1].lower()
+    if any(tag in name for tag in HIGHER_IS_BETTER):
+        return 1
+    lower = name.endswith(LOWER_IS_BETTER) or name.startswith(("ms_", "us_"))
+    if lower or "bytes" in name or name in ("seconds", "kb_sent"):
+        return -1
+    return 0
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = THRESHOLD) -> Dict:
+    """
+    Metrics of `current` that moved more than `threshold` against
+    `baseline` (both as written by this runner), worst first.
+    """
+    cur, base = flatten(current["results"]), flatten(baseline["results"])
+    regressions, improvements = [], []
+    for path in sorted(cur.keys() & base.keys()):
+        sign = direction(path)
+        if not sign or base[path] == 0:
+            continue
+        change = (cur[path] - base[path]) / abs(base[path])
+        entry = {"metric": path, "baseline": base[path], "current": cur[path], "change": round(change, 4)}
+        if sign * change < -threshold:
+            regressions.append(entry)
+        elif sign * change > threshold:
+            improvements.append(entry)
+    for name, result in current["results"].items():
+        if "error" in result and "error" not in baseline["results"].get(name, {"error": None}):
+            regressions.append({"metric": name, "error": result["error"]})
+    regressions.sort(key=lambda e: -abs(e.get("change", float("inf"))))
+    improvements.sort(key=lambda e: -abs(e["change"]))
+    return {
+        "baseline_rev": baseline["meta"].get("git_rev"),
+        "threshold": threshold,
+        "compared": sum(1 for p in cur.keys() & base.keys() if direction(p) and base[p]),
+        "regressions": regressions,
+        "improvements": improvements,
+    }
+
+
+def _report(comparison: Dict):
+    print(f"compared {comparison['compared']} metrics with baseline {comparison['baseline_rev']} "
+          f"(threshold {comparison['threshold']:.0%})", file=sys.stderr)
+    for title in ("regressions", "improvements"):
+        if comparison[title]:
+            print(f"{title}:", file=sys.stderr)
+            for e in comparison[title]:
+                if "error" in e:
+                    print(f"  {e['metric']}: failed: {e['error']}", file=sys.stderr)
+                else:
+                    print(f"  {e['metric']}: {e['baseline']:g} -> {e['current']:g} ({e['change']:+.0%})",
+                          file=sys.stderr)
+
+
+# ---------- CLI ----------
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, as run(quick=True)")
+    parser.add_argument("--only", help="comma-separated benches, e.g. engine,retrieval")
+    parser.add_argument("--out", help="results file (default: a timestamped file in %s)" % RESULTS_DIR)
+    parser.add_argument("--baseline", nargs="?", const=BASELINE, help="compare with this results file")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE, help="also write the results here")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="relative change that is a regression")
+    parser.add_argument("--profile", choices=("cprofile", "pyinstrument"))
+    parser.add_argument("--profile-dir", default=os.path.join(RESULTS_DIR, "profiles"))
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per bench")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.quick, args.child_out, args.profile, args.profile_dir)
+        return 0
+    if args.profile and args.save_baseline:
+        parser.error("profiled timings can't be saved as a baseline")
+
+    names = discover()
+    if args.only:
+        wanted = [n if n.startswith("bench_") else f"bench_{n}" for n in args.only.split(",")]
+        unknown = [n for n in wanted if n not in names]
+        if unknown:
+            parser.error(f"unknown benches {unknown}; available: {', '.join(names)}")
+        names = wanted
+
+    report = {"meta": metadata(args.quick, args.profile), "results": {}}
+    report["meta"]["seconds"] = {}
+    for name in names:
+        print(f"{name} ...", end=" ", flush=True, file=sys.stderr)
+        t0 = time.perf_counter()
+        report["results"][name] = run_bench(name, args.quick, args.profile, args.profile_dir, args.timeout)
+        report["meta"]["seconds"][name] = round(time.perf_counter() - t0, 1)
+        error = report["results"][name].get("error") if isinstance(report["results"][name], dict) else None
+        print(f"failed: {error}" if error else f"{report['meta']['seconds'][name]}s", file=sys.stderr)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("quick") != args.quick:
+            print("warning: baseline and this run differ in --quick", file=sys.stderr)
+        report["comparison"] = compare(report, baseline, args.threshold)
+        _report(report["comparison"])
+        failed = bool(report["comparison"]["regressions"])
+
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    outputs = [args.out or os.path.join(RESULTS_DIR, f"results-{stamp}.json")]
+    if args.save_baseline:
+        outputs.append(args.save_baseline)
+    for path in outputs:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {path}", file=sys.stderr)
+    if args.profile:
+        print(f"profiles in {args.profile_dir}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# benchmarks/synthetic.py
+import numpy as np
+import pandas as pd
+
+from price_store import PriceProvider, PriceStore, period_start, set_price_store
+
+
+def random_walk_prices(n: int, seed: int = 0, start: str = "2000-01-03", freq: str = "D") -> pd.DataFrame:
+    """
+    Deterministic geometric random walk with a 'close_price' column.
+    """
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.015, n)))
+    return pd.DataFrame({"close_price": prices}, index=pd.date_range(start, periods=n, freq=freq))
+
+
+# ---------- OFFLINE PRICES ----------
+
+# pandas frequency of the bars served for each yfinance interval
+INTERVAL_FREQ = {"1d": "B", "1wk": "W-FRI", "1h": "h", "60m": "h", "30m": "30min",
+                 "15m": "15min", "5m": "5min", "2m": "2min", "1m": "min"}
+
+
+def ticker_seed(ticker: str) -> int:
+    import zlib
+
+    return zlib.crc32(ticker.encode())
+
+
+def _ohlcv(n: int, seed: int, end: pd.Timestamp, freq: str) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.015, n)))
+    spread = np.abs(rng.normal(0, 0.005, (2, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread[0]),
+            "Low": np.minimum(open_, close) * (1 - spread[1]),
+            "Close": close,
+            "Adj Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, n).astype(float),
+        },
+        index=pd.date_range(end=end, periods=n, freq=freq, name="Date"),
+    )
+
+
+class SyntheticProvider(PriceProvider):
+    """
+    Offline stand-in for price_store.YahooProvider: every ticker gets a
+    deterministic random walk (seeded from its name) of `bars` bars ending
+    now, so period windows such as the default "2y" find data and repeated
+    runs see the same prices. `latency` seconds are slept per fetch to
+    imitate the network round trip.
+    """
+
+    def __init__(self, bars: int = 1000, latency: float = 0.0):
+        self.bars = bars
+        self.latency = latency
+        self.calls = 0
+        self._frames = {}
+
+    def frame(self, ticker: str, interval: str = "1d") -> pd.DataFrame:
+        key = (ticker, interval)
+        if key not in self._frames:
+            freq = INTERVAL_FREQ.get(interval, "B")
+            end = pd.Timestamp.now().floor("D" if freq in ("B", "W-FRI") else "min")
+            self._frames[key] = _ohlcv(self.bars, ticker_seed(ticker), end, freq)
+        return self._frames[key]
+
+    def fetch(self, ticker, interval="1d", period=None, start=None):
+        import time
+
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        df = self.frame(ticker, interval)
+        if start is None:
+            start = period_start(period or "2y", end=df.index[-1])
+        return (df if start is None else df[df.index >= start]).copy()
+
+
+def offline_price_store(provider=None, root: str = None):
+    """
+    Install a process-wide PriceStore backed by a SyntheticProvider (in a
+    fresh temporary cache unless `root` is given) and return it. Pass the
+    set_price_store(None) when done, or just exit.
+    """
+    import tempfile
+
+    store = PriceStore(root or tempfile.mkdtemp(prefix="bench_prices_"), provider or SyntheticProvider())
+    set_price_store(store)
+    return store
+
+
+# ---------- CHART FRAMES ----------
+
+# ROI boxes as fractions of the calibrated region, as in ocr_pipeline
+ROI_FRACTIONS = {
+    "symbol": (0.02, 0.02, 0.45, 0.15),
+    "price": (0.80, 0.30, 0.98, 0.65),
+    "pnl": (0.70, 0.75, 0.98, 0.98),
+}
+
+BENCH_CALIBRATION = {"left": 0, "top": 0, "width": 800, "height": 450}
+
+
+def chart_frames(n: int, cal: dict = None, change_every: int = 5, seed: int = 0, with_labels: bool = False):
+    """
+    Deterministic BGR frames that look enough like a chart screenshot for the
+    OCR pipeline: dark background, noise-free text in the symbol, price and
+    PnL regions. The price and PnL change every `change_every` frames.
+    With `with_labels`, returns (frames, labels) where each label holds the
+    drawn 'last_price' and 'pnl'.
+    """
+    import cv2
+
+    cal = cal or BENCH_CALIBRATION
+    rng = np.random.default_rng(seed)
+    h, w = cal["top"] + cal["height"], cal["left"] + cal["width"]
+
+    def box(name):
+        x1, y1, x2, y2 = ROI_FRACTIONS[name]
+        return (int(cal["left"] + x1 * cal["width"]), int(cal["top"] + y1 * cal["height"]),
+                int(cal["left"] + x2 * cal["width"]), int(cal["top"] + y2 * cal["height"]))
+
+    frames, labels, price, pnl = [], [], 1500.0, 0.0
+    for i in range(n):
+        if i % change_every == 0:
+            price = round(price * (1 + rng.normal(0, 0.002)), 2)
+            pnl = round(pnl + rng.normal(0, 25), 2)
+        frame = np.full((h, w, 3), 24, dtype=np.uint8)
+        for name, text in (("symbol", "RELIANCE 1D"), ("price", f"{price:.2f}"), ("pnl", f"{pnl:+.2f}")):
+            x1, y1, x2, y2 = box(name)
+            cv2.putText(frame, text, (x1 + 4, (y1 + y2) // 2 + 8), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (230, 230, 230), 2)
+        frames.append(frame)
+        labels.append({"last_price": price, "pnl": pnl})
+    return (frames, labels) if with_labels else frames
+
+
+def load_frames(directory: str):
+    """
+    Recorded frames (*.png / *.jpg) from a directory, in filename order.
+    """
+    import cv2
+
+    return [cv2.imread(p) for p in _frame_paths(directory)]
+
+
+def _frame_paths(directory: str):
+    import glob
+    import os
+
+    return sorted(p for ext in ("png", "jpg", "jpeg") for p in glob.glob(os.path.join(directory, f"*.{ext}")))
+
+
+def load_labels(directory: str):
+    """
+    Ground truth for recorded frames from <directory>/labels.json, a mapping
+    of frame filename -> {"last_price": ..., "pnl": ...}, in load_frames
+    order (None for frames without a label).
+    """
+    import json
+    import os
+
+    with open(os.path.join(directory, "labels.json")) as f:
+        labels = json.load(f)
+    return [labels.get(os.path.basename(p)) for p in _frame_paths(directory)]
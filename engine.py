@@ -1,34 +1,33 @@
 # engine.py
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from typing import Optional, Sequence, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Sequence, Dict, Iterator, List
+
+from model_registry import get_model
+from price_store import PriceStore, get_price_store
+
+# Features that must be present before a row can be turned into a recommendation
+REQUIRED_SIGNAL_COLS = ["close_price", "MA_long", "return", "trend_strength", "volatility", "rsi"]
 
 
 # ---------- DATA LOADING ----------
 
-def load_price_df(ticker: str, period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+def load_price_df(
+    ticker: str,
+    period: str = "2y",
+    interval: str = "1d",
+    store: Optional[PriceStore] = None,
+) -> pd.DataFrame:
     """
-    Download OHLCV data for a ticker and return a DataFrame
-    with a single 'close_price' column.
+    Load OHLCV data for a ticker (through the local price cache) and return
+    a DataFrame with a single 'close_price' column.
     """
-    raw = yf.download(ticker, period=period, interval=interval, auto_adjust=False)
+    raw = (store or get_price_store()).load(ticker, period=period, interval=interval)
 
     if raw.empty:
         raise ValueError(f"No data returned for ticker {ticker}")
 
-    # Handle MultiIndex columns if present (yfinance sometimes does this)
-    if isinstance(raw.columns, pd.MultiIndex):
-        lvl0 = list(raw.columns.get_level_values(0))
-        lvl1 = list(raw.columns.get_level_values(1))
-        price_labels = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
-
-        if any(lbl in price_labels for lbl in lvl0):
-            raw.columns = raw.columns.get_level_values(0)
-        elif any(lbl in price_labels for lbl in lvl1):
-            raw.columns = raw.columns.get_level_values(1)
-        else:
-            raise ValueError("Could not detect price columns from MultiIndex")
-
     # Pick a price column
     price_col = None
     for col in ["Close", "Adj Close", "close", "adjclose", "Price", "price"]:
@@ -53,7 +52,16 @@ def load_price_df(ticker: str, period: str = "2y", interval: str = "1d") -> pd.D
 
 # ---------- SIGNAL BUILDING ----------
 
-def build_signals(data: pd.DataFrame) -> pd.DataFrame:
+def build_signals(
+    data: pd.DataFrame,
+    ma_short: int = 20,
+    ma_long: int = 50,
+    rsi_window: int = 14,
+    vol_window: int = 14,
+    breakout_window: int = 20,
+    rsi_upper: float = 55,
+    rsi_lower: float = 45,
+) -> pd.DataFrame:
     """
     Take a DataFrame with a 'close_price' column and add all technical features.
     Returns a new DataFrame with signals.
@@ -65,8 +73,8 @@ def build_signals(data: pd.DataFrame) -> pd.DataFrame:
     cp = df["close_price"]
 
     # Moving averages
-    df["MA_short"] = cp.rolling(20).mean()
-    df["MA_long"] = cp.rolling(50).mean()
+    df["MA_short"] = cp.rolling(ma_short).mean()
+    df["MA_long"] = cp.rolling(ma_long).mean()
 
     # Returns
     df["return"] = cp.pct_change()
@@ -78,7 +86,7 @@ def build_signals(data: pd.DataFrame) -> pd.DataFrame:
     df["trend_strength"] = (cp - df["MA_long"]) / df["MA_long"]
 
     # Volatility
-    df["volatility"] = df["return"].rolling(14).std()
+    df["volatility"] = df["return"].rolling(vol_window).std()
 
     # Market regime
     df["market_regime"] = "Sideways"
@@ -87,22 +95,20 @@ def build_signals(data: pd.DataFrame) -> pd.DataFrame:
     df.loc[df["trend_strength"] < -0.01, "market_regime"] = "Bear"
 
     # RSI
-    window = 14
     delta = cp.diff()
     gain = delta.clip(lower=0)
     loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window).mean()
-    avg_loss = loss.rolling(window).mean()
+    avg_gain = gain.rolling(rsi_window).mean()
+    avg_loss = loss.rolling(rsi_window).mean()
     rs = avg_gain / avg_loss
     df["rsi"] = 100 - (100 / (1 + rs))
 
     # RSI-based signal
     df["rsi_signal"] = 0
-    df.loc[(df["market_regime"].str.startswith("Bull")) & (df["rsi"] > 55), "rsi_signal"] = 1
-    df.loc[(df["market_regime"] == "Bear") & (df["rsi"] < 45), "rsi_signal"] = -1
+    df.loc[(df["market_regime"].str.startswith("Bull")) & (df["rsi"] > rsi_upper), "rsi_signal"] = 1
+    df.loc[(df["market_regime"] == "Bear") & (df["rsi"] < rsi_lower), "rsi_signal"] = -1
 
     # Breakout strategy
-    breakout_window = 20
     df["recent_high"] = cp.rolling(breakout_window).max().shift(1)
     df["recent_low"] = cp.rolling(breakout_window).min().shift(1)
 
@@ -118,15 +124,64 @@ def build_signals(data: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# ---------- ML SCORING ----------
+
+def model_feature_cols(ml_model, feature_cols: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """
+    Explicit feature columns, else those a registry model was trained on.
+    """
+    if feature_cols is None:
+        feature_cols = getattr(ml_model, "feature_cols", None)
+    return None if feature_cols is None else list(feature_cols)
+
+
+def predict_probs(ml_model, X: np.ndarray) -> np.ndarray:
+    """
+    P(profitable) for every row of the feature matrix X with a single
+    predict_proba call. Rows with missing features get NaN.
+    """
+    probs = np.full(len(X), np.nan)
+    ok = ~np.isnan(X).any(axis=1)
+    if ok.any():
+        probs[ok] = ml_model.predict_proba(X[ok])[:, 1]
+    return probs
+
+
+def score_rows(rows: Sequence, ml_model, feature_cols: Optional[Sequence[str]] = None) -> List[Optional[float]]:
+    """
+    ML probabilities for many feature rows (e.g. the latest row of many
+    tickers) in one batch; None where a row could not be scored.
+    """
+    cols = model_feature_cols(ml_model, feature_cols)
+    if ml_model is None or cols is None or not len(rows):
+        return [None] * len(rows)
+    X = np.array([[float(row[c]) for c in cols] for row in rows], dtype=float).reshape(len(rows), len(cols))
+    return [None if np.isnan(p) else float(p) for p in predict_probs(ml_model, X)]
+
+
+def score_history(df_sig: pd.DataFrame, ml_model, feature_cols: Optional[Sequence[str]] = None) -> pd.Series:
+    """
+    ML probability for every date of a build_signals frame, in one batch.
+    """
+    cols = model_feature_cols(ml_model, feature_cols)
+    if ml_model is None or cols is None:
+        raise ValueError("score_history needs a model and its feature columns")
+    X = df_sig[cols].to_numpy(dtype=float)
+    return pd.Series(predict_probs(ml_model, X), index=df_sig.index, name="ml_prob_profitable")
+
+
 # ---------- RECOMMENDATION LOGIC ----------
 
 def make_recommendation(
     row: pd.Series,
     ml_model=None,
     feature_cols: Optional[Sequence[str]] = None,
+    ml_prob: Optional[float] = None,
 ) -> Dict:
     """
     Take the latest row of features and produce a recommendation dict.
+    `ml_prob` is a probability already computed by a batch scorer
+    (score_rows); otherwise the row is scored on its own with `ml_model`.
     """
     # Cast everything to plain Python types to avoid pandas ambiguity
     signal_sum = float(row["signal_sum"])
@@ -150,9 +205,9 @@ def make_recommendation(
     confidence = abs(signal_sum) / signal_count if signal_count > 0 else 0.0
 
     # Optional ML probability
-    ml_prob = None
-    if (ml_model is not None) and (feature_cols is not None):
-        X = row[list(feature_cols)].astype(float).values.reshape(1, -1)
+    feature_cols = model_feature_cols(ml_model, feature_cols)
+    if (ml_prob is None) and (ml_model is not None) and (feature_cols is not None):
+        X = row[feature_cols].astype(float).values.reshape(1, -1)
         ml_prob = float(ml_model.predict_proba(X)[0, 1])
 
     return {
@@ -170,25 +225,37 @@ def make_recommendation(
     }
 
 
-def get_recommendation_for_ticker(
+def make_recommendations(
+    rows: Sequence[pd.Series],
+    ml_model=None,
+    feature_cols: Optional[Sequence[str]] = None,
+) -> List[Dict]:
+    """
+    make_recommendation for many rows, scoring them with one predict_proba
+    call instead of one per row.
+    """
+    probs = score_rows(rows, ml_model, feature_cols)
+    return [make_recommendation(row, ml_prob=p) for row, p in zip(rows, probs)]
+
+
+def recommendation_from_prices(
+    df_price: pd.DataFrame,
     ticker: str,
     period: str = "2y",
     interval: str = "1d",
     ml_model=None,
     feature_cols: Optional[Sequence[str]] = None,
+    **signal_params,
 ) -> Dict:
     """
-    High-level helper:
-    1) downloads data
-    2) builds signals
-    3) takes latest row
-    4) returns recommendation dict
+    Build signals on an already-loaded 'close_price' frame and return the
+    recommendation for its latest complete row. `signal_params` are passed
+    to build_signals.
     """
-    df_price = load_price_df(ticker, period=period, interval=interval)
-    df_sig = build_signals(df_price)
+    df_sig = build_signals(df_price, **signal_params)
 
     # Require essential fields available
-    df_sig = df_sig.dropna(subset=["close_price", "MA_long", "return", "trend_strength", "volatility", "rsi"])
+    df_sig = df_sig.dropna(subset=REQUIRED_SIGNAL_COLS)
 
     if df_sig.empty:
         raise ValueError("Not enough data to compute signals after dropping NaNs.")
@@ -199,3 +266,83 @@ def get_recommendation_for_ticker(
     rec["period_used"] = period
     rec["interval_used"] = interval
     return rec
+
+
+def get_recommendation_for_ticker(
+    ticker: str,
+    period: str = "2y",
+    interval: str = "1d",
+    ml_model=None,
+    feature_cols: Optional[Sequence[str]] = None,
+) -> Dict:
+    """
+    High-level helper:
+    1) downloads data
+    2) builds signals
+    3) takes latest row
+    4) returns recommendation dict
+    """
+    df_price = load_price_df(ticker, period=period, interval=interval)
+    ml_model = ml_model if ml_model is not None else get_model()
+    return recommendation_from_prices(
+        df_price, ticker, period=period, interval=interval, ml_model=ml_model, feature_cols=feature_cols
+    )
+
+
+def get_recommendations_for_universe(
+    tickers: Sequence[str],
+    period: str = "2y",
+    interval: str = "1d",
+    ml_model=None,
+    feature_cols: Optional[Sequence[str]] = None,
+    max_workers: int = 8,
+    vectorized: bool = False,
+    **signal_params,
+) -> Iterator[Dict]:
+    """
+    Recommendations for many tickers. Prices are fetched concurrently with at
+    most `max_workers` downloads in flight, and results are yielded as each
+    ticker finishes (not in input order). A failing ticker yields
+    {"ticker": ..., "error": ...} instead of aborting the batch.
+
+    With vectorized=True, signals are computed for all fetched tickers in one
+    panel pass (see panel.build_signals_panel) once every download is done.
+    `signal_params` (build_signals windows and thresholds) apply either way.
+    """
+    tickers = list(dict.fromkeys(tickers))  # de-duplicate, keep order
+    ml_model = ml_model if ml_model is not None else get_model()
+
+    def _one(ticker: str) -> Dict:
+        df_price = load_price_df(ticker, period=period, interval=interval)
+        if vectorized:
+            return df_price
+        return recommendation_from_prices(
+            df_price, ticker, period=period, interval=interval, ml_model=ml_model, feature_cols=feature_cols,
+            **signal_params,
+        )
+
+    frames = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers) or 1)))
+    try:
+        futures = {pool.submit(_one, t): t for t in tickers}
+        for fut in as_completed(futures):
+            try:
+                result = fut.result()
+            except Exception as e:
+                yield {"ticker": futures[fut], "error": str(e)}
+                continue
+            if vectorized:
+                frames[futures[fut]] = result
+            else:
+                yield result
+    finally:
+        # Consumer may stop early (e.g. client disconnect): drop queued work
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if frames:
+        from panel import build_signals_panel, recommendations_from_panel, stack_closes
+
+        panel = build_signals_panel(stack_closes(frames), tickers=list(frames), **signal_params)
+        yield from recommendations_from_panel(
+            panel, period=period, interval=interval, ml_model=ml_model, feature_cols=feature_cols
+        )
@@ -0,0 +1,334 @@
+# incremental.py
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+
+from engine import REQUIRED_SIGNAL_COLS, load_price_df, make_recommendation
+from model_registry import get_model
+from price_store import DEFAULT_REFRESH_AFTER, REFRESH_AFTER
+from result_cache import SingleFlight, TTLCache
+
+
+# pandas offset aliases for bucketing ticks into bars
+INTERVAL_FREQ = {
+    "1m": "1min",
+    "2m": "2min",
+    "5m": "5min",
+    "15m": "15min",
+    "30m": "30min",
+    "60m": "60min",
+    "1h": "1h",
+    "90m": "90min",
+    "1d": "1D",
+}
+
+# Columns of a build_signals row, in order
+ROW_FIELDS = pd.Index([
+    "close_price", "MA_short", "MA_long", "return", "trend_signal", "trend_strength",
+    "volatility", "market_regime", "rsi", "rsi_signal", "recent_high", "recent_low",
+    "breakout_signal", "signal_sum", "signal_count",
+])
+
+NAN = float("nan")
+
+
+# ---------- ROLLING STATE ----------
+
+class RollingStats:
+    """
+    Fixed-size window with O(1) running mean and (Welford) variance.
+    `peek` returns the stats as if a value had been pushed, without mutating.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.run = 0  # length of the trailing run of identical values
+
+    def _after(self, x: float):
+        n = len(self.values)
+        run = self.run + 1 if n and x == self.values[-1] else 1
+        if n < self.size:
+            n += 1
+            delta = x - self.mean
+            mean = self.mean + delta / n
+            m2 = self.m2 + delta * (x - mean)
+        else:
+            old = self.values[0]
+            mean = self.mean + (x - old) / n
+            m2 = self.m2 + (x - old) * (x - mean + old - self.mean)
+        if run >= n:
+            # Constant window: snap to the exact value and shed accumulated drift
+            mean, m2 = x, 0.0
+        return n, mean, max(m2, 0.0), run
+
+    def push(self, x: float):
+        n, self.mean, self.m2, self.run = self._after(x)
+        if len(self.values) == self.size:
+            self.values.popleft()
+        self.values.append(x)
+
+    def peek(self, x: float):
+        """
+        Return (mean, sample std) of the window after pushing x, or NaNs
+        while the window is not yet full.
+        """
+        n, mean, m2, _ = self._after(x)
+        if n < self.size:
+            return NAN, NAN
+        std = math.sqrt(m2 / (n - 1)) if n > 1 else NAN
+        return mean, std
+
+
+class RollingExtreme:
+    """
+    Rolling max (or min) over the last `size` pushed values using a
+    monotonic deque: amortised O(1) per push, O(1) per query.
+    """
+
+    def __init__(self, size: int, mode: str = "max"):
+        self.size = size
+        self.better = (lambda a, b: a >= b) if mode == "max" else (lambda a, b: a <= b)
+        self.items = deque()  # (index, value), values monotonic
+        self.count = 0
+
+    def push(self, x: float):
+        while self.items and self.better(x, self.items[-1][1]):
+            self.items.pop()
+        self.items.append((self.count, x))
+        self.count += 1
+        while self.items[0][0] <= self.count - 1 - self.size:
+            self.items.popleft()
+
+    def value(self) -> float:
+        if self.count < self.size:
+            return NAN
+        return self.items[0][1]
+
+
+# ---------- STREAMING ENGINE ----------
+
+class IncrementalSignalEngine:
+    """
+    Stateful, per-ticker equivalent of engine.build_signals.
+
+    Closed bars are committed with `on_bar`; intraday ticks update the bar in
+    progress with `on_tick`, which is evaluated against the committed state
+    without mutating it. Both run in constant time and return the same row
+    that build_signals would produce for that bar.
+    """
+
+    def __init__(
+        self,
+        ma_short: int = 20,
+        ma_long: int = 50,
+        rsi_window: int = 14,
+        vol_window: int = 14,
+        breakout_window: int = 20,
+        interval: str = "1d",
+    ):
+        self.interval = interval
+        self._ma_short = RollingStats(ma_short)
+        self._ma_long = RollingStats(ma_long)
+        self._returns = RollingStats(vol_window)
+        self._gains = RollingStats(rsi_window)
+        self._losses = RollingStats(rsi_window)
+        self._high = RollingExtreme(breakout_window, "max")
+        self._low = RollingExtreme(breakout_window, "min")
+        self._prev_close: Optional[float] = None
+
+        self._bar_start: Optional[pd.Timestamp] = None
+        self._bar_close: Optional[float] = None
+        self.last_row: Optional[pd.Series] = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_price_df(cls, df: pd.DataFrame, interval: str = "1d", **windows) -> "IncrementalSignalEngine":
+        """
+        Seed an engine from a 'close_price' history. The last bar is kept open
+        so that ticks arriving during it update it instead of appending.
+        """
+        eng = cls(interval=interval, **windows)
+        closes = df["close_price"].dropna()
+        for ts, close in list(closes.items())[:-1]:
+            eng.on_bar(float(close), ts)
+        if len(closes):
+            eng.on_tick(float(closes.iloc[-1]), closes.index[-1])
+        return eng
+
+    def _row(self, close: float, timestamp=None) -> pd.Series:
+        prev = self._prev_close
+
+        ma_short, _ = self._ma_short.peek(close)
+        ma_long, _ = self._ma_long.peek(close)
+
+        if prev is None:
+            ret = NAN
+            volatility = NAN
+            rsi = NAN
+        else:
+            ret = close / prev - 1
+            _, volatility = self._returns.peek(ret)
+            delta = close - prev
+            avg_gain, _ = self._gains.peek(max(delta, 0.0))
+            avg_loss, _ = self._losses.peek(max(-delta, 0.0))
+            if math.isnan(avg_gain) or math.isnan(avg_loss):
+                rsi = NAN
+            elif avg_loss == 0:
+                rsi = NAN if avg_gain == 0 else 100.0
+            else:
+                rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        trend_signal = int(ma_short > ma_long)
+        trend_strength = (close - ma_long) / ma_long
+
+        regime = "Sideways"
+        if trend_strength > 0.01 and volatility < 0.02:
+            regime = "Bull-Low-Vol"
+        elif trend_strength > 0.01 and volatility >= 0.02:
+            regime = "Bull-High-Vol"
+        elif trend_strength < -0.01:
+            regime = "Bear"
+
+        rsi_signal = 0
+        if regime.startswith("Bull") and rsi > 55:
+            rsi_signal = 1
+        elif regime == "Bear" and rsi < 45:
+            rsi_signal = -1
+
+        recent_high = self._high.value()
+        recent_low = self._low.value()
+        breakout_signal = 0
+        if close > recent_high:
+            breakout_signal = 1
+        elif close < recent_low:
+            breakout_signal = -1
+
+        signals = (trend_signal, rsi_signal, breakout_signal)
+        values = [
+            close, ma_short, ma_long, ret, trend_signal, trend_strength, volatility, regime,
+            rsi, rsi_signal, recent_high, recent_low, breakout_signal,
+            sum(signals), sum(1 for s in signals if s != 0),
+        ]
+        return pd.Series(values, index=ROW_FIELDS, dtype=object, name=timestamp)
+
+    def on_bar(self, close: float, timestamp=None) -> pd.Series:
+        """
+        Commit a closed bar and return its feature row.
+        """
+        row = self._row(close, timestamp)
+        prev = self._prev_close
+
+        self._ma_short.push(close)
+        self._ma_long.push(close)
+        if prev is not None:
+            delta = close - prev
+            self._returns.push(close / prev - 1)
+            self._gains.push(max(delta, 0.0))
+            self._losses.push(max(-delta, 0.0))
+        self._high.push(close)
+        self._low.push(close)
+        self._prev_close = close
+
+        self._bar_start = None
+        self._bar_close = None
+        self.last_row = row
+        return row
+
+    def on_tick(self, price: float, timestamp=None) -> pd.Series:
+        """
+        Fold a live price into the bar in progress. When the tick belongs to a
+        later bar than the open one, the open bar is committed first.
+        """
+        ts = pd.Timestamp(timestamp if timestamp is not None else datetime.utcnow())
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        bar_start = ts.floor(INTERVAL_FREQ.get(self.interval, "1D"))
+
+        if self._bar_start is not None and bar_start > self._bar_start:
+            self.on_bar(self._bar_close, self._bar_start)
+
+        self._bar_start = bar_start
+        self._bar_close = price
+        self.last_row = self._row(price, bar_start)
+        return self.last_row
+
+    @property
+    def is_ready(self) -> bool:
+        row = self.last_row
+        return row is not None and not row[REQUIRED_SIGNAL_COLS].isna().any()
+
+
+# ---------- LIVE RECOMMENDATIONS ----------
+
+ENGINE_CACHE_SIZE = int(os.environ.get("ENGINE_CACHE_SIZE", "512"))  # live engines kept, least recently used dropped
+ENGINE_IDLE_TTL = float(os.environ.get("ENGINE_IDLE_TTL", str(6 * 3600)))  # seconds unused before an engine is seeded again
+
+_engines = TTLCache(ENGINE_CACHE_SIZE)  # (ticker, interval) -> (engine, last seeded bar, checked at)
+_seeding = SingleFlight()
+
+
+def get_signal_engine(ticker: str, period: str = "2y", interval: str = "1d") -> IncrementalSignalEngine:
+    """
+    Return the process-wide engine for (ticker, interval), seeding it from
+    price history on first use. Concurrent first calls share one download.
+
+    Every REFRESH_AFTER[interval] seconds the price history is looked up
+    again, and the engine is seeded afresh once it reaches past the last
+    bar the engine was seeded with, so bars without live ticks are not
+    missing. Engines unused for ENGINE_IDLE_TTL seconds, or beyond the
+    ENGINE_CACHE_SIZE most recently used, are dropped and seeded again.
+    """
+    key = (ticker, interval)
+    found, entry = _engines.get(key)
+    if found and time.monotonic() - entry[2] < REFRESH_AFTER.get(interval, DEFAULT_REFRESH_AFTER):
+        _engines.set(key, entry, ENGINE_IDLE_TTL)  # idle time counts from the last use
+        return entry[0]
+
+    def seed():
+        df = load_price_df(ticker, period=period, interval=interval)  # from the cache unless a refresh is due
+        if found and df.index[-1] <= entry[1]:
+            fresh = (entry[0], entry[1], time.monotonic())
+        else:
+            fresh = (IncrementalSignalEngine.from_price_df(df, interval=interval), df.index[-1], time.monotonic())
+        _engines.set(key, fresh, ENGINE_IDLE_TTL)
+        return fresh[0]
+
+    return _seeding.do(key, seed)
+
+
+def get_live_recommendation(
+    ticker: str,
+    price: Optional[float] = None,
+    timestamp=None,
+    period: str = "2y",
+    interval: str = "1d",
+    ml_model=None,
+    feature_cols: Optional[Sequence[str]] = None,
+) -> Dict:
+    """
+    Recommendation for a ticker from its streaming engine, optionally after
+    folding in a live price. Same output as get_recommendation_for_ticker.
+    """
+    eng = get_signal_engine(ticker, period=period, interval=interval)
+    with eng.lock:
+        if price is not None:
+            eng.on_tick(float(price), timestamp)
+        if not eng.is_ready:
+            raise ValueError("Not enough data to compute signals after dropping NaNs.")
+        row = eng.last_row
+
+    ml_model = ml_model if ml_model is not None else get_model()
+    rec = make_recommendation(row, ml_model=ml_model, feature_cols=feature_cols)
+    rec["ticker"] = ticker
+    rec["period_used"] = period
+    rec["interval_used"] = interval
+    return rec
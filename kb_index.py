@@ -0,0 +1,440 @@
+# kb_index.py
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+KB_INDEX_DIR = os.environ.get("KB_INDEX_DIR", ".cache/kb_index")
+INDEX_VERSION = 2
+CHUNK_MAX_CHARS = 600  # longer paragraphs are split at sentence ends
+CHUNK_MIN_CHARS = 80  # shorter ones (headings, one-liners) join the next paragraph
+
+# Same tokens as sklearn's TfidfVectorizer defaults (lowercased, 2+ word chars)
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n")
+
+ARRAYS = ("terms", "idf", "counts_data", "counts_indices", "counts_indptr",
+          "post_data", "post_indices", "post_indptr", "chunk_doc", "text_offsets")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _pack(paragraph: str, max_chars: int) -> List[str]:
+    """
+    Split an over-long paragraph into pieces of at most ~max_chars, at
+    sentence or line ends.
+    """
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+    pieces, current = [], ""
+    for sentence in SENTENCE_RE.split(paragraph):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_chunks(text: str, max_chars: int = CHUNK_MAX_CHARS, min_chars: int = CHUNK_MIN_CHARS) -> List[str]:
+    """
+    Paragraph chunks of a document: blank-line separated paragraphs, short
+    ones merged into the following paragraph, long ones split.
+    """
+    chunks, pending = [], ""
+    for para in PARAGRAPH_RE.split(text):
+        para = para.strip()
+        if not para:
+            continue
+        if pending:
+            para, pending = f"{pending}\n{para}", ""
+        if len(para) < min_chars:
+            pending = para
+            continue
+        chunks.extend(_pack(para, max_chars))
+    if pending:
+        if chunks and len(chunks[-1]) + len(pending) < max_chars:
+            chunks[-1] = f"{chunks[-1]}\n\n{pending}"
+        else:
+            chunks.append(pending)
+    return chunks
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def walk_kb(kb_dir: str) -> Dict[str, Tuple[float, int]]:
+    """
+    {path relative to kb_dir: (mtime, size)} for every non-hidden file,
+    recursing into subdirectories.
+    """
+    files = {}
+    for root, dirs, names in os.walk(kb_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            files[os.path.relpath(path, kb_dir)] = (st.st_mtime, st.st_size)
+    return files
+
+
+def _tfidf(counts: sp.csr_matrix) -> Tuple[np.ndarray, sp.csr_matrix]:
+    """
+    idf and L2-normalized tf-idf rows, as TfidfVectorizer(smooth_idf=True)
+    computes them.
+    """
+    n_docs = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+
+    tfidf = counts.astype(np.float64)
+    tfidf.data *= idf[tfidf.indices]
+    row_norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    row_norms[row_norms == 0] = 1.0
+    tfidf.data /= np.repeat(row_norms, np.diff(tfidf.indptr))
+    return idf, tfidf
+
+
+class KnowledgeIndex:
+    """
+    Chunk-level TF-IDF index over every file under `kb_dir`, persisted in
+    `index_dir`. Documents are split into paragraph chunks (split_chunks)
+    and each chunk is scored on its own, so a search returns the passages
+    that matched rather than whole files.
+
+    On disk each build is a generation directory of .npy arrays (vocabulary,
+    idf, raw term counts per chunk, tf-idf postings as a CSC matrix, chunk
+    texts) plus manifest.json, which records the live generation, per-file
+    content hashes and the document list. Loading memory-maps the arrays,
+    so startup does no tokenizing or fitting.
+
+    search() reads only the postings of the query's terms and picks the
+    top k with argpartition, so its cost follows the number of matching
+    chunks, not the size of the KB.
+
+    refresh() compares the KB directory with the manifest (mtime/size, then
+    content hash) and re-tokenizes only added or changed documents; term
+    counts of unchanged ones are reused. Files with identical content are
+    indexed once and list every path in their `sources`.
+    """
+
+    def __init__(self, kb_dir: str = "kb", index_dir: str = KB_INDEX_DIR, check_every: float = 5.0):
+        self.kb_dir = kb_dir
+        self.index_dir = index_dir
+        self.check_every = check_every
+        self._lock = threading.RLock()
+        self._checked_at = 0.0
+        self.manifest: Dict = {}
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.postings: Optional[sp.csc_matrix] = None
+        self.reindexed = 0  # documents tokenized by the last refresh
+
+    # ---------- PERSISTENCE ----------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def load(self) -> bool:
+        """
+        Memory-map the persisted index; False if there is none (or it is
+        from another format version).
+        """
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if manifest.get("version") != INDEX_VERSION or manifest.get("chunking") != [CHUNK_MAX_CHARS, CHUNK_MIN_CHARS]:
+            return False
+
+        gen_dir = os.path.join(self.index_dir, manifest["generation"])
+        arrays = {name: np.load(os.path.join(gen_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        arrays["texts"] = np.memmap(os.path.join(gen_dir, "texts.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(gen_dir, "texts.bin")) else np.zeros(0, dtype=np.uint8)
+        self._install(manifest, arrays)
+        return True
+
+    def _install(self, manifest: Dict, arrays: Dict[str, np.ndarray]):
+        shape = (len(arrays["chunk_doc"]), len(arrays["terms"]))
+        self.postings = sp.csc_matrix(
+            (arrays["post_data"], arrays["post_indices"], arrays["post_indptr"]), shape=shape, copy=False
+        )
+        self.manifest = manifest
+        self.arrays = arrays
+
+    def _save(self, manifest: Dict, arrays: Dict[str, np.ndarray], texts: bytes):
+        """
+        Write a new generation, then switch manifest.json to it atomically
+        and remove older generations.
+        """
+        generation = f"gen-{int(time.time() * 1000)}"
+        gen_dir = os.path.join(self.index_dir, generation)
+        os.makedirs(gen_dir, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(gen_dir, f"{name}.npy"), arrays[name])
+        with open(os.path.join(gen_dir, "texts.bin"), "wb") as f:
+            f.write(texts)
+
+        manifest = dict(manifest, version=INDEX_VERSION, chunking=[CHUNK_MAX_CHARS, CHUNK_MIN_CHARS],
+                        generation=generation)
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path())
+
+        for name in os.listdir(self.index_dir):
+            if name.startswith("gen-") and name != generation:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+    # ---------- (RE)INDEXING ----------
+
+    def _scan(self) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """
+        Current files with their hashes; only files whose mtime/size changed
+        since the manifest are read. Returns (files, {hash: text} for the
+        files that were read).
+        """
+        known = self.manifest.get("files", {})
+        files, texts = {}, {}
+        for rel, (mtime, size) in walk_kb(self.kb_dir).items():
+            old = known.get(rel)
+            if old and old["mtime"] == mtime and old["size"] == size:
+                files[rel] = old
+                continue
+            text = _read_text(os.path.join(self.kb_dir, rel))
+            digest = content_hash(text) if text else None  # empty/unreadable: tracked, not indexed
+            if digest:
+                texts[digest] = text
+            files[rel] = {"hash": digest, "mtime": mtime, "size": size}
+        return files, texts
+
+    def _chunk_text(self, i: int) -> str:
+        offsets = self.arrays["text_offsets"]
+        return bytes(self.arrays["texts"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-index if files under kb_dir were added, changed or removed
+        (checked at most every `check_every` seconds unless `force`).
+        Returns True if the index changed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.postings is not None and now - self._checked_at < self.check_every:
+                return False
+            self._checked_at = now
+
+            files, new_texts = self._scan()
+            if self.postings is not None and files == self.manifest.get("files"):
+                return False
+            self._rebuild(files, new_texts)
+            return True
+
+    def _rebuild(self, files: Dict[str, Dict], new_texts: Dict[str, str]):
+        # One document per distinct content; shallowest path first
+        sources: Dict[str, List[str]] = {}
+        for rel in sorted(files, key=lambda r: (r.count(os.sep), r)):
+            if files[rel]["hash"]:
+                sources.setdefault(files[rel]["hash"], []).append(rel)
+
+        old_docs = {d["hash"]: d for d in self.manifest.get("docs", [])}
+        old_terms = self.arrays.get("terms", np.zeros(0, dtype="U1"))
+        old_counts = None
+        if self.postings is not None:
+            old_counts = sp.csr_matrix(
+                (self.arrays["counts_data"], self.arrays["counts_indices"], self.arrays["counts_indptr"]),
+                shape=self.postings.shape,
+            )
+
+        # One row per chunk: the old row for chunks of unchanged documents,
+        # fresh term counts for the rest
+        docs, texts, rows, chunk_doc = [], [], [], []
+        fresh: Dict[int, Dict[str, int]] = {}
+        for digest, paths in sources.items():
+            first = len(rows)
+            if digest in old_docs:
+                start, end = old_docs[digest]["chunks"]
+                for r in range(start, end):
+                    rows.append(r)
+                    texts.append(self._chunk_text(r).encode("utf-8"))
+            else:
+                text = new_texts.get(digest)
+                if text is None:  # unchanged path whose content we never read
+                    text = _read_text(os.path.join(self.kb_dir, paths[0])) or ""
+                for chunk in split_chunks(text):
+                    tf: Dict[str, int] = {}
+                    for tok in tokenize(chunk):
+                        tf[tok] = tf.get(tok, 0) + 1
+                    fresh[len(rows)] = tf
+                    rows.append(None)
+                    texts.append(chunk.encode("utf-8"))
+            chunk_doc.extend([len(docs)] * (len(rows) - first))
+            docs.append({"hash": digest, "sources": paths, "chunks": [first, len(rows)]})
+        self.reindexed = len({chunk_doc[i] for i in fresh})
+
+        # Vocabulary: old terms plus any new ones, sorted for searchsorted lookups
+        new_terms = {t for tf in fresh.values() for t in tf}
+        terms = np.union1d(old_terms, np.array(sorted(new_terms), dtype=str)) if new_terms else np.asarray(old_terms)
+        remap = np.searchsorted(terms, old_terms) if len(old_terms) else np.zeros(0, dtype=np.int64)
+
+        indptr, indices, data = [0], [], []
+        for i, old in enumerate(rows):
+            if old is not None:
+                lo, hi = old_counts.indptr[old], old_counts.indptr[old + 1]
+                cols = remap[old_counts.indices[lo:hi]]
+                vals = np.asarray(old_counts.data[lo:hi])
+            else:
+                tf = fresh[i]
+                cols = np.searchsorted(terms, np.array(list(tf), dtype=str)) if tf else np.zeros(0, dtype=np.int64)
+                vals = np.fromiter(tf.values(), dtype=np.int32, count=len(tf))
+            order = np.argsort(cols)
+            indices.append(cols[order])
+            data.append(vals[order])
+            indptr.append(indptr[-1] + len(cols))
+
+        counts = sp.csr_matrix(
+            (np.concatenate(data).astype(np.int32) if data else np.zeros(0, np.int32),
+             np.concatenate(indices).astype(np.int32) if indices else np.zeros(0, np.int32),
+             np.array(indptr, dtype=np.int64)),
+            shape=(len(rows), len(terms)),
+        )
+
+        # Drop terms no document uses any more, so idf matches a fresh fit
+        used = np.bincount(counts.indices, minlength=len(terms)) > 0
+        if not used.all():
+            terms = terms[used]
+            counts = counts[:, np.flatnonzero(used)].tocsr()
+            counts.sort_indices()
+
+        idf, tfidf = _tfidf(counts)
+        postings = tfidf.tocsc()
+        postings.sort_indices()
+        text_offsets = np.concatenate([[0], np.cumsum([len(t) for t in texts])]).astype(np.int64)
+        arrays = {
+            "terms": terms,
+            "idf": idf,
+            "counts_data": counts.data, "counts_indices": counts.indices, "counts_indptr": counts.indptr,
+            "post_data": postings.data, "post_indices": postings.indices, "post_indptr": postings.indptr,
+            "chunk_doc": np.array(chunk_doc, dtype=np.int32),
+            "text_offsets": text_offsets,
+        }
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._save({"files": files, "docs": docs}, arrays, b"".join(texts))
+        self.load()
+
+    def load_or_build(self) -> "KnowledgeIndex":
+        """
+        Load the persisted index and bring it up to date with kb_dir.
+        """
+        with self._lock:
+            self.load()
+            self.refresh(force=True)
+        return self
+
+    # ---------- QUERIES ----------
+
+    def query_terms(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (term columns, L2-normalized tf-idf weights) of the query's known terms.
+        """
+        terms = self.arrays["terms"]
+        tokens = np.array(tokenize(query), dtype=str)
+        if not len(tokens) or not len(terms):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        pos = np.minimum(np.searchsorted(terms, tokens), len(terms) - 1)
+        cols, counts = np.unique(pos[terms[pos] == tokens], return_counts=True)
+        weights = counts * np.asarray(self.arrays["idf"])[cols]
+        norm = np.linalg.norm(weights)
+        return cols, (weights / norm if norm else weights)
+
+    def _score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (chunk rows, cosine scores) of every chunk sharing a term with
+        `query`, accumulated from those terms' postings only.
+        """
+        cols, weights = self.query_terms(query)
+        indptr, indices, data = (self.arrays[n] for n in ("post_indptr", "post_indices", "post_data"))
+        spans = [(indptr[c], indptr[c + 1]) for c in cols]
+        if not sum(hi - lo for lo, hi in spans):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        hit_rows = np.concatenate([indices[lo:hi] for lo, hi in spans])
+        hit_vals = np.concatenate([data[lo:hi] * w for (lo, hi), w in zip(spans, weights)])
+        rows, inverse = np.unique(hit_rows, return_inverse=True)
+        return rows, np.bincount(inverse, weights=hit_vals, minlength=len(rows))
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """
+        Top-k chunks by cosine similarity to `query`, best first. Chunks
+        sharing no term with the query are never returned.
+        """
+        self.refresh()
+        with self._lock:
+            rows, scores = self._score(query)
+            if len(rows) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            order = np.lexsort((rows, -scores))  # ties: earlier chunk first
+
+            docs, chunk_doc = self.manifest["docs"], self.arrays["chunk_doc"]
+            hits = []
+            for i in order:
+                row = int(rows[i])
+                doc = docs[chunk_doc[row]]
+                hits.append({
+                    "source": doc["sources"][0], "sources": doc["sources"], "chunk": row - doc["chunks"][0],
+                    "score": float(scores[i]), "text": self._chunk_text(row),
+                })
+            return hits
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self.manifest.get("generation")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self.manifest.get("docs", [])),
+                "chunks": len(self.arrays.get("chunk_doc", ())),
+                "files": len(self.manifest.get("files", {})),
+                "terms": len(self.arrays.get("terms", ())),
+                "generation": self.manifest.get("generation"),
+                "reindexed_last_refresh": self.reindexed,  # documents
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or update the persisted knowledge-base index.")
+    parser.add_argument("--kb", default="kb")
+    parser.add_argument("--out", default=KB_INDEX_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="discard the existing index first")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        shutil.rmtree(args.out, ignore_errors=True)
+    index = KnowledgeIndex(args.kb, args.out).load_or_build()
+    print(json.dumps(index.stats(), indent=2))
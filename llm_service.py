@@ -0,0 +1,339 @@
+# llm_service.py
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+
+LLM_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-5.1-mini")
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))  # completions in flight at once
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "30"))  # seconds per explanation, retries included
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a completion did not finish within its deadline."""
+
+
+class LLMError(RuntimeError):
+    """Raised when the API rejects a request or retries are exhausted."""
+
+
+class _Retry(Exception):
+    def __init__(self, reason: str, after: Optional[float] = None):
+        super().__init__(reason)
+        self.after = after
+
+
+def _retry_after(resp) -> Optional[float]:
+    try:
+        return float(resp.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ExplanationService:
+    """
+    Async client for an OpenAI-compatible chat completions API (httpx),
+    for explanations requested from FastAPI handlers.
+
+    - at most `concurrency` completions are in flight; others wait their turn
+    - every call has a deadline (`deadline` seconds unless given) covering
+      the wait for a slot, all attempts and backoff; DeadlineExceeded after
+    - timeouts, connection errors and RETRY_STATUS responses are retried up
+      to `max_retries` times with full-jitter exponential backoff (honouring
+      Retry-After)
+    - concurrent complete() calls with identical model and messages share
+      one request
+    - stream() yields content deltas as they arrive; it is retried only
+      until the first delta was received
+    """
+
+    def __init__(
+        self,
+        base_url: str = LLM_BASE_URL,
+        api_key: Optional[str] = None,
+        model: str = LLM_MODEL,
+        concurrency: int = LLM_CONCURRENCY,
+        deadline: float = LLM_DEADLINE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        temperature: float = 0.4,
+    ):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.temperature = temperature
+        self._loop = None
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"requests": 0, "completions": 0, "retries": 0, "coalesced": 0,
+                         "deadline_exceeded": 0, "failed": 0, "cache_hits": 0}
+
+    # ---------- PLUMBING ----------
+
+    def _ensure_loop(self):
+        """
+        The semaphore and HTTP client belong to one event loop; recreate
+        them when used from a new one (e.g. successive asyncio.run calls).
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            import httpx
+
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._client = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(max_connections=self.concurrency),
+            )
+            self._inflight = {}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def _payload(self, messages: List[Dict], stream: bool = False) -> Dict:
+        payload = {"model": self.model, "messages": messages, "temperature": self.temperature}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _delay(self, attempt: int, after: Optional[float]) -> float:
+        if after is not None:
+            return after
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _check(self, resp):
+        if resp.status_code in RETRY_STATUS:
+            raise _Retry(f"HTTP {resp.status_code}", _retry_after(resp))
+        if resp.status_code >= 400:
+            raise LLMError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+
+    async def _with_retries(self, attempt_fn, deadline_at: float):
+        """
+        Run `attempt_fn(remaining_seconds)` holding a concurrency slot,
+        retrying transient failures until the deadline.
+        """
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), remaining)
+            except asyncio.TimeoutError:
+                break
+            try:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.counters["requests"] += 1
+                return await asyncio.wait_for(attempt_fn(remaining), remaining)
+            except asyncio.TimeoutError:
+                break
+            except (_Retry, httpx.TransportError) as e:
+                reason, after = str(e) or type(e).__name__, getattr(e, "after", None)
+            except LLMError:
+                self.counters["failed"] += 1
+                raise
+            finally:
+                self._semaphore.release()
+
+            if attempt == self.max_retries:
+                self.counters["failed"] += 1
+                raise LLMError(f"Giving up after {attempt + 1} attempts: {reason}")
+            delay = self._delay(attempt, after)
+            if time.monotonic() + delay >= deadline_at:
+                break
+            self.counters["retries"] += 1
+            await asyncio.sleep(delay)
+
+        self.counters["deadline_exceeded"] += 1
+        raise DeadlineExceeded("No completion before the deadline")
+
+    # ---------- COMPLETIONS ----------
+
+    async def _complete_once(self, messages: List[Dict], timeout: float) -> str:
+        resp = await self._client.post(self.url, json=self._payload(messages), timeout=timeout)
+        self._check(resp)
+        self.counters["completions"] += 1
+        return resp.json()["choices"][0]["message"]["content"]
+
+    def _forget(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved even if every caller gave up waiting
+
+    async def complete(self, messages: List[Dict], deadline: Optional[float] = None) -> str:
+        """
+        Completion text for `messages`. Identical concurrent calls share
+        one request; each still waits at most its own deadline.
+        """
+        self._ensure_loop()
+        deadline = self.deadline if deadline is None else deadline
+        key = hashlib.sha1(json.dumps([self.model, messages], sort_keys=True).encode()).hexdigest()
+
+        task = self._inflight.get(key)
+        if task is None:
+            deadline_at = time.monotonic() + deadline
+            task = asyncio.ensure_future(
+                self._with_retries(lambda timeout: self._complete_once(messages, timeout), deadline_at)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.counters["coalesced"] += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            self.counters["deadline_exceeded"] += 1
+            raise DeadlineExceeded(f"No completion within {deadline}s") from None
+
+    async def stream(self, messages: List[Dict], deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Yield content deltas of a streamed completion as they arrive.
+        """
+        self._ensure_loop()
+        deadline_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        queue: asyncio.Queue = asyncio.Queue()
+        started = False
+
+        async def attempt(timeout):
+            nonlocal started
+            try:
+                async with self._client.stream(
+                    "POST", self.url, json=self._payload(messages, stream=True), timeout=timeout
+                ) as resp:
+                    if resp.status_code >= 400:
+                        await resp.aread()
+                        self._check(resp)
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            started = True
+                            await queue.put(delta)
+            except Exception as e:
+                if started and not isinstance(e, LLMError):  # deltas already went out: no retry
+                    raise LLMError(f"Stream interrupted: {e}") from e
+                raise
+            self.counters["completions"] += 1
+
+        async def run():
+            try:
+                await self._with_retries(attempt, deadline_at)
+            except BaseException as e:
+                await queue.put(e)
+            else:
+                await queue.put(None)
+
+        producer = asyncio.ensure_future(run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+
+    # ---------- EXPLANATIONS ----------
+
+    def _prepare(self, rec: dict, k: int, use_cache: bool):
+        """
+        (cache key, found, cached text, prompt messages on a miss). Blocking:
+        the KB index may be built or rescanned and the cache may be SQLite.
+        """
+        import rag_llm
+
+        key = rag_llm.llm_cache_key(rec, k, self.model)
+        if use_cache:
+            found, text = rag_llm.llm_explanation_cache.get(key)
+            if found:
+                return key, True, text, None
+        return key, False, None, rag_llm.explanation_messages(rec, k=k, use_cache=use_cache)
+
+    @staticmethod
+    def _store(key: tuple, text: str):
+        import rag_llm
+
+        rag_llm.llm_explanation_cache.set(key, text, rag_llm.EXPLANATION_TTL)
+
+    async def explain(self, rec: dict, k: int = 3, use_cache: bool = True, deadline: Optional[float] = None) -> str:
+        """
+        LLM explanation of a recommendation, through rag_llm's explanation
+        cache (same keys as generate_llm_explanation). Cache I/O and prompt
+        building run on the default executor, off the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        key, found, text, messages = await loop.run_in_executor(None, self._prepare, rec, k, use_cache)
+        if found:
+            self.counters["cache_hits"] += 1
+            return text
+
+        text = await self.complete(messages, deadline)
+        if use_cache:
+            await loop.run_in_executor(None, self._store, key, text)
+        return text
+
+    async def explain_stream(
+        self, rec: dict, k: int = 3, use_cache: bool = True, deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        explain() as a stream of text deltas; a cached explanation is
+        yielded whole. A completed stream is stored in the cache.
+        """
+        loop = asyncio.get_running_loop()
+        key, found, text, messages = await loop.run_in_executor(None, self._prepare, rec, k, use_cache)
+        if found:
+            self.counters["cache_hits"] += 1
+            yield text
+            return
+
+        parts = []
+        async for delta in self.stream(messages, deadline):
+            parts.append(delta)
+            yield delta
+        if use_cache:
+            await loop.run_in_executor(None, self._store, key, "".join(parts))
+
+    def stats(self) -> Dict:
+        return dict(self.counters, inflight=len(self._inflight), concurrency=self.concurrency)
+
+
+_service: Optional[ExplanationService] = None
+
+
+def get_explanation_service() -> ExplanationService:
+    """
+    Process-wide service built from the environment, created on first use.
+    """
+    global _service
+    if _service is None:
+        _service = ExplanationService()
+    return _service
@@ -0,0 +1,102 @@
+# model_registry.py
+import logging
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+
+ML_MODEL_PATH = os.environ.get("ML_MODEL_PATH")  # joblib bundle written by save_model()
+
+logger = logging.getLogger(__name__)
+
+
+class RegisteredModel:
+    """
+    A fitted classifier together with the feature columns it was trained
+    on. Passes for an `ml_model` anywhere in engine: predict_proba is the
+    estimator's, and feature_cols is picked up when none are given.
+    """
+
+    def __init__(self, estimator, feature_cols: Sequence[str], path: Optional[str] = None):
+        self.estimator = estimator
+        self.feature_cols = list(feature_cols)
+        self.path = path
+
+    def predict_proba(self, X):
+        return self.estimator.predict_proba(X)
+
+
+def save_model(estimator, feature_cols: Sequence[str], path: str):
+    """
+    Write estimator + feature columns as one joblib file. Left uncompressed
+    so ModelRegistry can memory-map its arrays.
+    """
+    import joblib
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump({"estimator": estimator, "feature_cols": list(feature_cols)}, path)
+
+
+class ModelRegistry:
+    """
+    Loads each model file once per process and hands out the same
+    RegisteredModel afterwards. Large numpy arrays inside the estimator
+    (tree node tables, coefficients) are memory-mapped with `mmap_mode`, so
+    loading is fast and forked workers share the pages. A file replaced on
+    disk is reloaded on the next get().
+    """
+
+    def __init__(self, mmap_mode: Optional[str] = "r"):
+        self.mmap_mode = mmap_mode
+        self._models: Dict[str, Tuple[float, RegisteredModel]] = {}
+        self._lock = threading.Lock()
+        self._missing = set()  # paths already warned about
+        self.loads = 0
+
+    def get(self, path: Optional[str] = None) -> Optional[RegisteredModel]:
+        """
+        The model at `path` (default ML_MODEL_PATH); None when no path is
+        configured or the file does not exist (recommendations then carry no
+        ML probability), with one warning per missing path.
+        """
+        path = path or ML_MODEL_PATH
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            with self._lock:
+                if path not in self._missing:
+                    self._missing.add(path)
+                    logger.warning("ML model file %s does not exist; scoring without it", path)
+            return None
+        with self._lock:
+            self._missing.discard(path)
+            cached = self._models.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            import joblib
+
+            bundle = joblib.load(path, mmap_mode=self.mmap_mode)
+            model = RegisteredModel(bundle["estimator"], bundle["feature_cols"], path=path)
+            self._models[path] = (mtime, model)
+            self.loads += 1
+            return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._missing.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"models": len(self._models), "loads": self.loads, "mmap_mode": self.mmap_mode}
+
+
+model_registry = ModelRegistry()
+
+
+def get_model(path: Optional[str] = None) -> Optional[RegisteredModel]:
+    return model_registry.get(path)
@@ -0,0 +1,269 @@
+# panel.py
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from engine import REQUIRED_SIGNAL_COLS, model_feature_cols, make_recommendation, predict_probs
+
+
+# Integer codes for market_regime; index into REGIME_LABELS to get the string
+REGIME_SIDEWAYS, REGIME_BULL_LOW_VOL, REGIME_BULL_HIGH_VOL, REGIME_BEAR = 0, 1, 2, 3
+REGIME_LABELS = np.array(["Sideways", "Bull-Low-Vol", "Bull-High-Vol", "Bear"], dtype=object)
+
+# Same column order as engine.build_signals
+SIGNAL_COLS = [
+    "close_price", "MA_short", "MA_long", "return", "trend_signal", "trend_strength",
+    "volatility", "market_regime", "rsi", "rsi_signal", "recent_high", "recent_low",
+    "breakout_signal", "signal_sum", "signal_count",
+]
+
+
+# ---------- ROLLING HELPERS (2-D, time on axis 0) ----------
+
+def _nan_rows(k: int, n: int) -> np.ndarray:
+    return np.full((k, n), np.nan)
+
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling sum over `window` rows; NaN unless all values in the window are
+    present (pandas' min_periods=window behaviour).
+    """
+    valid = ~np.isnan(x)
+    zero = np.zeros((1, x.shape[1]))
+    csum = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+    ccnt = np.concatenate([zero, np.cumsum(valid, axis=0)])
+
+    out = csum[window:] - csum[:-window]
+    out[(ccnt[window:] - ccnt[:-window]) < window] = np.nan
+    return np.concatenate([_nan_rows(window - 1, x.shape[1]), out])
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling sample standard deviation (ddof=1) from running sums. Columns are
+    centred first to keep the sum-of-squares cancellation small.
+    """
+    valid = ~np.isnan(x)
+    col_mean = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    xc = x - col_mean
+    s1 = rolling_sum(xc, window)
+    s2 = rolling_sum(xc * xc, window)
+    var = (s2 - s1 * s1 / window) / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0, where=~np.isnan(var), out=var))
+
+
+def rolling_extreme(x: np.ndarray, window: int, mode: str = "max") -> np.ndarray:
+    """
+    Rolling max/min over `window` rows. Any NaN in the window gives NaN.
+    """
+    view = sliding_window_view(x, window, axis=0)
+    out = view.max(axis=-1) if mode == "max" else view.min(axis=-1)
+    return np.concatenate([_nan_rows(window - 1, x.shape[1]), out])
+
+
+def _shift(x: np.ndarray, k: int = 1) -> np.ndarray:
+    return np.concatenate([_nan_rows(k, x.shape[1]), x[:-k]])
+
+
+# ---------- PANEL SIGNALS ----------
+
+class SignalPanel:
+    """
+    Output of build_signals_panel: one (dates x tickers) array per feature.
+    market_regime holds integer codes (see REGIME_LABELS).
+    """
+
+    def __init__(self, index: pd.Index, tickers: Sequence[str], features: Dict[str, np.ndarray]):
+        self.index = index
+        self.tickers = list(tickers)
+        self.features = features
+        self._col = {t: j for j, t in enumerate(self.tickers)}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.features[name]
+
+    def frame(self, ticker: str) -> pd.DataFrame:
+        """
+        Per-ticker DataFrame with the same columns as engine.build_signals.
+        """
+        j = self._col[ticker]
+        data = {c: self.features[c][:, j] for c in SIGNAL_COLS}
+        data["market_regime"] = REGIME_LABELS[data["market_regime"]]
+        return pd.DataFrame(data, index=self.index)
+
+    def row(self, ticker: str, i: int = -1) -> pd.Series:
+        """
+        Single feature row for `ticker`, ready for make_recommendation.
+        """
+        j = self._col[ticker]
+        values = [self.features[c][i, j] for c in SIGNAL_COLS]
+        values[SIGNAL_COLS.index("market_regime")] = REGIME_LABELS[values[SIGNAL_COLS.index("market_regime")]]
+        return pd.Series(values, index=SIGNAL_COLS, dtype=object, name=self.index[i])
+
+    def feature_matrix(self, cols: Sequence[str], positions: np.ndarray) -> np.ndarray:
+        """
+        (tickers x cols) matrix of numeric features, taking row positions[j]
+        for ticker j.
+        """
+        j = np.arange(len(self.tickers))
+        return np.column_stack([self.features[c][positions, j] for c in cols]).astype(float)
+
+    def latest_valid_positions(self) -> np.ndarray:
+        """
+        Row position of each ticker's last row with all required features,
+        or -1 where there is none.
+        """
+        valid = np.ones(self.features["close_price"].shape, dtype=bool)
+        for c in REQUIRED_SIGNAL_COLS:
+            valid &= ~np.isnan(self.features[c])
+        last = valid.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+        return np.where(valid.any(axis=0), last, -1)
+
+
+def stack_closes(frames: Dict[str, pd.DataFrame]) -> np.ndarray:
+    """
+    Right-align each ticker's 'close_price' history into one (bars x tickers)
+    matrix, padding shorter histories with NaN at the top. Aligning by bar
+    position rather than by date keeps every ticker's rolling windows exactly
+    as they would be for that ticker alone, even across different calendars.
+    """
+    cols = [df["close_price"].to_numpy(dtype=float) for df in frames.values()]
+    length = max((len(c) for c in cols), default=0)
+    out = np.full((length, len(cols)), np.nan)
+    for j, c in enumerate(cols):
+        if len(c):
+            out[length - len(c):, j] = c
+    return out
+
+
+def build_signals_panel(
+    closes,
+    tickers: Optional[Sequence[str]] = None,
+    index: Optional[pd.Index] = None,
+    ma_short: int = 20,
+    ma_long: int = 50,
+    rsi_window: int = 14,
+    vol_window: int = 14,
+    breakout_window: int = 20,
+    rsi_upper: float = 55,
+    rsi_lower: float = 45,
+) -> SignalPanel:
+    """
+    Vectorised build_signals over a wide close-price matrix (dates x tickers),
+    given as a DataFrame or a 2-D array, with the same window and threshold
+    parameters. Every feature is computed for all tickers at once; missing
+    prices are NaN.
+    """
+    if isinstance(closes, pd.DataFrame):
+        tickers = list(closes.columns) if tickers is None else tickers
+        index = closes.index if index is None else index
+        closes = closes.to_numpy(dtype=float)
+    cp = np.asarray(closes, dtype=float)
+    if cp.ndim != 2:
+        raise ValueError("closes must be a 2-D (dates x tickers) matrix")
+    tickers = list(range(cp.shape[1])) if tickers is None else tickers
+    index = pd.RangeIndex(cp.shape[0]) if index is None else index
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Moving averages
+        ma_short = rolling_mean(cp, ma_short)
+        ma_long = rolling_mean(cp, ma_long)
+
+        # Returns
+        prev = _shift(cp)
+        ret = cp / prev - 1
+
+        # Trend signal / strength
+        trend_signal = (ma_short > ma_long).astype(np.int8)
+        trend_strength = (cp - ma_long) / ma_long
+
+        # Volatility
+        volatility = rolling_std(ret, vol_window)
+
+        # Market regime (integer coded)
+        bull = trend_strength > 0.01
+        regime = np.full(cp.shape, REGIME_SIDEWAYS, dtype=np.int8)
+        regime[bull & (volatility < 0.02)] = REGIME_BULL_LOW_VOL
+        regime[bull & (volatility >= 0.02)] = REGIME_BULL_HIGH_VOL
+        regime[trend_strength < -0.01] = REGIME_BEAR
+
+        # RSI
+        delta = cp - prev
+        avg_gain = rolling_mean(np.maximum(delta, 0.0), rsi_window)
+        avg_loss = rolling_mean(-np.minimum(delta, 0.0), rsi_window)
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        # RSI-based signal
+        is_bull = (regime == REGIME_BULL_LOW_VOL) | (regime == REGIME_BULL_HIGH_VOL)
+        rsi_signal = np.zeros(cp.shape, dtype=np.int8)
+        rsi_signal[is_bull & (rsi > rsi_upper)] = 1
+        rsi_signal[(regime == REGIME_BEAR) & (rsi < rsi_lower)] = -1
+
+        # Breakout strategy
+        recent_high = _shift(rolling_extreme(cp, breakout_window, "max"))
+        recent_low = _shift(rolling_extreme(cp, breakout_window, "min"))
+        breakout_signal = np.zeros(cp.shape, dtype=np.int8)
+        breakout_signal[cp > recent_high] = 1
+        breakout_signal[cp < recent_low] = -1
+
+    # Combined voting
+    signal_sum = trend_signal.astype(np.int16) + rsi_signal + breakout_signal
+    signal_count = (trend_signal != 0).astype(np.int8) + (rsi_signal != 0) + (breakout_signal != 0)
+
+    features = {
+        "close_price": cp,
+        "MA_short": ma_short,
+        "MA_long": ma_long,
+        "return": ret,
+        "trend_signal": trend_signal,
+        "trend_strength": trend_strength,
+        "volatility": volatility,
+        "market_regime": regime,
+        "rsi": rsi,
+        "rsi_signal": rsi_signal,
+        "recent_high": recent_high,
+        "recent_low": recent_low,
+        "breakout_signal": breakout_signal,
+        "signal_sum": signal_sum,
+        "signal_count": signal_count,
+    }
+    return SignalPanel(index, tickers, features)
+
+
+def recommendations_from_panel(
+    panel: SignalPanel,
+    period: str = "2y",
+    interval: str = "1d",
+    ml_model=None,
+    feature_cols: Optional[Sequence[str]] = None,
+) -> List[Dict]:
+    """
+    One recommendation (or {"ticker", "error"}) per ticker, from each ticker's
+    latest row with all required features. With an ML model, all tickers
+    are scored in one predict_proba call straight from the panel arrays.
+    """
+    positions = panel.latest_valid_positions()
+    probs = [None] * len(positions)
+    cols = model_feature_cols(ml_model, feature_cols)
+    if ml_model is not None and cols is not None and (positions >= 0).any():
+        scored = predict_probs(ml_model, panel.feature_matrix(cols, np.maximum(positions, 0)))
+        probs = [None if pos < 0 or np.isnan(p) else float(p) for pos, p in zip(positions, scored)]
+
+    results = []
+    for ticker, pos, prob in zip(panel.tickers, positions, probs):
+        if pos < 0:
+            results.append({"ticker": ticker, "error": "Not enough data to compute signals after dropping NaNs."})
+            continue
+        rec = make_recommendation(panel.row(ticker, pos), ml_prob=prob)
+        rec["ticker"] = ticker
+        rec["period_used"] = period
+        rec["interval_used"] = interval
+        results.append(rec)
+    return results
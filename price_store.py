@@ -0,0 +1,342 @@
+# price_store.py
+import abc
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# How long a cached series is considered fresh before we ask the provider
+# for the missing tail again (seconds, per interval).
+REFRESH_AFTER = {
+    "1m": 30,
+    "2m": 60,
+    "5m": 120,
+    "15m": 300,
+    "30m": 600,
+    "60m": 900,
+    "1h": 900,
+    "90m": 900,
+    "1d": 3600,
+    "5d": 6 * 3600,
+    "1wk": 6 * 3600,
+    "1mo": 24 * 3600,
+    "3mo": 24 * 3600,
+}
+DEFAULT_REFRESH_AFTER = 3600
+
+
+# ---------- HELPERS ----------
+
+def normalize_ohlcv(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flatten yfinance-style MultiIndex columns and keep only the OHLCV columns,
+    indexed by a sorted, de-duplicated DatetimeIndex.
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([]))
+
+    raw = raw.copy()
+
+    # Handle MultiIndex columns if present (yfinance sometimes does this)
+    if isinstance(raw.columns, pd.MultiIndex):
+        lvl0 = list(raw.columns.get_level_values(0))
+        lvl1 = list(raw.columns.get_level_values(1))
+
+        if any(lbl in OHLCV_COLUMNS for lbl in lvl0):
+            raw.columns = raw.columns.get_level_values(0)
+        elif any(lbl in OHLCV_COLUMNS for lbl in lvl1):
+            raw.columns = raw.columns.get_level_values(1)
+        else:
+            raise ValueError("Could not detect price columns from MultiIndex")
+
+    cols = [c for c in OHLCV_COLUMNS if c in raw.columns]
+    if not cols:
+        raise ValueError(f"No OHLCV columns found in data. Got columns: {list(raw.columns)}")
+
+    df = raw.loc[:, ~raw.columns.duplicated()][cols]
+    df = df.apply(pd.to_numeric, errors="coerce")
+    df.columns.name = None
+
+    idx = pd.to_datetime(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_convert("UTC").tz_localize(None)
+    df.index = idx
+    df.index.name = "Date"
+
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df
+
+
+def period_start(period: str, end: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """
+    Translate a yfinance period string ('5d', '6mo', '2y', 'ytd', 'max', ...)
+    into the first timestamp it covers. Returns None for 'max'.
+    """
+    end = pd.Timestamp.now().normalize() if end is None else end
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=end.year, month=1, day=1)
+
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if m is None:
+        raise ValueError(f"Unsupported period: {period}")
+
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d":
+        return end - pd.DateOffset(days=n)
+    if unit == "wk":
+        return end - pd.DateOffset(weeks=n)
+    if unit == "mo":
+        return end - pd.DateOffset(months=n)
+    return end - pd.DateOffset(years=n)
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", text)
+
+
+# ---------- PROVIDERS ----------
+
+class PriceProvider(abc.ABC):
+    """
+    Source of raw OHLCV bars. Subclasses return a DataFrame accepted by
+    normalize_ohlcv, either for a whole `period` (counted back from the last
+    available bar) or from `start` onwards.
+    """
+
+    @abc.abstractmethod
+    def fetch(
+        self,
+        ticker: str,
+        interval: str = "1d",
+        period: Optional[str] = None,
+        start: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        ...
+
+
+class YahooProvider(PriceProvider):
+    """
+    Download bars from Yahoo Finance via yfinance.
+    """
+
+    def fetch(self, ticker, interval="1d", period=None, start=None):
+        import yfinance as yf
+
+        if start is not None:
+            return yf.download(ticker, start=start, interval=interval, auto_adjust=False, progress=False)
+        return yf.download(ticker, period=period or "2y", interval=interval, auto_adjust=False, progress=False)
+
+
+class InMemoryProvider(PriceProvider):
+    """
+    Serve bars from DataFrames held in memory, keyed by ticker.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self.frames = {t: normalize_ohlcv(df) for t, df in frames.items()}
+        self.calls = 0
+
+    def fetch(self, ticker, interval="1d", period=None, start=None):
+        self.calls += 1
+        if ticker not in self.frames:
+            return pd.DataFrame()
+        df = self.frames[ticker]
+        if start is None and period is not None:
+            start = period_start(period, end=df.index[-1] if len(df) else None)
+        if start is not None:
+            df = df[df.index >= start]
+        return df.copy()
+
+
+class CSVProvider(InMemoryProvider):
+    """
+    Serve bars from local CSV files instead of the network.
+
+    `path` is either a directory containing one `<ticker>.csv` per symbol, or a
+    single CSV (e.g. strategy_results.csv) that is served for every ticker.
+    Both plain one-row headers and yfinance's Price/Ticker/Date export are read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        super().__init__({})
+
+    @staticmethod
+    def read_csv(path: str) -> pd.DataFrame:
+        with open(path, "r", encoding="utf-8") as f:
+            head = [f.readline() for _ in range(3)]
+
+        if len(head) > 2 and head[1].startswith("Ticker") and head[2].startswith("Date"):
+            raw = pd.read_csv(path, header=[0, 1], index_col=0, skiprows=[2], parse_dates=True)
+        else:
+            raw = pd.read_csv(path, index_col=0, parse_dates=True)
+        return normalize_ohlcv(raw)
+
+    def fetch(self, ticker, interval="1d", period=None, start=None):
+        if ticker not in self.frames:
+            if os.path.isdir(self.path):
+                path = os.path.join(self.path, f"{_safe_name(ticker)}.csv")
+                if not os.path.exists(path):
+                    return pd.DataFrame()
+            else:
+                path = self.path
+            self.frames[ticker] = self.read_csv(path)
+        return super().fetch(ticker, interval=interval, period=period, start=start)
+
+
+# ---------- STORE ----------
+
+class PriceStore:
+    """
+    Persistent OHLCV cache keyed by (ticker, interval), stored as one Parquet
+    file per key. Only the tail since the last cached bar is fetched from the
+    provider; `period` slices are served from local data. Like the providers,
+    a `period` counts back from the last available bar, not from today.
+    """
+
+    def __init__(self, root: str = ".cache/prices", provider: Optional[PriceProvider] = None):
+        self.root = root
+        self.provider = provider or YahooProvider()
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        self._meta: Dict[tuple, dict] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, ticker: str, interval: str):
+        base = os.path.join(self.root, f"{_safe_name(ticker)}__{_safe_name(interval)}")
+        return base + ".parquet", base + ".json"
+
+    def _lock_for(self, key: tuple) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _read(self, key: tuple):
+        if key in self._frames:
+            return self._frames[key], self._meta[key]
+
+        data_path, meta_path = self._paths(*key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, {}
+
+        df = pd.read_parquet(data_path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._frames[key], self._meta[key] = df, meta
+        return df, meta
+
+    def _write(self, key: tuple, df: pd.DataFrame, meta: dict):
+        data_path, meta_path = self._paths(*key)
+        tmp = data_path + ".tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, data_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._frames[key], self._meta[key] = df, meta
+
+    def load(self, ticker: str, period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+        """
+        Return OHLCV bars for `ticker` covering `period`, refreshing the cache
+        from the provider when it is stale or does not reach back far enough.
+        """
+        key = (ticker, interval)
+        with self._lock_for(key):
+            df, meta = self._read(key)
+            now = time.time()
+
+            covered_from = meta.get("covered_from")
+            covers = df is not None and not df.empty and (
+                covered_from == "max"
+                or (period != "max" and covered_from is not None
+                    and pd.Timestamp(covered_from) <= period_start(period, end=df.index[-1]))
+            )
+
+            if not covers:
+                # Cold cache, or a longer period than we have: full download
+                df = normalize_ohlcv(self.provider.fetch(ticker, interval=interval, period=period))
+                if not df.empty:
+                    covered = period_start(period, end=df.index[-1])
+                    meta = {"covered_from": "max" if covered is None else covered.isoformat(), "fetched_at": now}
+                    self._write(key, df, meta)
+            elif now - meta.get("fetched_at", 0) > REFRESH_AFTER.get(interval, DEFAULT_REFRESH_AFTER):
+                # Re-fetch from the last cached bar: it may have been a partial bar.
+                # Appended bars are re-fetched too, so provider data replaces them
+                since = pd.Timestamp(meta["appended_from"]) if "appended_from" in meta else df.index[-1]
+                tail = normalize_ohlcv(self.provider.fetch(ticker, interval=interval, start=since))
+                if not tail.empty:
+                    df = pd.concat([df[df.index < tail.index[0]], tail])
+                meta = {k: v for k, v in meta.items() if k != "appended_from"}
+                meta["fetched_at"] = now
+                self._write(key, df, meta)
+
+        want_from = period_start(period, end=df.index[-1]) if not df.empty else None
+        if want_from is not None:
+            df = df[df.index >= want_from]
+        return df
+
+    def append(self, ticker: str, interval: str, bars: pd.DataFrame) -> int:
+        """
+        Add bars newer than the last cached one (e.g. aggregated from live
+        ticks) to the cached (ticker, interval) series. Nothing is stored for
+        a series that is not cached yet, so its first load still downloads
+        the whole period. Returns the number of bars added.
+        """
+        key = (ticker, interval)
+        with self._lock_for(key):
+            df, meta = self._read(key)
+            if df is None or df.empty:
+                return 0
+            new = normalize_ohlcv(bars)
+            new = new[new.index > df.index[-1]]
+            if new.empty:
+                return 0
+            meta = dict(meta)
+            meta.setdefault("appended_from", new.index[0].isoformat())
+            self._write(key, pd.concat([df, new]), meta)
+        return len(new)
+
+    def clear(self, ticker: Optional[str] = None):
+        """
+        Drop cached series, for one ticker or all of them.
+        """
+        for key in list(self._frames):
+            if ticker is None or key[0] == ticker:
+                self._frames.pop(key, None)
+                self._meta.pop(key, None)
+        for fname in os.listdir(self.root):
+            if ticker is None or fname.startswith(_safe_name(ticker) + "__"):
+                os.remove(os.path.join(self.root, fname))
+
+
+_store: Optional[PriceStore] = None
+
+
+def get_price_store() -> PriceStore:
+    """
+    Process-wide store. Set PRICE_CACHE_DIR to move the cache and PRICE_CSV_PATH
+    to serve prices from local CSV files instead of Yahoo.
+    """
+    global _store
+    if _store is None:
+        csv_path = os.environ.get("PRICE_CSV_PATH")
+        provider = CSVProvider(csv_path) if csv_path else YahooProvider()
+        _store = PriceStore(os.environ.get("PRICE_CACHE_DIR", ".cache/prices"), provider=provider)
+    return _store
+
+
+def set_price_store(store: Optional[PriceStore]):
+    """
+    Replace the process-wide store (e.g. with one backed by a CSVProvider).
+    """
+    global _store
+    _store = store
@@ -1,19 +1,21 @@
 # rag_llm.py
 
+import math
 import os
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-import numpy as np
+import textwrap
+import threading
+from typing import List, Dict, Optional
+
+from result_cache import ResultCache, SqliteTTLCache
 
 # ---------- 1. LOAD / INITIALIZE KNOWLEDGE BASE ----------
+# Nothing here runs at import time: the KB is read and the TF-IDF model
+# fitted on first use (or by warmup()), so importing this module is cheap.
 
 KB_DIR = "kb"
-os.makedirs(KB_DIR, exist_ok=True)
 
-# If kb/ is empty, create some default files
-if not os.listdir(KB_DIR):
-    files_content = {
-        "market_regimes.md": """
+DEFAULT_KB_FILES = {
+    "market_regimes.md": """
 Bull-Low-Vol Regime:
 This regime indicates a stable uptrend with controlled volatility. Trend-following strategies and momentum-based entries tend to perform well. Risk is lower compared to high-volatility regimes.
 
@@ -26,7 +28,7 @@ This regime indicates a dominant downtrend. Long positions are risky. Short-sell
 Sideways Regime:
 No clear directional trend. Mean-reversion strategies perform better than trend or breakout strategies.
 """,
-        "rsi_explained.md": """
+    "rsi_explained.md": """
 RSI (Relative Strength Index) measures momentum on a scale of 0 to 100.
 
 RSI above 55 indicates bullish momentum.
@@ -35,21 +37,21 @@ RSI between 45 and 55 is considered neutral.
 
 RSI performs best when combined with trend context. High RSI in a bull market suggests continuation, while high RSI in a sideways market can indicate exhaustion.
 """,
-        "trend_following.md": """
+    "trend_following.md": """
 Trend following assumes that price movement persists in the same direction.
 
 Moving average crossovers are a basic trend-following signal.
 When short-term MA moves above long-term MA, momentum is considered bullish.
 Trend strategies work best in strong, directional markets and fail in choppy sideways markets.
 """,
-        "breakout_strategies.md": """
+    "breakout_strategies.md": """
 Breakout strategies attempt to capture large directional moves after price exits a range.
 
 Breakouts above recent highs indicate bullish strength.
 Breakdowns below recent lows indicate bearish weakness.
 False breakouts are common in low-volume or low-volatility environments.
 """,
-        "risk_management.md": """
+    "risk_management.md": """
 Risk management controls losses and protects capital.
 
 Never risk more than a small percentage of capital on a single trade.
@@ -57,74 +59,153 @@ Use stop-loss orders to prevent catastrophic losses.
 High-volatility regimes require smaller position sizes.
 No strategy works all the time; drawdowns are unavoidable.
 """
-    }
-    for fname, content in files_content.items():
+}
+
+
+def _ensure_default_kb():
+    """
+    Create kb/ with the default documents if it is missing or empty.
+    """
+    os.makedirs(KB_DIR, exist_ok=True)
+    if os.listdir(KB_DIR):
+        return
+    for fname, content in DEFAULT_KB_FILES.items():
         path = os.path.join(KB_DIR, fname)
         with open(path, "w", encoding="utf-8") as f:
             f.write(content.strip() + "\n")
 
-# Load KB into memory
-_docs: List[str] = []
-_sources: List[str] = []
 
-for fname in os.listdir(KB_DIR):
-    path = os.path.join(KB_DIR, fname)
-    if not os.path.isfile(path):
-        continue
-    with open(path, "r", encoding="utf-8") as f:
-        text = f.read()
-    _docs.append(text.strip())
-    _sources.append(fname)
+_index = None
+_index_lock = threading.Lock()
 
-_clean_docs = [d for d in _docs if d.strip()]
-_clean_sources = [s for s, d in zip(_sources, _docs) if d.strip()]
 
-_vectorizer = TfidfVectorizer()
-_doc_matrix = _vectorizer.fit_transform(_clean_docs)
+def _get_index():
+    """
+    The persisted KB index (kb_index.KnowledgeIndex), loaded on first use
+    and brought up to date with kb/.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            from kb_index import KnowledgeIndex
+
+            _ensure_default_kb()
+            _index = KnowledgeIndex(KB_DIR).load_or_build()
+        return _index
 
 
 # ---------- 2. RAG RETRIEVAL ----------
 
 def retrieve_kb_docs(query: str, k: int = 3) -> List[Dict]:
     """
-    Return top-k KB docs most relevant to the query using TF-IDF.
+    Return the top-k KB chunks (paragraphs) most relevant to the query
+    using TF-IDF, best first.
     """
-    q_vec = _vectorizer.transform([query])
-    scores = (_doc_matrix @ q_vec.T).toarray().ravel()
-    topk_idx = scores.argsort()[::-1][:k]
+    return [
+        {"source": hit["source"], "score": hit["score"], "text": hit["text"]}
+        for hit in _get_index().search(query, k=k)
+    ]
 
-    results = []
-    for i in topk_idx:
-        results.append({
-            "source": _clean_sources[i],
-            "score": float(scores[i]),
-            "text": _clean_docs[i],
-        })
-    return results
 
+# ---------- 2b. EXPLANATION CACHE ----------
+# Retrieval depends only on the action, regime, RSI and the three signals,
+# so KB hits are cached per normalized signal state with RSI bucketed. LLM
+# completions are cached on that state plus ticker, model and (bucketed)
+# ML probability.
 
-# ---------- 3. SIMPLE RAG-BASED EXPLANATION (no LLM) ----------
+RSI_BUCKET = 5.0  # RSI points per cache bucket
+ML_PROB_BUCKET = 0.05
+EXPLANATION_TTL = float(os.environ.get("EXPLANATION_TTL", "900"))  # seconds
+EXPLANATION_CACHE_PATH = os.environ.get("EXPLANATION_CACHE_PATH")  # SQLite file; memory only when unset
+
+
+def _bucket(value, width: float) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value):
+        return None
+    return round(math.floor(value / width) * width, 4)
 
-def generate_rag_explanation(rec: dict, k: int = 3) -> Dict:
+
+def _signal(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def signal_state(rec: dict) -> tuple:
     """
-    Use KB + signals to build a human-readable explanation WITHOUT an LLM.
-    Returns a dict with 'explanation' and 'kb_sources'.
+    (action, market_regime, RSI bucket, trend, RSI and breakout signals):
+    everything the KB retrieval query is built from.
     """
+    return (
+        str(rec["action"]),
+        str(rec["market_regime"]),
+        _bucket(rec["rsi"], RSI_BUCKET),
+        _signal(rec["trend_signal"]),
+        _signal(rec["rsi_signal"]),
+        _signal(rec["breakout_signal"]),
+    )
 
-    query = f"""
+
+def _kb_query(state: tuple) -> str:
+    action, regime, rsi, trend, rsi_signal, breakout = state
+    return f"""
     Explain this trade setup.
 
-    Ticker: {rec.get('ticker', 'N/A')}
-    Action: {rec['action']}
-    Market Regime: {rec['market_regime']}
-    RSI: {rec['rsi']}
-    Trend Signal: {rec['trend_signal']}
-    RSI Signal: {rec['rsi_signal']}
-    Breakout Signal: {rec['breakout_signal']}
-    ML Probability: {rec.get('ml_prob_profitable')}
+    Action: {action}
+    Market Regime: {regime}
+    RSI: {rsi}
+    Trend Signal: {trend}
+    RSI Signal: {rsi_signal}
+    Breakout Signal: {breakout}
     """
 
-    kb_hits = retrieve_kb_docs(query, k=k)
+
+def _explanation_cache(table: str, maxsize: int) -> ResultCache:
+    disk = None
+    if EXPLANATION_CACHE_PATH:
+        disk = SqliteTTLCache(EXPLANATION_CACHE_PATH, maxsize=maxsize * 10, table=table)
+    return ResultCache(maxsize=maxsize, disk=disk)
+
+
+kb_hits_cache = _explanation_cache("kb_hits", 1024)
+llm_explanation_cache = _explanation_cache("llm_explanations", 1024)
+
+
+def cached_kb_hits(rec: dict, k: int = 3, use_cache: bool = True) -> List[Dict]:
+    """
+    KB hits for the signal state of `rec`. The key includes the index
+    generation, so edits to kb/ are never answered from stale entries.
+    """
+    state = signal_state(rec)
+    if not use_cache:
+        return retrieve_kb_docs(_kb_query(state), k=k)
+
+    index = _get_index()
+    index.refresh()
+    return kb_hits_cache.get_or_compute(
+        (index.generation, k) + state,
+        lambda: retrieve_kb_docs(_kb_query(state), k=k),
+        ttl=EXPLANATION_TTL,
+    )
+
+
+def explanation_cache_stats() -> Dict:
+    return {"kb_hits": kb_hits_cache.stats(), "llm": llm_explanation_cache.stats()}
+
+
+# ---------- 3. SIMPLE RAG-BASED EXPLANATION (no LLM) ----------
+
+def generate_rag_explanation(rec: dict, k: int = 3, use_cache: bool = True) -> Dict:
+    """
+    Use KB + signals to build a human-readable explanation WITHOUT an LLM.
+    Returns a dict with 'explanation' and 'kb_sources'.
+    """
+    kb_hits = cached_kb_hits(rec, k=k, use_cache=use_cache)
 
     lines = []
     lines.append(f"Recommended action: {rec['action']} on {rec.get('ticker', 'this asset')}.")
@@ -144,8 +225,6 @@ def generate_rag_explanation(rec: dict, k: int = 3) -> Dict:
     for hit in kb_hits:
         lines.append(f"\nFrom {hit['source']} (score {hit['score']:.3f}):")
         snippet = hit["text"].replace("\n", " ").strip()
-        if len(snippet) > 350:
-            snippet = snippet[:350] + "..."
         lines.append(f"  {snippet}")
 
     lines.append("")
@@ -155,39 +234,66 @@ def generate_rag_explanation(rec: dict, k: int = 3) -> Dict:
 
     return {
         "explanation": explanation_text,
-        "kb_sources": [h["source"] for h in kb_hits],
+        "kb_sources": list(dict.fromkeys(h["source"] for h in kb_hits)),
     }
 
 
 # ---------- 4. OPTIONAL: LLM-BASED EXPLANATION ----------
 
-try:
-    from openai import OpenAI
-    import textwrap
-    _client = OpenAI()
-except Exception:
-    _client = None
+_client = None
+_client_lock = threading.Lock()
 
 
-def generate_llm_explanation(rec: dict, k: int = 3, model_name: str = "gpt-5.1-mini") -> str:
+def get_openai_client():
+    """
+    The OpenAI client, created on first use; None if openai is not
+    installed or no API key is configured.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                from openai import OpenAI
+                _client = OpenAI()
+            except Exception:
+                return None
+        return _client
+
+
+def generate_llm_explanation(
+    rec: dict, k: int = 3, model_name: str = "gpt-5.1-mini", use_cache: bool = True
+) -> str:
     """
     Use RAG + OpenAI LLM to generate a nicer explanation.
     Requires OPENAI_API_KEY in the environment and openai installed.
+
+    Completions are reused for EXPLANATION_TTL seconds for the same model,
+    ticker and signal state (RSI and ML probability bucketed), so the
+    figures quoted in a cached one may be that old.
     """
-    if _client is None:
+    client = get_openai_client()
+    if client is None:
         raise RuntimeError("OpenAI client not available. Install 'openai' and set OPENAI_API_KEY.")
+    if not use_cache:
+        return _complete_explanation(client, rec, k, model_name, use_cache=False)
 
-    kb_hits = retrieve_kb_docs(
-        f"Action {rec['action']}, regime {rec['market_regime']}, RSI {rec['rsi']}, signals {rec['trend_signal']}, {rec['rsi_signal']}, {rec['breakout_signal']}",
-        k=k
+    return llm_explanation_cache.get_or_compute(
+        llm_cache_key(rec, k, model_name), lambda: _complete_explanation(client, rec, k, model_name), ttl=EXPLANATION_TTL
     )
 
-    context_chunks = []
-    for hit in kb_hits:
-        snippet = hit["text"].strip()
-        if len(snippet) > 600:
-            snippet = snippet[:600] + "..."
-        context_chunks.append(f"From {hit['source']}:\n{snippet}")
+
+def llm_cache_key(rec: dict, k: int, model_name: str) -> tuple:
+    return (model_name, k, rec.get("ticker"), _bucket(rec.get("ml_prob_profitable"), ML_PROB_BUCKET)) + signal_state(rec)
+
+
+def explanation_messages(rec: dict, k: int = 3, use_cache: bool = True) -> List[Dict]:
+    """
+    Chat messages (system + user prompt with KB context) asking the LLM to
+    explain `rec`.
+    """
+    kb_hits = cached_kb_hits(rec, k=k, use_cache=use_cache)
+
+    context_chunks = [f"From {hit['source']}:\n{hit['text'].strip()}" for hit in kb_hits]
     context_text = "\n\n".join(context_chunks)
 
     state_summary = f"""
@@ -220,13 +326,37 @@ def generate_llm_explanation(rec: dict, k: int = 3, model_name: str = "gpt-5.1-m
     4. Do NOT invent numbers; use only the information provided.
     """
 
-    completion = _client.chat.completions.create(
+    return [
+        {"role": "system", "content": "You are a careful, realistic trading explainer. Never guarantee profits."},
+        {"role": "user", "content": textwrap.dedent(prompt).strip()},
+    ]
+
+
+def _complete_explanation(client, rec: dict, k: int, model_name: str, use_cache: bool = True) -> str:
+    completion = client.chat.completions.create(
         model=model_name,
-        messages=[
-            {"role": "system", "content": "You are a careful, realistic trading explainer. Never guarantee profits."},
-            {"role": "user", "content": textwrap.dedent(prompt).strip()},
-        ],
+        messages=explanation_messages(rec, k=k, use_cache=use_cache),
         temperature=0.4,
     )
 
     return completion.choices[0].message.content
+
+
+# ---------- 5. WARMUP ----------
+
+def warmup(llm: bool = True) -> Dict[str, float]:
+    """
+    Build the KB index (and the OpenAI client) ahead of the first request.
+    Returns seconds spent per step.
+    """
+    import time
+
+    timings = {}
+    t0 = time.perf_counter()
+    _get_index()
+    timings["rag_index"] = time.perf_counter() - t0
+    if llm:
+        t0 = time.perf_counter()
+        get_openai_client()
+        timings["openai_client"] = time.perf_counter() - t0
+    return timings
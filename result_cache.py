@@ -0,0 +1,287 @@
+# result_cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+# Seconds a recommendation stays valid, per bar interval. Daily bars barely
+# move intraday, so a few minutes is plenty; intraday bars expire faster.
+RECOMMENDATION_TTL = {
+    "1m": 20,
+    "2m": 30,
+    "5m": 60,
+    "15m": 120,
+    "30m": 180,
+    "60m": 300,
+    "1h": 300,
+    "90m": 300,
+    "1d": 300,
+    "5d": 1800,
+    "1wk": 1800,
+    "1mo": 3600,
+    "3mo": 3600,
+}
+DEFAULT_TTL = 300
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries also expire after a per-entry TTL.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """
+        Return (found, value); expired entries count as missing.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteTTLCache:
+    """
+    TTLCache-like store in a SQLite file, so entries survive restarts and
+    can be shared between processes. Keys and values must be
+    JSON-serializable (tuple keys are stored as lists). Bounded to `maxsize`
+    rows, evicting the least recently read. Several caches can share one
+    file under different `table` names.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10_000, table: str = "cache"):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = path
+        self.maxsize = maxsize
+        self.table = table
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"))
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[float, object]]:
+        """
+        (seconds left to live, value), or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (self._key(key),)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return None
+            self._db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, self._key(key)))
+        return row[1] - now, json.loads(row[0])
+
+    def get(self, key: Hashable):
+        item = self.lookup(key)
+        return (False, None) if item is None else (True, item[1])
+
+    def set(self, key: Hashable, value, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (self._key(key), json.dumps(value), now + ttl, now),
+            )
+            self._db.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+            cur = self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (self._key(key),))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls: while a computation for `key` is running,
+    other callers for the same key wait for its result instead of starting
+    their own.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+class ResultCache:
+    """
+    TTL + LRU cache with single-flight misses and hit/miss/coalesce counters.
+
+    With a `disk` store (SqliteTTLCache) memory misses are looked up there
+    before computing, and computed values are written to both.
+    """
+
+    def __init__(self, maxsize: int = 1024, disk: Optional[SqliteTTLCache] = None):
+        self._cache = TTLCache(maxsize)
+        self._disk = disk
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        """
+        Return (found, value), counting the lookup as a hit or miss. For
+        callers that compute misses themselves (e.g. in async code) and
+        store them with set().
+        """
+        found, value = self._cache.get(key)
+        if not found and self._disk is not None:
+            item = self._disk.lookup(key)
+            if item is not None:
+                self._cache.set(key, item[1], item[0])
+                with self._lock:
+                    self.disk_hits += 1
+                return True, item[1]
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, value
+
+    def set(self, key: Hashable, value, ttl: float):
+        self._cache.set(key, value, ttl)
+        if self._disk is not None:
+            self._disk.set(key, value, ttl)
+
+    def get_or_compute(self, key: Hashable, fn: Callable, ttl: float):
+        found, value = self.get(key)
+        if found:
+            return value
+
+        def compute():
+            value = fn()
+            self.set(key, value, ttl)
+            return value
+
+        return self._flight.do(key, compute)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        stores = [self._cache] if self._disk is None else [self._cache, self._disk]
+        for store in stores:
+            if key is None:
+                store.clear()
+            else:
+                store.pop(key)
+
+    def stats(self) -> Dict:
+        hits = self.hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self._flight.coalesced,
+            "evictions": self._cache.evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+# ---------- RECOMMENDATIONS ----------
+
+recommendation_cache = ResultCache(maxsize=1024)
+
+
+def cached_recommendation(ticker: str, period: str = "2y", interval: str = "1d") -> Dict:
+    """
+    get_recommendation_for_ticker behind a (ticker, period, interval) cache.
+    Returns a copy, so callers may mutate the dict freely.
+    """
+    from engine import get_recommendation_for_ticker  # pandas & co. load on first use
+
+    rec = recommendation_cache.get_or_compute(
+        (ticker, period, interval),
+        lambda: get_recommendation_for_ticker(ticker, period=period, interval=interval),
+        ttl=RECOMMENDATION_TTL.get(interval, DEFAULT_TTL),
+    )
+    return dict(rec)
@@ -1,7 +1,213 @@
-import mss
+import glob
+import os
+import threading
+
 import numpy as np
 import cv2
-from .config import CAPTURE_REGION
+from .config import CAPTURE_MODE, CAPTURE_REGION
+
+
+# ---------- BACKENDS ----------
+# A backend grabs screen-space boxes {"left", "top", "width", "height"} for
+# one frame. grab() returns one BGR or BGRA array per box; the arrays may
+# be views of backend-owned memory that are only valid until the next grab.
+
+class MssBackend:
+    """
+    Live screen through mss. One mss instance is kept per thread (mss
+    handles are not shareable across threads) and reused for every grab;
+    pixels are returned as zero-copy BGRA views of the screenshot buffer.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def grab(self, boxes):
+        sct = self._sct()
+        out = []
+        for box in boxes:
+            shot = sct.grab(box)
+            out.append(np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4))
+        return out
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class ArrayBackend:
+    """
+    Frames from in-memory arrays covering the capture region (e.g.
+    benchmarks.synthetic.chart_frames), one per grab, for headless runs.
+    Box coordinates are taken relative to `origin`, the region's top-left.
+    """
+
+    def __init__(self, frames, loop=True, origin=(CAPTURE_REGION["left"], CAPTURE_REGION["top"])):
+        self.frames = list(frames)
+        self.loop = loop
+        self.origin = origin
+        self.pos = 0
+
+    def _next(self):
+        if self.pos >= len(self.frames):
+            if not self.loop:
+                return None
+            self.pos = 0
+        frame = self.frames[self.pos]
+        self.pos += 1
+        return frame
+
+    def grab(self, boxes):
+        frame = self._next()
+        if frame is None:
+            return None
+        left, top = self.origin
+        return [
+            frame[b["top"] - top:b["top"] - top + b["height"], b["left"] - left:b["left"] - left + b["width"]]
+            for b in boxes
+        ]
+
+    def close(self):
+        pass
+
+
+class FileBackend(ArrayBackend):
+    """
+    Frames read from a directory of recorded images, in filename order.
+    """
+
+    def __init__(self, directory, loop=False, origin=(CAPTURE_REGION["left"], CAPTURE_REGION["top"])):
+        super().__init__(_frame_paths(directory), loop=loop, origin=origin)
+
+    def _next(self):
+        path = super()._next()
+        return None if path is None else cv2.imread(path)
+
+
+def _frame_paths(directory):
+    paths = sorted(
+        p for ext in ("png", "jpg", "jpeg", "bmp") for p in glob.glob(os.path.join(directory, f"*.{ext}"))
+    )
+    if not paths:
+        raise ValueError(f"No frames found in {directory}")
+    return paths
+
+
+# ---------- CAPTURE SESSION ----------
+
+class CaptureSession:
+    """
+    Persistent capture of the OCR regions of the chart.
+
+    mode (CAPTURE_MODE):
+      "full"  - the whole capture region; ROIs are views into it
+      "union" - only the bounding box of the calibrated ROIs
+      "rois"  - each ROI grabbed on its own
+
+    Pixels are converted into buffers preallocated per calibration (one
+    cvtColor pass, no per-frame allocation), and read_rois() hands out
+    views of them. Those views are overwritten by the next read; read()
+    returns owned copies of just the ROIs, for handing frames to another
+    thread or process.
+    """
+
+    def __init__(self, backend=None, mode=CAPTURE_MODE, region=CAPTURE_REGION, calibration=None):
+        if mode not in ("full", "union", "rois"):
+            raise ValueError(f"Unknown capture mode: {mode}")
+        self.backend = backend if backend is not None else MssBackend()
+        self.mode = mode
+        self.region = dict(region)
+        self._calibration = calibration
+        self._layout_for = None
+        self._boxes = []
+        self._buffers = []
+        self._views = {}
+
+    def _roi_slices(self):
+        from .ocr_pipeline import _calibration
+
+        calibration = self._calibration or _calibration
+        return calibration.roi_slices((self.region["height"], self.region["width"]))
+
+    def _layout(self):
+        """
+        Screen boxes to grab, their buffers and the ROI views into them;
+        rebuilt when the calibration changes.
+        """
+        slices = self._roi_slices()
+        if slices is self._layout_for:
+            return
+        left, top = self.region["left"], self.region["top"]
+
+        def box(ys, xs):
+            return {"left": left + xs.start, "top": top + ys.start,
+                    "width": xs.stop - xs.start, "height": ys.stop - ys.start}
+
+        present = {name: sl for name, sl in slices.items() if sl is not None}
+        if self.mode == "full" or (self.mode == "union" and present):
+            if self.mode == "full":
+                ys, xs = slice(0, self.region["height"]), slice(0, self.region["width"])
+            else:
+                ys = slice(min(s[0].start for s in present.values()), max(s[0].stop for s in present.values()))
+                xs = slice(min(s[1].start for s in present.values()), max(s[1].stop for s in present.values()))
+            self._boxes = [box(ys, xs)]
+            buf = np.empty((ys.stop - ys.start, xs.stop - xs.start, 3), dtype=np.uint8)
+            self._buffers = [buf]
+            self._views = {
+                name: buf[sl[0].start - ys.start:sl[0].stop - ys.start, sl[1].start - xs.start:sl[1].stop - xs.start]
+                for name, sl in present.items()
+            }
+        else:
+            self._boxes = [box(*sl) for sl in present.values()]
+            self._buffers = [np.empty((b["height"], b["width"], 3), dtype=np.uint8) for b in self._boxes]
+            self._views = dict(zip(present, self._buffers))
+        self._views.update({name: None for name, sl in slices.items() if sl is None})
+        self._layout_for = slices
+
+    def read_rois(self):
+        """
+        {roi name: BGR view or None} for a fresh frame, or None when the
+        backend has no more frames. Views are only valid until the next read.
+        """
+        self._layout()
+        grabbed = self.backend.grab(self._boxes)
+        if grabbed is None:
+            return None
+        for src, buf in zip(grabbed, self._buffers):
+            if src.shape[2] == 4:
+                cv2.cvtColor(src, cv2.COLOR_BGRA2BGR, dst=buf)
+            else:
+                np.copyto(buf, src)
+        return dict(self._views)
+
+    def read(self):
+        """
+        Frame-source protocol (see pipeline.VisionPipeline): owned copies of
+        the ROIs, which ocr_pipeline.parse_frames_to_snapshots accepts in
+        place of a frame.
+        """
+        rois = self.read_rois()
+        if rois is None:
+            return None
+        return {name: None if roi is None else roi.copy() for name, roi in rois.items()}
+
+    def close(self):
+        self.backend.close()
+
+
+# ---------- FULL FRAMES ----------
+
+_screen = MssBackend()
 
 
 def grab_chart_frame() -> "np.ndarray":
@@ -9,14 +215,42 @@ def grab_chart_frame() -> "np.ndarray":
     Capture a frame of the configured chart region.
     Returns a BGR OpenCV image.
     """
-    with mss.mss() as sct:
-        monitor = {
-            "left": CAPTURE_REGION["left"],
-            "top": CAPTURE_REGION["top"],
-            "width": CAPTURE_REGION["width"],
-            "height": CAPTURE_REGION["height"],
-        }
-        sct_img = sct.grab(monitor)
-        frame = np.array(sct_img)[:, :, :3]  # drop alpha channel
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    monitor = {
+        "left": CAPTURE_REGION["left"],
+        "top": CAPTURE_REGION["top"],
+        "width": CAPTURE_REGION["width"],
+        "height": CAPTURE_REGION["height"],
+    }
+    bgra = _screen.grab([monitor])[0]
+    return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)  # the one copy: out of the mss buffer
+
+
+class ScreenFrameSource:
+    """
+    Frames from the live screen (the configured chart region).
+    """
+
+    def read(self):
+        return grab_chart_frame()
+
+
+class DirectoryFrameSource:
+    """
+    Frames replayed from a directory of recorded images (png/jpg), in
+    filename order, so the pipeline can run without a display.
+    read() returns None once the frames are exhausted (unless `loop`).
+    """
+
+    def __init__(self, directory: str, loop: bool = False):
+        self.paths = _frame_paths(directory)
+        self.loop = loop
+        self.pos = 0
+
+    def read(self):
+        if self.pos >= len(self.paths):
+            if not self.loop:
+                return None
+            self.pos = 0
+        frame = cv2.imread(self.paths[self.pos])
+        self.pos += 1
         return frame
@@ -2,6 +2,21 @@ import json
 import os
 BACKEND_URL = "http://127.0.0.1:8000"
 CAPTURE_INTERVAL = 1.0  # seconds
+CAPTURE_MODE = "rois"  # "full" region, "union" (bounding box of the ROIs) or "rois" (each ROI grabbed alone)
+OCR_WORKERS = 2  # OCR processes in the pipelined ingestion
+FRAME_QUEUE_SIZE = 4  # frames waiting for OCR; the oldest is dropped when full
+MAX_FRAME_AGE = 3.0  # seconds; older frames are skipped instead of OCR'd
+REORDER_TIMEOUT = 2.0  # seconds to wait for a missing frame before sending past it
+SEND_TRANSPORT = "http"  # "http" (pooled session) or "ws" (one persistent websocket)
+SEND_BATCH_SIZE = 1  # snapshots per request; >1 posts to the batch ingest endpoint
+SEND_BATCH_WAIT = 0.05  # seconds to wait for a batch to fill
+SEND_FORMAT = "json"  # batch body: "json", "ndjson" or "struct" (binary records, see backend/snapshot_codec.py)
+SEND_QUEUE_SIZE = 256  # snapshots buffered while the backend is unreachable
+OCR_MODE = "recognize"  # "recognize": one recognize call over known ROI boxes, no detector; "detect": readtext per ROI
+OCR_BATCH_FRAMES = 4  # queued frames an OCR worker reads in one recognize call
+DIGIT_OCR_ROIS = ("price", "pnl")  # read by the template digit recognizer first; () disables it
+DIGIT_MIN_CONFIDENCE = 0.75  # weakest digit match accepted before falling back to easyocr
+DIGIT_FONT_PATH = None  # chart font (.ttf/.otf) for digit templates; None = OpenCV Hershey
 CALIBRATION_PATH = "vision_service/calibration.json"
 
 if os.path.exists(CALIBRATION_PATH):
@@ -14,3 +29,11 @@ else:
         "width": 1200,
         "height": 700
     }
+
+# Largest gray-level change (0-255) of a 4x-downsampled ROI against the last
+# OCR'd crop above which the ROI is read again. None = OCR every frame.
+ROI_CHANGE_THRESHOLDS = {
+    "symbol": 12,
+    "price": 8,
+    "pnl": 8,
+}
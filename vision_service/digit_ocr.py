@@ -0,0 +1,173 @@
+import cv2
+import numpy as np
+
+
+DIGIT_CHARS = "0123456789+"
+GLYPH_SIZE = 24  # templates and glyphs are compared as GLYPH_SIZE x GLYPH_SIZE
+SPLIT_BELOW = 0.75  # a wide glyph matching worse than this may be two touching digits
+
+
+def _normalize_glyph(glyph):
+    """
+    Scale a tight binary glyph crop to GLYPH_SIZE rows (keeping its aspect
+    ratio), centre it on a square canvas and return it as a zero-mean,
+    unit-norm vector for correlation.
+    """
+    h, w = glyph.shape[:2]
+    new_w = max(1, min(GLYPH_SIZE, round(w * GLYPH_SIZE / h)))
+    scaled = cv2.resize(glyph, (new_w, GLYPH_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    canvas = np.zeros((GLYPH_SIZE, GLYPH_SIZE), dtype=np.float32)
+    x = (GLYPH_SIZE - new_w) // 2
+    canvas[:, x:x + new_w] = scaled
+    vec = canvas.ravel() - canvas.mean()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _ink_runs(profile, min_ink=1):
+    """
+    (start, end) runs of consecutive entries with at least `min_ink` ink.
+    """
+    on = np.concatenate([[False], profile >= min_ink, [False]])
+    edges = np.flatnonzero(on[1:] != on[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def _render_cv2(ch, font, scale, thickness):
+    (w, h), base = cv2.getTextSize(ch, font, scale, thickness)
+    img = np.zeros((h + base + 2 * thickness, w + 2 * thickness), dtype=np.uint8)
+    cv2.putText(img, ch, (thickness, h + thickness), font, scale, 255, thickness)
+    return img
+
+
+def _render_truetype(ch, font_path, size):
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.truetype(font_path, size)
+    left, top, right, bottom = font.getbbox(ch)
+    img = Image.new("L", (right - left + 4, bottom - top + 4), 0)
+    ImageDraw.Draw(img).text((2 - left, 2 - top), ch, fill=255, font=font)
+    return np.array(img)
+
+
+def _tight(img):
+    ys, xs = np.nonzero(img)
+    if not len(ys):
+        return None
+    return img[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+
+class DigitRecognizer:
+    """
+    Template-matching reader for numeric ROIs (prices, PnL): digits, '+',
+    '-', '.' and ','. A binarized ROI is cut into glyphs by column
+    projection; digits are matched by normalized correlation against
+    templates rendered from the chart font, punctuation is recognized
+    from its size and position on the line.
+
+    recognize() returns (text, confidence), the confidence being the
+    weakest digit match (0 when nothing readable was found), so callers
+    can fall back to a general OCR model below a threshold.
+    """
+
+    def __init__(self, templates):
+        self.chars = list(templates)
+        self._matrix = np.stack([_normalize_glyph(templates[c]) for c in self.chars])
+
+    @classmethod
+    def from_cv2_font(cls, font=cv2.FONT_HERSHEY_SIMPLEX, scale=1.6, thickness=3):
+        """
+        Templates rendered with an OpenCV Hershey font.
+        """
+        return cls({c: _tight(_render_cv2(c, font, scale, thickness)) for c in DIGIT_CHARS})
+
+    @classmethod
+    def from_font(cls, font_path, size=48):
+        """
+        Templates rendered from a TrueType/OpenType font file, ideally the
+        one the charting app uses for its price labels (needs Pillow).
+        """
+        return cls({c: _tight(_render_truetype(c, font_path, size)) for c in DIGIT_CHARS})
+
+    @staticmethod
+    def _text_line(binary):
+        """
+        Light-on-dark binary image cropped to its inkiest row band.
+        """
+        if np.count_nonzero(binary) > binary.size / 2:
+            binary = 255 - binary
+        runs = _ink_runs(np.count_nonzero(binary, axis=1))
+        if not runs:
+            return None
+        top, bottom = max(runs, key=lambda r: np.count_nonzero(binary[r[0]:r[1]]))
+        return binary[top:bottom]
+
+    def _classify_mark(self, glyph_h, glyph_w, top, bottom, line_h):
+        """
+        Punctuation from geometry: '-' is a wide bar mid-line, '.' a small
+        blob on the baseline, ',' a taller one reaching below it.
+        """
+        if glyph_w >= 1.5 * glyph_h and top > 0.2 * line_h and bottom < 0.8 * line_h:
+            return "-"
+        if top > 0.5 * line_h:
+            return "," if glyph_h > 1.3 * glyph_w else "."
+        return None
+
+    def _match(self, glyph):
+        sims = self._matrix @ _normalize_glyph(glyph)
+        best = int(np.argmax(sims))
+        return self.chars[best], float(sims[best])
+
+    def _match_run(self, glyph, line_h, depth=0):
+        """
+        Match a run of ink columns as one digit or, when it is wide and
+        matches poorly, as touching digits split where the parts score best.
+        """
+        char, score = self._match(glyph)
+        h, w = glyph.shape[:2]
+        if depth >= 2 or score >= SPLIT_BELOW or w < 0.8 * line_h:
+            return [char], [score]
+
+        # try the thinnest columns of the middle part as cut points
+        lo, hi = int(w * 0.3), int(w * 0.7) + 1
+        ink = np.count_nonzero(glyph[:, lo:hi], axis=0)
+        best = ([char], [score])
+        for x in lo + np.argsort(ink, kind="stable")[:3]:
+            left, right = _tight(glyph[:, :x]), _tight(glyph[:, x:])
+            if left is None or right is None:
+                continue
+            lc, ls = self._match_run(left, line_h, depth + 1)
+            rc, rs = self._match_run(right, line_h, depth + 1)
+            if min(ls + rs) > min(best[1]):
+                best = (lc + rc, ls + rs)
+        return best
+
+    def recognize(self, binary):
+        line = self._text_line(binary)
+        if line is None:
+            return "", 0.0
+        line_h = line.shape[0]
+
+        text, scores = [], []
+        for x0, x1 in _ink_runs(np.count_nonzero(line, axis=0)):
+            col = line[:, x0:x1]
+            rows = _ink_runs(np.count_nonzero(col, axis=1))
+            top, bottom = rows[0][0], rows[-1][1]
+            glyph_h, glyph_w = bottom - top, x1 - x0
+            if glyph_h * glyph_w < 4:
+                continue  # speckle
+
+            if glyph_h < 0.5 * line_h:
+                mark = self._classify_mark(glyph_h, glyph_w, top, bottom, line_h)
+                if mark is None:
+                    return "".join(text), 0.0
+                text.append(mark)
+                continue
+
+            chars, sims = self._match_run(col[top:bottom], line_h)
+            text.extend(chars)
+            scores.extend(sims)
+
+        if not scores:
+            return "".join(text), 0.0
+        return "".join(text), min(scores)
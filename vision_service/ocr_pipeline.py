@@ -1,12 +1,34 @@
 import cv2
-import easyocr
 import json
 import numpy as np
+import os
 import re
+import threading
+import time
 from datetime import datetime, timezone
 
-# Initialize OCR once
-reader = easyocr.Reader(['en'], gpu=False)
+from .config import (
+    CALIBRATION_PATH,
+    DIGIT_FONT_PATH,
+    DIGIT_MIN_CONFIDENCE,
+    DIGIT_OCR_ROIS,
+    OCR_MODE,
+    ROI_CHANGE_THRESHOLDS,
+)
+from .digit_ocr import DigitRecognizer
+
+# easyocr (torch + model weights) is loaded on first use, not at import
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_reader():
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(['en'], gpu=False)
+        return _reader
 
 
 def safe_crop(frame, x1, y1, x2, y2):
@@ -55,51 +77,254 @@ def extract_symbol_and_timeframe(text):
     return " ".join(symbol) if symbol else None, timeframe
 
 
-def parse_frame_to_snapshot(frame: np.ndarray):
-    with open("vision_service/calibration.json") as f:
-        cal = json.load(f)
+# ---------- CALIBRATION ----------
 
-    H, W = frame.shape[:2]
+# ROI boxes as (x1, y1, x2, y2) fractions of the calibrated region
+ROI_FRACTIONS = {
+    "symbol": (0.02, 0.02, 0.45, 0.15),
+    "price": (0.80, 0.30, 0.98, 0.65),
+    "pnl": (0.70, 0.75, 0.98, 0.98),
+}
 
-    def cx(px): return cal["left"] + px * cal["width"]
-    def cy(py): return cal["top"] + py * cal["height"]
 
-    # --- SYMBOL + TIMEFRAME ---
-    symbol_roi = safe_crop(frame, cx(0.02), cy(0.02), cx(0.45), cy(0.15))
-    symbol_text = None
-    symbol = None
-    timeframe = None
+class CalibrationWatcher:
+    """
+    calibration.json loaded once and re-read only when its mtime changes
+    (checked at most every `check_every` seconds). ROI crop slices are
+    computed once per calibration and frame shape.
+    """
+
+    def __init__(self, path=CALIBRATION_PATH, check_every=1.0):
+        self.path = path
+        self.check_every = check_every
+        self._cal = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._slices = {}
+
+    def get(self):
+        now = time.monotonic()
+        if self._cal is None or now - self._checked_at >= self.check_every:
+            self._checked_at = now
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self._mtime:
+                with open(self.path) as f:
+                    self._cal = json.load(f)
+                self._mtime = mtime
+                self._slices.clear()
+        return self._cal
+
+    def roi_slices(self, shape):
+        """
+        {roi name: (row slice, column slice) or None if empty} for frames
+        of `shape`, clamped like safe_crop.
+        """
+        cal = self.get()
+        H, W = shape[:2]
+        key = (H, W)
+        if key not in self._slices:
+            slices = {}
+            for name, (x1, y1, x2, y2) in ROI_FRACTIONS.items():
+                xs = [max(0, min(W, int(cal["left"] + px * cal["width"]))) for px in (x1, x2)]
+                ys = [max(0, min(H, int(cal["top"] + py * cal["height"]))) for py in (y1, y2)]
+                ok = xs[1] > xs[0] and ys[1] > ys[0]
+                slices[name] = (slice(*ys), slice(*xs)) if ok else None
+            self._slices[key] = slices
+        return self._slices[key]
+
+
+_calibration = CalibrationWatcher()
+
+
+# ---------- ROI CHANGE DETECTION ----------
+
+class RoiChangeDetector:
+    """
+    Decides whether an ROI needs OCR again by comparing a downsampled
+    grayscale copy of it with the one from the last crop that was actually
+    OCR'd. Area-averaging over `factor` x `factor` cells removes pixel
+    noise, while the score, the largest per-cell change in gray levels
+    (0-255), still catches a single changed digit. A threshold of None
+    always re-runs OCR.
+    """
+
+    def __init__(self, thresholds=None, factor=4):
+        self.thresholds = dict(ROI_CHANGE_THRESHOLDS if thresholds is None else thresholds)
+        self.factor = factor
+        self._last = {}
+
+    def _thumb(self, roi):
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+        h, w = gray.shape[:2]
+        size = (max(1, w // self.factor), max(1, h // self.factor))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def score(self, name, roi):
+        """
+        Largest per-cell gray-level change against the last OCR'd crop
+        (inf when there is none or the ROI changed size).
+        """
+        last = self._last.get(name)
+        thumb = self._thumb(roi)
+        if last is None or last.shape != thumb.shape:
+            return float("inf"), thumb
+        return float(np.abs(thumb - last).max()), thumb
+
+    def changed(self, name, roi):
+        score, thumb = self.score(name, roi)
+        threshold = self.thresholds.get(name)
+        if threshold is None or score > threshold:
+            self._last[name] = thumb
+            return True
+        return False
+
+    def reset(self):
+        self._last.clear()
+
+
+_detector = RoiChangeDetector()
+_ocr_cache = {}
+OCR_STATS = {"ocr_calls": 0, "ocr_skipped": 0, "recognize_calls": 0, "digit_reads": 0, "digit_fallbacks": 0}
+_digits = None
+
 
-    if symbol_roi is not None:
-        text = reader.readtext(preprocess(symbol_roi), detail=0)
-        symbol_text = " ".join(text)
-        symbol, timeframe = extract_symbol_and_timeframe(symbol_text)
-
-    # --- LAST PRICE ---
-    price_roi = safe_crop(frame, cx(0.80), cy(0.30), cx(0.98), cy(0.65))
-    last_price = None
-    if price_roi is not None:
-        text = reader.readtext(preprocess(price_roi), detail=0)
-        last_price = extract_float(" ".join(text))
-
-    # --- PnL ---
-    pnl_roi = safe_crop(frame, cx(0.70), cy(0.75), cx(0.98), cy(0.98))
-    pnl = None
-    if pnl_roi is not None:
-        text = reader.readtext(preprocess(pnl_roi), detail=0)
-        pnl = extract_float(" ".join(text))
-
-    snapshot = {
+def get_digit_recognizer():
+    global _digits
+    if _digits is None:
+        _digits = DigitRecognizer.from_font(DIGIT_FONT_PATH) if DIGIT_FONT_PATH else DigitRecognizer.from_cv2_font()
+    return _digits
+
+
+def read_digits(roi):
+    """
+    Text of a preprocessed numeric ROI from the template digit recognizer,
+    or None when it is not confident enough (the caller falls back to
+    easyocr).
+    """
+    text, confidence = get_digit_recognizer().recognize(roi)
+    if confidence >= DIGIT_MIN_CONFIDENCE and extract_float(text) is not None:
+        OCR_STATS["digit_reads"] += 1
+        return text
+    OCR_STATS["digit_fallbacks"] += 1
+    return None
+
+
+def recognize_batch(rois):
+    """
+    OCR preprocessed ROIs with one Reader.recognize call. Each ROI is one
+    line of text at a known position, so easyocr's text detector is
+    skipped: the crops are stacked into one canvas and handed to
+    Reader.recognize together with their boxes. That skipped detector pass
+    is the saving; on CPU (gpu=False, no rotation_info) easyocr still
+    recognizes the boxes one by one inside that call.
+    """
+    if not rois:
+        return []
+    canvas = np.zeros((sum(r.shape[0] for r in rois), max(r.shape[1] for r in rois)), dtype=np.uint8)
+    boxes, y = [], 0
+    for r in rois:
+        h, w = r.shape[:2]
+        canvas[y:y + h, :w] = r
+        boxes.append([0, w, y, y + h])
+        y += h
+
+    results = get_reader().recognize(
+        canvas, horizontal_list=boxes, free_list=[], detail=1, paragraph=False, batch_size=len(boxes)
+    )
+    OCR_STATS["recognize_calls"] += 1
+    # easyocr returns results sorted by position; map them back by top edge
+    by_top = {int(box[0][1]): text for box, text, _ in results}
+    return [by_top.get(b[2], "") for b in boxes]
+
+
+def read_rois(items, mode=None):
+    """
+    OCR text for a sequence of (name, roi) pairs, e.g. every ROI of several
+    consecutive frames. ROIs that have not visibly changed reuse the text of
+    the previous read of that name (possibly an earlier item in the same
+    call). Numeric ROIs (DIGIT_OCR_ROIS) are tried on the digit
+    recognizer first; the rest go through one recognize_batch call
+    ('recognize' mode) or one readtext call each ('detect' mode).
+    """
+    mode = mode or OCR_MODE
+    pending, refs, latest = [], [], {}
+    for name, roi in items:
+        if roi is None:
+            refs.append(None)
+            continue
+        known = name in latest or name in _ocr_cache
+        if _detector.changed(name, roi) or not known:
+            latest[name] = len(pending)
+            pending.append((name, preprocess(roi)))
+        else:
+            OCR_STATS["ocr_skipped"] += 1
+        refs.append((name, latest.get(name)))
+
+    texts = [read_digits(roi) if name in DIGIT_OCR_ROIS else None for name, roi in pending]
+    todo = [i for i, text in enumerate(texts) if text is None]
+    if mode == "recognize":
+        recognized = recognize_batch([pending[i][1] for i in todo])
+    else:
+        recognized = [" ".join(get_reader().readtext(pending[i][1], detail=0)) for i in todo]
+    for i, text in zip(todo, recognized):
+        texts[i] = text
+    OCR_STATS["ocr_calls"] += len(todo)
+
+    out = []
+    for ref in refs:
+        if ref is None:
+            out.append(None)
+        else:
+            name, idx = ref
+            out.append(texts[idx] if idx is not None else _ocr_cache[name])
+    for name, idx in latest.items():
+        _ocr_cache[name] = texts[idx]
+    return out
+
+
+def read_roi(name, roi):
+    """
+    OCR text of an ROI, reusing the previous result when the ROI has not
+    visibly changed since it was last read.
+    """
+    return read_rois([(name, roi)])[0]
+
+
+def _snapshot(texts):
+    symbol_text = texts["symbol"]
+    symbol, timeframe = extract_symbol_and_timeframe(symbol_text)
+    return {
         "source": "screen_capture",
         "symbol": symbol,
         "timeframe": timeframe,
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "last_price": last_price,
-        "pnl": pnl,
+        "last_price": extract_float(texts["price"]),
+        "pnl": extract_float(texts["pnl"]),
         "position_size": None,
         "extra": {
             "raw_symbol_text": symbol_text
         }
     }
 
-    return snapshot
\ No newline at end of file
+
+def parse_frames_to_snapshots(frames, mode=None):
+    """
+    Snapshots for consecutive frames, with every ROI of every frame read in
+    one OCR batch. A frame is either a full image or the {roi name: crop}
+    dict a capture.CaptureSession reads.
+    """
+    items = []
+    for frame in frames:
+        if isinstance(frame, dict):
+            items.extend((name, frame.get(name)) for name in ROI_FRACTIONS)
+            continue
+        slices = _calibration.roi_slices(frame.shape)
+        items.extend((name, frame[sl] if sl is not None else None) for name, sl in slices.items())
+
+    texts = read_rois(items, mode)
+    n = len(ROI_FRACTIONS)
+    return [_snapshot(dict(zip(ROI_FRACTIONS, texts[i:i + n]))) for i in range(0, len(texts), n)]
+
+
+def parse_frame_to_snapshot(frame: np.ndarray, mode=None):
+    return parse_frames_to_snapshots([frame], mode)[0]
@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import multiprocessing as mp
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from .config import CAPTURE_INTERVAL, FRAME_QUEUE_SIZE, MAX_FRAME_AGE, OCR_BATCH_FRAMES, OCR_WORKERS, REORDER_TIMEOUT
+
+
+_DONE = "done"  # result sent by a worker that has exited
+
+# Why a frame produced no snapshot (the key in VisionPipeline.counters)
+STALE, QUEUE_FULL, OCR_FAILED = "dropped_stale", "dropped_queue_full", "ocr_failed"
+
+
+# ---------- OCR WORKERS ----------
+
+def _ocr_worker(frames, results, max_age: float, batch_frames: int):
+    """
+    Worker process: OCR frames until it receives None. Every process loads
+    its own easyocr Reader (and keeps its own ROI change cache). Frames
+    already queued behind the first are read with it in one OCR batch of up
+    to `batch_frames`. Frames older than `max_age` are skipped, but still
+    reported so the sender does not wait for them. Results are (seq,
+    snapshot or None, reason or None).
+    """
+    from .ocr_pipeline import get_reader, parse_frames_to_snapshots
+
+    get_reader()  # load the model before the first frame arrives
+    stop = False
+    while not stop:
+        item = frames.get()
+        if item is None:
+            break
+        batch = [item]
+        while len(batch) < batch_frames:
+            try:
+                item = frames.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+
+        fresh = []
+        for seq, captured_at, frame in batch:
+            if time.time() - captured_at > max_age:
+                results.put((seq, None, STALE))
+            else:
+                fresh.append((seq, captured_at, frame))
+        if not fresh:
+            continue
+
+        try:
+            snapshots = parse_frames_to_snapshots([frame for _, _, frame in fresh])
+        except Exception as e:
+            print(f"OCR failed on frames {fresh[0][0]}-{fresh[-1][0]}: {e}")
+            for seq, _, _ in fresh:
+                results.put((seq, None, OCR_FAILED))
+            continue
+        for (seq, captured_at, _), snapshot in zip(fresh, snapshots):
+            snapshot["timestamp"] = datetime.fromtimestamp(captured_at, timezone.utc).isoformat()
+            results.put((seq, snapshot, None))
+    results.put((_DONE, None, None))
+
+
+# ---------- REORDERING ----------
+
+class Reorderer:
+    """
+    Puts worker results back into capture order. Frame sequence numbers
+    are consecutive; a gap (a frame that was dropped or is still being
+    OCR'd) holds back later results for at most `timeout` seconds.
+    """
+
+    def __init__(self, timeout: float = REORDER_TIMEOUT):
+        self.timeout = timeout
+        self.next_seq = 0
+        self._heap: List[tuple] = []
+        self._blocked_since: Optional[float] = None
+        self.skipped = 0
+
+    def push(self, seq: int, snapshot: Optional[Dict]):
+        if seq < self.next_seq:
+            return  # arrived after we gave up on it
+        heapq.heappush(self._heap, (seq, snapshot))
+
+    def pop_ready(self, flush: bool = False) -> List[Dict]:
+        """
+        Snapshots that can be sent now, oldest first (dropped frames are
+        consumed silently). `flush` releases everything regardless of gaps.
+        """
+        out = []
+        while self._heap:
+            seq, snapshot = self._heap[0]
+            if seq != self.next_seq:
+                now = time.monotonic()
+                if self._blocked_since is None:
+                    self._blocked_since = now
+                if not flush and now - self._blocked_since < self.timeout:
+                    break
+                self.skipped += seq - self.next_seq
+                self.next_seq = seq
+            heapq.heappop(self._heap)
+            self.next_seq += 1
+            self._blocked_since = None
+            if snapshot is not None:
+                out.append(snapshot)
+        return out
+
+    def __len__(self):
+        return len(self._heap)
+
+
+# ---------- PIPELINE ----------
+
+class VisionPipeline:
+    """
+    Staged ingestion: capture -> OCR -> send, connected by bounded queues.
+
+    - capture: a thread reading `source` on a fixed clock. When OCR falls
+      behind, the oldest queued frame is dropped rather than the clock slipping.
+    - OCR: `workers` processes, each with its own easyocr Reader, reading
+      up to `batch_frames` queued frames per recognize call.
+    - send: an asyncio loop that restores capture order and calls
+      `send(snapshot)` (a blocking function, run off the loop) for each result.
+
+    `source` is anything with read() -> frame, returning None when exhausted
+    (see capture.CaptureSession / ScreenFrameSource / DirectoryFrameSource).
+    """
+
+    def __init__(
+        self,
+        source,
+        send: Callable[[Dict], None],
+        workers: int = OCR_WORKERS,
+        interval: float = CAPTURE_INTERVAL,
+        queue_size: int = FRAME_QUEUE_SIZE,
+        max_age: float = MAX_FRAME_AGE,
+        reorder_timeout: float = REORDER_TIMEOUT,
+        batch_frames: int = OCR_BATCH_FRAMES,
+    ):
+        self.source = source
+        self.send = send
+        self.workers = workers
+        self.interval = interval
+        self.max_age = max_age
+        self.batch_frames = max(1, batch_frames)
+        # spawn, not fork: easyocr/torch state does not survive a fork
+        self._ctx = mp.get_context("spawn")
+        self._frames = self._ctx.Queue(maxsize=queue_size)
+        self._results = self._ctx.Queue()
+        self._reorderer = Reorderer(reorder_timeout)
+        self._stop = threading.Event()
+        self._procs = []
+        self.counters = {"captured": 0, QUEUE_FULL: 0, STALE: 0, OCR_FAILED: 0, "sent": 0, "send_failed": 0}
+
+    # ----- capture stage -----
+
+    def _enqueue(self, item):
+        try:
+            self._frames.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        try:
+            seq, _, _ = self._frames.get_nowait()
+            self._results.put((seq, None, QUEUE_FULL))
+        except queue.Empty:
+            pass
+        self._frames.put(item)
+
+    def _capture(self):
+        seq = 0
+        next_tick = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                frame = self.source.read()
+                if frame is None:
+                    break
+                self._enqueue((seq, time.time(), frame))
+                seq += 1
+                self.counters["captured"] = seq
+
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_tick = time.monotonic()  # fell behind: skip ticks instead of bursting
+        finally:
+            for _ in range(self.workers):
+                self._frames.put(None)
+
+    # ----- send stage -----
+
+    def _next_result(self, timeout: float):
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def _send_loop(self):
+        loop = asyncio.get_running_loop()
+        finished = 0
+        while finished < self.workers:
+            item = await loop.run_in_executor(None, self._next_result, 0.1)
+            if item is None and not any(p.is_alive() for p in self._procs):
+                print("All OCR workers exited unexpectedly")
+                break
+            if item is not None:
+                seq, snapshot, reason = item
+                if seq == _DONE:
+                    finished += 1
+                else:
+                    if reason is not None:
+                        self.counters[reason] += 1
+                    self._reorderer.push(seq, snapshot)
+
+            for snapshot in self._reorderer.pop_ready(flush=finished == self.workers):
+                await self._send_one(loop, snapshot)
+
+    async def _send_one(self, loop, snapshot: Dict):
+        try:
+            await loop.run_in_executor(None, self.send, snapshot)
+            self.counters["sent"] += 1
+        except Exception as e:
+            self.counters["send_failed"] += 1
+            print(f"Send failed: {e}")
+
+    # ----- lifecycle -----
+
+    def run(self) -> Dict:
+        """
+        Run until the source is exhausted (or stop() is called) and every
+        captured frame has been OCR'd and sent. Returns stats().
+        """
+        self._procs = procs = [
+            self._ctx.Process(
+                target=_ocr_worker,
+                args=(self._frames, self._results, self.max_age, self.batch_frames),
+                daemon=True,
+            )
+            for _ in range(self.workers)
+        ]
+        for p in procs:
+            p.start()
+        capture = threading.Thread(target=self._capture, name="capture", daemon=True)
+        capture.start()
+        try:
+            asyncio.run(self._send_loop())
+        finally:
+            self._stop.set()
+            capture.join(timeout=5)
+            for p in procs:
+                p.join(timeout=5)
+            for q in (self._frames, self._results):
+                q.cancel_join_thread()  # leftover frames must not block interpreter exit
+        return self.stats()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        return dict(self.counters, reorder_skipped=self._reorderer.skipped, workers=self.workers)
@@ -1,39 +1,63 @@
 import time
-import asyncio
 import json
 from datetime import datetime
-import requests
 
-from .config import BACKEND_URL, CAPTURE_INTERVAL
-from .capture import grab_chart_frame
-from .ocr_pipeline import parse_frame_to_snapshot
+from .config import BACKEND_URL, CAPTURE_INTERVAL, OCR_WORKERS
+from .capture import CaptureSession, DirectoryFrameSource
+from .sender import get_sender
 
 
 def send_snapshot(snapshot: dict):
-    url = f"{BACKEND_URL}/ingest/market_snapshot"
-    requests.post(url, json=snapshot, timeout=1)
-
-    try:
-        asyncio.run(send_ws(snapshot))
-    except:
-        pass
-async def send_ws(snapshot):
-    import websockets, json
-    async with websockets.connect("ws://127.0.0.1:8000/ws/vision") as ws:
-        await ws.send(json.dumps(snapshot))
-
+    # Queued on the long-lived sender (pooled session / persistent websocket)
+    get_sender().send(snapshot)
 
 
 def main_loop():
+    from .ocr_pipeline import parse_frame_to_snapshot
+
     print(f"Starting vision ingestion. Backend: {BACKEND_URL}, interval: {CAPTURE_INTERVAL}s")
+    session = CaptureSession()
     while True:
-        frame = grab_chart_frame()
-        snapshot = parse_frame_to_snapshot(frame)
+        rois = session.read_rois()  # views into the session's buffers, OCR'd before the next read
+        snapshot = parse_frame_to_snapshot(rois)
         print("Snapshot:", json.dumps(snapshot, indent=2))
         send_snapshot(snapshot)
         time.sleep(CAPTURE_INTERVAL)
 
 
+def main_pipeline(frames_dir=None, workers=OCR_WORKERS, interval=CAPTURE_INTERVAL):
+    """
+    Pipelined ingestion: capture, OCR (in `workers` processes) and sending
+    overlap instead of running one after another. With `frames_dir`, frames
+    are replayed from recorded images instead of the screen.
+    """
+    from .pipeline import VisionPipeline
+
+    source = DirectoryFrameSource(frames_dir) if frames_dir else CaptureSession()
+    print(f"Starting pipelined vision ingestion. Backend: {BACKEND_URL}, interval: {interval}s, OCR workers: {workers}")
+    pipeline = VisionPipeline(source, send_snapshot, workers=workers, interval=interval)
+    try:
+        stats = pipeline.run()
+    except KeyboardInterrupt:
+        pipeline.stop()
+        stats = pipeline.stats()
+    get_sender().close()
+    print("Pipeline stats:", json.dumps(stats))
+    print("Sender stats:", json.dumps(get_sender().stats()))
+
+
 if __name__ == "__main__":
-    main_loop()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Screen-capture ingestion into the backend.")
+    parser.add_argument("--serial", action="store_true", help="use the original capture -> OCR -> send loop")
+    parser.add_argument("--frames-dir", help="replay recorded frames from this directory instead of the screen")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS)
+    parser.add_argument("--interval", type=float, default=CAPTURE_INTERVAL)
+    args = parser.parse_args()
+
+    if args.serial:
+        main_loop()
+    else:
+        main_pipeline(args.frames_dir, workers=args.workers, interval=args.interval)
 
@@ -0,0 +1,258 @@
+import json
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from .config import BACKEND_URL, SEND_BATCH_SIZE, SEND_BATCH_WAIT, SEND_FORMAT, SEND_QUEUE_SIZE, SEND_TRANSPORT
+
+
+# ---------- TRANSPORTS ----------
+
+class HttpTransport:
+    """
+    POSTs through one pooled requests.Session (kept-alive connection).
+    Batches of more than one snapshot go to /ingest/market_snapshots,
+    encoded as `batch_format` (SEND_FORMAT).
+    """
+
+    def __init__(self, backend_url: str = BACKEND_URL, timeout: float = 2.0, batch_format: str = SEND_FORMAT):
+        self.single_url = f"{backend_url}/ingest/market_snapshot"
+        self.batch_url = f"{backend_url}/ingest/market_snapshots"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._encode = self._content_type = None
+        if batch_format != "json":
+            from backend import snapshot_codec
+
+            self._content_type = {"ndjson": snapshot_codec.NDJSON, "struct": snapshot_codec.STRUCT}[batch_format]
+            self._encode = snapshot_codec.ENCODERS[self._content_type]
+
+    def send(self, batch: List[Dict]):
+        if len(batch) == 1:
+            resp = self.session.post(self.single_url, json=batch[0], timeout=self.timeout)
+        elif self._encode is not None:
+            resp = self.session.post(
+                self.batch_url, data=self._encode(batch), headers={"Content-Type": self._content_type},
+                timeout=self.timeout,
+            )
+        else:
+            resp = self.session.post(self.batch_url, json=batch, timeout=self.timeout)
+        resp.raise_for_status()
+
+    def is_transient(self, error: Exception) -> bool:
+        """
+        Worth retrying: connection errors, timeouts and 5xx. A 4xx means
+        the backend rejected the batch and would again.
+        """
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def close(self):
+        self.session.close()
+
+
+class WebSocketTransport:
+    """
+    Streams snapshots over one long-lived websocket to /ws/ingest; a batch
+    is sent as a single JSON array message. The connection is opened lazily
+    and re-opened after any failure. The backend reports invalid snapshots
+    in error frames, which arrive asynchronously: send() reads those that
+    are waiting and returns how many snapshots they rejected.
+    """
+
+    def __init__(self, backend_url: str = BACKEND_URL, timeout: float = 2.0):
+        self.url = backend_url.replace("http", "ws", 1) + "/ws/ingest"
+        self.timeout = timeout
+        self._ws = None
+
+    def send(self, batch: List[Dict]):
+        if self._ws is None:
+            from websockets.sync.client import connect
+
+            self._ws = connect(self.url, open_timeout=self.timeout, close_timeout=self.timeout)
+        try:
+            self._ws.send(json.dumps(batch[0] if len(batch) == 1 else batch))
+            return self._read_errors()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_errors(self) -> int:
+        rejected = 0
+        while True:
+            try:
+                message = json.loads(self._ws.recv(timeout=0))
+            except TimeoutError:
+                return rejected
+            if message.get("type") == "error":
+                rejected += message.get("rejected", 0)
+                print(f"Backend rejected {message.get('rejected')} snapshot(s): {message.get('detail')}")
+
+    def is_transient(self, error: Exception) -> bool:
+        from websockets.exceptions import WebSocketException
+
+        return isinstance(error, (OSError, WebSocketException))
+
+    def close(self):
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+
+TRANSPORTS = {"http": HttpTransport, "ws": WebSocketTransport}
+
+
+# ---------- SENDER ----------
+
+class SnapshotSender:
+    """
+    Long-lived snapshot sender. send() only enqueues; a background thread
+    groups up to `batch_size` snapshots (waiting at most `batch_wait`
+    seconds for a batch to fill) and ships them over `transport`.
+
+    When the backend is unreachable the batch is retried with exponential
+    backoff (`backoff` doubling up to `max_backoff` seconds) while new
+    snapshots wait in a bounded queue; once it is full the oldest are dropped.
+    A batch the backend rejects (4xx, or one that cannot be encoded) is not
+    retried: it is dropped and counted as `rejected`.
+    """
+
+    def __init__(
+        self,
+        transport: str = SEND_TRANSPORT,
+        backend_url: str = BACKEND_URL,
+        batch_size: int = SEND_BATCH_SIZE,
+        batch_wait: float = SEND_BATCH_WAIT,
+        queue_size: int = SEND_QUEUE_SIZE,
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+    ):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        self.transport = TRANSPORTS[transport](backend_url)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self.counters = {"sent": 0, "requests": 0, "failures": 0, "dropped": 0, "rejected": 0}
+        self._thread = threading.Thread(target=self._run, name="snapshot-sender", daemon=True)
+        self._thread.start()
+
+    def send(self, snapshot: Dict):
+        while True:
+            try:
+                self._queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                with self._lock:
+                    self.counters["dropped"] += 1
+            except queue.Empty:
+                pass
+
+    def _next_batch(self) -> Optional[List[Dict]]:
+        first = self._queue.get()
+        if first is None:
+            self._queue.task_done()
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # closing: ship what we have, then stop
+                self._queue.task_done()
+                break
+            batch.append(item)
+        return batch
+
+    def _deliver(self, batch: List[Dict]):
+        delay = self.backoff
+        while True:
+            try:
+                rejected = self.transport.send(batch) or 0
+            except Exception as e:
+                with self._lock:
+                    self.counters["failures"] += 1
+                if not self.transport.is_transient(e):
+                    with self._lock:
+                        self.counters["rejected"] += len(batch)
+                    print(f"Send rejected ({e}); dropping {len(batch)} snapshot(s)")
+                    return
+                if self._closed.is_set():
+                    with self._lock:
+                        self.counters["dropped"] += len(batch)
+                    return
+                print(f"Send failed ({e}); retrying in {delay:.1f}s")
+                self._closed.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            with self._lock:
+                self.counters["sent"] += len(batch) - rejected
+                self.counters["rejected"] += rejected
+                self.counters["requests"] += 1
+            return
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                self._deliver(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if self._closed.is_set() and self._queue.empty():
+                break
+        self.transport.close()
+
+    def flush(self):
+        """
+        Block until everything queued so far has been sent (or dropped).
+        """
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """
+        Send what is queued (no retries once closing) and stop the thread.
+        """
+        self._closed.set()
+        self.send(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, queued=self._queue.qsize())
+
+
+_sender: Optional[SnapshotSender] = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> SnapshotSender:
+    """
+    Process-wide sender built from config, created on first use.
+    """
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = SnapshotSender()
+        return _sender
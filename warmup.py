@@ -0,0 +1,38 @@
+# warmup.py
+import threading
+import time
+from typing import Dict
+
+
+def warmup(rag: bool = True, llm: bool = False) -> Dict[str, float]:
+    """
+    Import the heavy modules (pandas, the signal engine, parquet support) and
+    optionally build the RAG index / OpenAI client, so the first request does
+    not pay for them. Returns seconds spent per step.
+    """
+    timings = {}
+
+    t0 = time.perf_counter()
+    import engine  # noqa: F401
+    import incremental  # noqa: F401
+    try:
+        import pyarrow.parquet  # noqa: F401  (used by the price cache)
+    except ImportError:
+        pass
+    timings["engine"] = time.perf_counter() - t0
+
+    if rag:
+        import rag_llm
+
+        timings.update(rag_llm.warmup(llm=llm))
+    return {k: round(v, 4) for k, v in timings.items()}
+
+
+def start_background_warmup(**kwargs) -> threading.Thread:
+    """
+    Run warmup() on a daemon thread, e.g. from a startup hook, so the
+    server starts accepting requests immediately.
+    """
+    thread = threading.Thread(target=warmup, kwargs=kwargs, name="warmup", daemon=True)
+    thread.start()
+    return thread